@@ -0,0 +1,651 @@
+"""
+AsyncSearchRecommender: asyncio-native version of SearchRecommender.
+
+Runs the same "Search, Sieve, and Score" workflow, but the keyword fan-out is
+done with one asyncio task per keyword over an async search function, so
+upstream calls never block the event loop that serves the FastAPI endpoints.
+stream_recommendations additionally yields provisional rankings as each
+keyword's results land, from a running top-k that only scores the new batch.
+"""
+
+import asyncio
+import heapq
+import logging
+import math
+import time
+import weakref
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from cache import TTLCache
+from fanout import AsyncFanoutLimiter, shared_limiter
+from keyword_extractor import KeywordExtractor
+from metrics import observe_stages
+from rate_limiter import SEARCH_PRIORITY
+from relevance import RelevanceScorer
+from search_recommender import (
+    RecommendationResult,
+    RecommendationSession,
+    SearchRecommender,
+    _deadline_at,
+    _elapsed_ms,
+    _remaining,
+    _score_of,
+    search_gamma_api_async,
+)
+from singleflight import SingleFlight
+from tracing import current_trace, start_trace
+
+
+class _ProvisionalRanking:
+    """
+    Running top-k behind stream_recommendations' provisional events.
+
+    Keeps a best-first shortlist of at most 2 * top_n scored markets per
+    source keyword. When a keyword lands, only the markets it newly owns are
+    scored (ownership follows _merge_keyword_results: highest volume, then
+    earliest keyword) and merged into its shortlist; a market taken over
+    from another keyword leaves that keyword's shortlist. A provisional
+    ranking is diverse selection over the shortlists alone, so each landed
+    keyword costs O(batch + keywords * top_n), not a pass over the pool.
+
+    Volume is normalized by the largest log volume seen so far (shortlists
+    are rescored when it grows) and relevance IDF comes from each batch when
+    no catalog is loaded, so provisional scores can differ slightly from the
+    final ranking, which re-ranks the full pool exactly.
+    """
+
+    def __init__(
+        self,
+        recommender: SearchRecommender,
+        watchlist: List[Dict[str, Any]],
+        keywords: List[str],
+        negative_keywords: Set[str],
+        top_n: int
+    ):
+        self.recommender = recommender
+        self.keywords = keywords
+        self.negative_keywords = negative_keywords
+        self.top_n = top_n
+        self.capacity = 2 * top_n
+        self.now = int(time.time())
+        self.watchlist_titles = [m.get("title", "") for m in watchlist]
+        self.watchlist_ids = {m.get("id") for m in watchlist}
+        self.watchlist_keys = {title.lower().strip() for title in self.watchlist_titles}
+        self.keyword_index = {keyword: i for i, keyword in enumerate(keywords)}
+        # Market ID -> (volume, keyword index, market) of the result that owns it
+        self.owners: Dict[str, Tuple[float, int, Dict[str, Any]]] = {}
+        self.shortlists: Dict[str, List[Dict[str, Any]]] = {keyword: [] for keyword in keywords}
+        self.max_log_volume = 0.0
+
+    def add(self, keyword: str, results: List[Dict[str, Any]]) -> None:
+        """Score the markets a landed keyword newly owns and merge them into its shortlist."""
+        index = self.keyword_index[keyword]
+        batch = {}
+        displaced = set()
+        for market in results:
+            market_id = market["id"]
+            owner = self.owners.get(market_id)
+            if owner is not None and not (
+                market["volume"] > owner[0] or (market["volume"] == owner[0] and index < owner[1])
+            ):
+                continue
+            if owner is not None and owner[1] != index:
+                displaced.add(owner[1])
+            self.owners[market_id] = (market["volume"], index, market)
+            batch[market_id] = market
+
+        for other in displaced:
+            shortlist = self.shortlists[self.keywords[other]]
+            self.shortlists[self.keywords[other]] = [m for m in shortlist if m["id"] not in batch]
+
+        new = [
+            m for m in batch.values()
+            if m["id"] not in self.watchlist_ids and m["title"].lower().strip() not in self.watchlist_keys
+        ]
+        if not new:
+            return
+
+        batch_max = max(math.log(m["volume"] + 1) for m in new)
+        if batch_max > self.max_log_volume:
+            self.max_log_volume = batch_max
+            for other, shortlist in self.shortlists.items():
+                self.shortlists[other] = sorted(self._score(
+                    [self.owners[m["id"]][2] for m in shortlist], [m["relevance_score"] for m in shortlist]
+                ), key=_score_of, reverse=True)
+
+        relevance = self.recommender.relevance_scorer.score(self.watchlist_titles, new)
+        self.shortlists[keyword] = heapq.nlargest(
+            self.capacity, self.shortlists[keyword] + self._score(new, relevance), key=_score_of
+        )
+
+    def _score(self, markets: List[Dict[str, Any]], relevance: List[float]) -> List[Dict[str, Any]]:
+        score_results = self.recommender.score_batch(
+            markets, self.negative_keywords, self.max_log_volume, self.now, relevance
+        )
+        return [self.recommender._scored_market(m, r) for m, r in zip(markets, score_results)]
+
+    def ranking(self) -> List[Dict[str, Any]]:
+        """Diverse top N over the shortlists."""
+        pool = [market for keyword in self.keywords for market in self.shortlists[keyword]]
+        return self.recommender._select_diverse_results(pool, self.keywords, self.top_n)
+
+
+class AsyncSearchRecommender(SearchRecommender):
+    """
+    SearchRecommender whose search, recommendation and similar-market entry
+    points are coroutines. Keyword extraction, scoring and diverse selection
+    are inherited unchanged, so results match the sync class exactly.
+    """
+
+    def __init__(
+        self,
+        search_func=None,
+        debug: bool = True,
+        use_gemini: bool = False,
+        gemini_api_key: Optional[str] = None,
+        cache: Optional[TTLCache] = None,
+        singleflight: Optional[SingleFlight] = None,
+        limiter: Optional[AsyncFanoutLimiter] = None,
+        keyword_extractor: Optional[KeywordExtractor] = None,
+        relevance_scorer: Optional[RelevanceScorer] = None
+    ):
+        """
+        Initialize the AsyncSearchRecommender.
+
+        Args:
+            search_func: Async function to call for API searches. Defaults to
+                         search_gamma_api_async (pass AsyncGammaClient.search to
+                         share a connection pool).
+            debug: Whether to print debug information for score calculations.
+            use_gemini: Whether to use Gemini for keyword extraction (falls back to heuristic if unavailable).
+            gemini_api_key: Optional Gemini API key (falls back to GEMINI_API_KEY env var).
+            cache: Optional TTLCache for search results; stale entries are
+                   refreshed in background tasks on the event loop.
+            singleflight: Optional SingleFlight that coalesces concurrent identical
+                          queries across requests on the event loop.
+            limiter: AsyncFanoutLimiter capping in-flight upstream calls.
+                     Defaults to the process-wide one shared by every recommender.
+            keyword_extractor: KeywordExtractor used when use_gemini is set.
+                               Defaults to the process-wide one for gemini_api_key.
+            relevance_scorer: RelevanceScorer for the relevance component.
+                              Defaults to one taking IDF from the candidate pool.
+        """
+        self.limiter = limiter or shared_limiter()
+        # Per-session locks for update_session, dropped once no update holds them
+        self._session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        super().__init__(
+            search_func=search_func or search_gamma_api_async,
+            debug=debug,
+            use_gemini=use_gemini,
+            gemini_api_key=gemini_api_key,
+            cache=cache,
+            singleflight=singleflight,
+            keyword_extractor=keyword_extractor,
+            relevance_scorer=relevance_scorer
+        )
+
+    def _limit_upstream(self, search_func):
+        """Queue upstream calls behind the shared FIFO limiter (cache hits skip it)."""
+        return self.limiter.wrap(search_func)
+
+    async def _search_at(self, index: int, keyword: str) -> List[Dict[str, Any]]:
+        """Async _search_at; each fan-out task has its own context, so priorities don't leak."""
+        SEARCH_PRIORITY.set(index)
+        return await self.search_func(keyword)
+
+    async def _fetch_keywords(
+        self,
+        keywords: List[str],
+        deadline: Optional[float] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Run one search task per keyword concurrently.
+
+        Args:
+            keywords: Keywords to search for (each is searched once).
+            deadline: Optional time.perf_counter() value (see _deadline_at). At
+                      the deadline, outstanding searches are cancelled. (A search
+                      shared through single-flight keeps running for its other
+                      callers and still fills the cache.)
+
+        Returns:
+            {keyword: results} for the keywords that answered in time; failed
+            and timed-out keywords are absent.
+        """
+        trace = current_trace()
+        results_by_keyword = {}
+
+        if self.debug:
+            print(f"\n{'='*60}")
+            print("SCATTERSHOT SEARCH (async)")
+            print(f"{'='*60}")
+            print(f"Searching with keywords: {keywords}")
+
+        tasks = [asyncio.ensure_future(self._search_at(index, keyword)) for index, keyword in enumerate(keywords)]
+        try:
+            _, pending = await asyncio.wait(tasks, timeout=_remaining(deadline))
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        if pending:
+            late = [k for k, task in zip(keywords, tasks) if task in pending]
+            if self.debug:
+                print(f"  Deadline reached, giving up on: {late}")
+            if trace is not None:
+                trace.event("search.deadline", logging.WARNING, missing=late)
+
+        for keyword, task in zip(keywords, tasks):
+            if task in pending:
+                continue
+            results = task.exception() or task.result()
+            if isinstance(results, Exception):
+                if self.debug:
+                    print(f"  '{keyword}' search failed: {results}")
+                if trace is not None:
+                    trace.event("search.keyword", logging.WARNING, keyword=keyword, error=repr(results))
+                continue
+
+            if self.debug:
+                print(f"  '{keyword}' returned {len(results)} results")
+            if trace is not None:
+                trace.event("search.keyword", keyword=keyword, results=len(results))
+            results_by_keyword[keyword] = results
+
+        return results_by_keyword
+
+    async def _scattershot_search(
+        self,
+        keywords: List[str],
+        deadline: Optional[float] = None,
+        missing: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Fire off concurrent queries for each keyword and aggregate unique results.
+
+        Args:
+            keywords: List of keywords to search for.
+            deadline: Optional time.perf_counter() value; see _fetch_keywords.
+            missing: Optional list that receives, in keyword order, the keywords
+                     that contributed nothing (failed or timed out).
+
+        Returns:
+            Dictionary of unique markets keyed by market ID.
+        """
+        if not keywords:
+            return {}
+        trace = current_trace()
+
+        candidates = self._merge_keyword_results(keywords, await self._fetch_keywords(keywords, deadline), missing)
+
+        if self.debug:
+            print(f"Total unique candidates: {len(candidates)}")
+        if trace is not None:
+            trace.event("search.done", candidates=len(candidates))
+
+        return candidates
+
+    async def _get_positive_keywords_async(self, watchlist_titles: List[str]) -> List[str]:
+        """Async _get_positive_keywords: the Gemini call never blocks the event loop."""
+        positive_keywords = None
+        if self.use_gemini:
+            positive_keywords = await self.keyword_extractor.extract_async(watchlist_titles, num_keywords=5)
+        return self._finish_positive_keywords(positive_keywords, watchlist_titles)
+
+    async def _request_keywords(
+        self,
+        watchlist: List[Dict[str, Any]],
+        disliked_items: List[Dict[str, Any]],
+        result: RecommendationResult
+    ) -> Tuple[List[str], Set[str]]:
+        """
+        Extract a request's positive and negative keywords, recording them and
+        the "extract" timing on result.
+
+        Returns:
+            (positive keywords, negative keyword set).
+        """
+        trace = current_trace()
+
+        # Step 1: Extract positive keywords (Gemini is awaited within its timeout)
+        start = time.perf_counter()
+        watchlist_titles = [m.get("title", "") for m in watchlist]
+        positive_keywords = await self._get_positive_keywords_async(watchlist_titles)
+
+        # Step 2: Extract negative keywords from disliked items
+        disliked_titles = [m.get("title", "") for m in disliked_items]
+        negative_keywords = self._extract_negative_keywords(disliked_titles)
+
+        result.keywords = positive_keywords
+        result.negative_keywords = sorted(negative_keywords)
+        result.timings["extract"] = _elapsed_ms(start)
+
+        if self.debug:
+            print(f"Negative keywords extracted: {negative_keywords}")
+        if trace is not None:
+            trace.event("keywords.negative", keywords=result.negative_keywords)
+        return positive_keywords, negative_keywords
+
+    async def get_recommendations(
+        self,
+        watchlist: List[Dict[str, Any]],
+        disliked_items: List[Dict[str, Any]] = None,
+        top_n: int = 10,
+        return_result: bool = False,
+        deadline_ms: Optional[float] = None
+    ):
+        """
+        Get personalized market recommendations based on watchlist and dislikes.
+
+        Args:
+            watchlist: List of market objects the user has saved.
+            disliked_items: List of market objects the user has dismissed.
+            top_n: Number of recommendations to return.
+            return_result: If True, return a RecommendationResult with the
+                           keywords, candidate count, cache hits and stage
+                           timings instead of just the list.
+            deadline_ms: Optional budget for the whole call. Keywords not
+                         answered in time are left out (see
+                         RecommendationResult.missing_keywords) and the rest
+                         are scored as usual.
+
+        Returns:
+            List of top N recommended markets with scores, or a
+            RecommendationResult if return_result is True.
+        """
+        disliked_items = disliked_items or []
+        result = RecommendationResult()
+        request_start = time.perf_counter()
+        deadline = _deadline_at(deadline_ms)
+        trace = current_trace()
+        if trace is not None:
+            trace.event("recommend.start", watchlist_size=len(watchlist), disliked_size=len(disliked_items), top_n=top_n)
+
+        if self.debug:
+            print("\n" + "="*60)
+            print("POLYFLIX SEARCH RECOMMENDER (async)")
+            print("="*60)
+            print(f"Watchlist size: {len(watchlist)}")
+            print(f"Disliked items: {len(disliked_items)}")
+
+        if not watchlist:
+            if self.debug:
+                print("WARNING: Empty watchlist, cannot generate recommendations")
+            return result if return_result else []
+
+        # Steps 1-2: Extract positive and negative keywords
+        positive_keywords, negative_keywords = await self._request_keywords(watchlist, disliked_items, result)
+
+        # Step 3: Scattershot search with positive keywords
+        start = time.perf_counter()
+        result.cached_keywords = self._cached_keywords(positive_keywords)
+        candidates = await self._scattershot_search(positive_keywords, deadline, result.missing_keywords)
+        result.total_candidates = len(candidates)
+        result.timings["search"] = _elapsed_ms(start)
+
+        if not candidates:
+            if self.debug:
+                print("WARNING: No candidates found from search")
+        else:
+            # Steps 4-5: Score candidates and select a diverse top N
+            result.recommendations = self._rank_candidates(
+                candidates, watchlist, positive_keywords, negative_keywords, top_n,
+                timings=result.timings
+            )
+
+        result.timings["total"] = _elapsed_ms(request_start)
+        observe_stages(result.timings, result.total_candidates)
+        if trace is not None:
+            trace.event(
+                "recommend.done",
+                total_candidates=result.total_candidates,
+                returned=len(result.recommendations),
+                cached_keywords=result.cached_keywords,
+                missing_keywords=result.missing_keywords,
+                timings_ms=result.timings,
+            )
+        return result if return_result else result.recommendations
+
+    async def get_recommendations_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        top_n: int = 10,
+        deadline_ms: Optional[float] = None
+    ) -> List[RecommendationResult]:
+        """
+        Async get_recommendations_batch: every distinct keyword across the
+        batch is searched once, then each entry is scored on its own pool.
+
+        Args:
+            requests: One {"watchlist": [...], "disliked_items": [...]} dict per user or row.
+            top_n: Number of recommendations per entry.
+            deadline_ms: Optional budget for the whole batch.
+
+        Returns:
+            One RecommendationResult per request, in order.
+        """
+        batch_start = time.perf_counter()
+        deadline = _deadline_at(deadline_ms)
+        results = [RecommendationResult() for _ in requests]
+
+        async def extract(request, result):
+            if not request.get("watchlist"):
+                return [], set()
+            return await self._request_keywords(request["watchlist"], request.get("disliked_items") or [], result)
+
+        keyword_sets = await asyncio.gather(*(extract(request, result) for request, result in zip(requests, results)))
+        unique = self._batch_plan(keyword_sets, results)
+
+        start = time.perf_counter()
+        results_by_keyword = await self._fetch_keywords(unique, deadline) if unique else {}
+        self._rank_batch(requests, results, keyword_sets, results_by_keyword, top_n, _elapsed_ms(start), batch_start)
+        return results
+
+    async def update_session(
+        self,
+        session: RecommendationSession,
+        add: Optional[List[Dict[str, Any]]] = None,
+        remove: Optional[List[str]] = None,
+        dislike: Optional[List[Dict[str, Any]]] = None,
+        top_n: int = 10,
+        deadline_ms: Optional[float] = None
+    ) -> RecommendationResult:
+        """
+        Async update_session: searches only the keywords the session has no
+        results for. Watchlist and dislike changes, and the keywords extracted
+        for them, are applied on the event loop in one step under a
+        per-session lock, so overlapping updates of one session see each
+        other's changes. Searches run outside the lock; their results are
+        committed against the session's keywords at that point (a keyword
+        another update is still fetching is reported missing until it lands).
+
+        Args:
+            session: Session to update in place.
+            add: Markets to add to (or replace in) the watchlist.
+            remove: IDs of watchlist markets to remove.
+            dislike: Markets to add to the disliked items.
+            top_n: Number of recommendations to return.
+            deadline_ms: Optional budget for the searches this update needs.
+
+        Returns:
+            RecommendationResult for the session's updated watchlist and dislikes.
+        """
+        request_start = time.perf_counter()
+        deadline = _deadline_at(deadline_ms)
+        result = RecommendationResult()
+        lock = self._session_locks.get(session.session_id)
+        if lock is None:
+            lock = self._session_locks[session.session_id] = asyncio.Lock()
+
+        async with lock:
+            start = time.perf_counter()
+            watchlist, new_dislikes = self._session_changes(session, add, remove, dislike)
+            keywords = None
+            if watchlist is not None:
+                titles = [m.get("title", "") for m in watchlist.values()]
+                # Gemini is awaited within its timeout, through the extractor's cache
+                keywords = await self._get_positive_keywords_async(titles) if titles else []
+            to_fetch = self._session_commit(session, watchlist, new_dislikes, keywords, result, start)
+
+        start = time.perf_counter()
+        fetched = await self._fetch_keywords(to_fetch, deadline) if to_fetch else {}
+        result.timings["search"] = _elapsed_ms(start)
+
+        self._session_rank(session, fetched, top_n, result, request_start)
+        return result
+
+    async def stream_recommendations(
+        self,
+        watchlist: List[Dict[str, Any]],
+        disliked_items: List[Dict[str, Any]] = None,
+        top_n: int = 10,
+        deadline_ms: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Like get_recommendations, but yield provisional rankings as each
+        keyword's search lands, so a client can render the first cards as soon
+        as the fastest query answers.
+
+        Provisional rankings come from a running per-keyword top-k that
+        scores only each new batch (see _ProvisionalRanking). Quotas are
+        computed over all keywords, so pending keywords keep their slots
+        reserved. The final event re-ranks the whole pool, merged in keyword
+        order, exactly like get_recommendations.
+
+        Yields dicts with a "type" of:
+            "keywords": keywords and negative_keywords, before any search.
+            "provisional": as searches land: the keywords that just
+                           answered, recommendations, total_candidates, pending
+                           keywords and elapsed_ms.
+            "final": the RecommendationResponse fields (recommendations,
+                     keywords_used, negative_keywords, total_candidates,
+                     cached_keywords, missing_keywords, timings_ms).
+        """
+        disliked_items = disliked_items or []
+        result = RecommendationResult()
+        request_start = time.perf_counter()
+        deadline = _deadline_at(deadline_ms)
+        trace = current_trace()
+        if trace is not None:
+            trace.event("stream.start", watchlist_size=len(watchlist), disliked_size=len(disliked_items), top_n=top_n)
+
+        positive_keywords, negative_keywords = [], set()
+        if watchlist:
+            positive_keywords, negative_keywords = await self._request_keywords(watchlist, disliked_items, result)
+        yield {"type": "keywords", "keywords": result.keywords, "negative_keywords": result.negative_keywords}
+
+        start = time.perf_counter()
+        result.cached_keywords = self._cached_keywords(positive_keywords)
+        results_by_keyword = {}
+        provisional = _ProvisionalRanking(self, watchlist, positive_keywords, negative_keywords, top_n)
+        tasks = {
+            asyncio.ensure_future(self._search_at(index, keyword)): keyword
+            for index, keyword in enumerate(positive_keywords)
+        }
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=_remaining(deadline), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break  # deadline reached
+                for task in done:
+                    keyword = tasks[task]
+                    if task.exception() is not None:
+                        if trace is not None:
+                            trace.event("search.keyword", logging.WARNING, keyword=keyword, error=repr(task.exception()))
+                        continue
+                    results_by_keyword[keyword] = task.result()
+                    if trace is not None:
+                        trace.event("search.keyword", keyword=keyword, results=len(task.result()))
+                    # Provisional passes stay out of the trace; only the final ranking is recorded
+                    with start_trace(None):
+                        provisional.add(keyword, task.result())
+
+                if not provisional.owners:
+                    continue
+                with start_trace(None):
+                    recommendations = provisional.ranking()
+                yield {
+                    "type": "provisional",
+                    "keywords": [k for t, k in tasks.items() if t in done],
+                    "recommendations": recommendations,
+                    "total_candidates": len(provisional.owners),
+                    "pending": [k for t, k in tasks.items() if t in pending],
+                    "elapsed_ms": _elapsed_ms(request_start),
+                }
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        # Merge in keyword order, not landing order, so a market returned by
+        # several keywords is attributed exactly as in get_recommendations
+        candidates = self._merge_keyword_results(positive_keywords, results_by_keyword, result.missing_keywords)
+        if pending and trace is not None:
+            trace.event("search.deadline", logging.WARNING, missing=[k for t, k in tasks.items() if t in pending])
+        result.total_candidates = len(candidates)
+        result.timings["search"] = _elapsed_ms(start)
+
+        if candidates:
+            result.recommendations = self._rank_candidates(
+                candidates, watchlist, positive_keywords, negative_keywords, top_n,
+                timings=result.timings
+            )
+
+        result.timings["total"] = _elapsed_ms(request_start)
+        observe_stages(result.timings, result.total_candidates)
+        if trace is not None:
+            trace.event(
+                "stream.done",
+                total_candidates=result.total_candidates,
+                returned=len(result.recommendations),
+                missing_keywords=result.missing_keywords,
+                timings_ms=result.timings,
+            )
+        yield {
+            "type": "final",
+            "recommendations": result.recommendations,
+            "keywords_used": result.keywords,
+            "negative_keywords": result.negative_keywords,
+            "total_candidates": result.total_candidates,
+            "cached_keywords": result.cached_keywords,
+            "missing_keywords": result.missing_keywords,
+            "timings_ms": result.timings,
+        }
+
+    async def get_similar_markets(
+        self,
+        market: Dict[str, Any],
+        limit: int = 3,
+        deadline_ms: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Find markets similar to a single source market.
+
+        Args:
+            market: The source market (must have a title).
+            limit: Number of similar markets to return.
+            deadline_ms: Optional budget; keywords not answered in time are skipped.
+
+        Returns:
+            Dict with the similar markets, source title, count, keywords used
+            and the keywords that were missing from the pool.
+        """
+        deadline = _deadline_at(deadline_ms)
+        title = market.get("title", "")
+        keywords = self._get_similar_keywords(title)
+
+        missing = []
+        candidates = await self._scattershot_search(keywords, deadline, missing) if keywords else {}
+        similar = self._rank_similar(candidates, market, limit) if candidates else []
+
+        return {
+            "similar": similar,
+            "source_market": title,
+            "count": len(similar),
+            "keywords_used": keywords,
+            "missing_keywords": missing
+        }
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark for the recommendation engine.
+
+Replays public-search responses from a fixture corpus (no network) through
+SearchRecommender directly and through the FastAPI app via an in-process
+ASGI client, for small, medium and very large watchlists. Reports
+throughput and p50/p95/p99 latency and saves the results as JSON so runs
+can be compared over time.
+
+Run with: python bench_recommendations.py [--iterations N] [--concurrency C]
+          [--corpus-markets M] [--responses recorded.json] [--output path]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from async_recommender import AsyncSearchRecommender
+from bench_snapshot import synthetic_events
+from cache import TTLCache
+from market_catalog import _CatalogIndex
+from result_cache import ResultCache
+from search_recommender import SearchRecommender, _parse_search_response
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DEFAULT_CORPUS = os.path.join(FIXTURE_DIR, "gamma_events_sample.json")
+DEFAULT_RESPONSES = os.path.join(FIXTURE_DIR, "public_search_recorded.json")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_results")
+
+WATCHLIST_SIZES = {"small": 3, "medium": 25, "large": 250}
+
+
+class FixtureSearch:
+    """
+    Replays public-search responses without the network.
+
+    Recorded bodies (query -> raw public-search JSON) are served as-is;
+    other queries are answered from the corpus the way public-search does
+    (events matching every query token, by volume). Bodies are kept as
+    encoded JSON, so every call pays the same decode + normalize cost as a
+    real response.
+    """
+
+    def __init__(
+        self,
+        events: List[Dict[str, Any]],
+        recorded: Optional[Dict[str, Any]] = None,
+        results_per_query: int = 20,
+        latency_ms: float = 0.0
+    ):
+        """
+        Args:
+            events: Raw Gamma events to answer unrecorded queries from.
+            recorded: Optional {query: public-search body} recordings.
+            results_per_query: Events per response, like limit_per_type.
+            latency_ms: Simulated upstream latency added to each call.
+        """
+        self._raw_events = {str(e.get("id")): e for e in events}
+        self._index = _CatalogIndex.build(events)
+        self._bodies = {q: json.dumps(body).encode() for q, body in (recorded or {}).items()}
+        self.results_per_query = results_per_query
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def body(self, query: str) -> bytes:
+        """Encoded public-search response for a query."""
+        body = self._bodies.get(query)
+        if body is None:
+            event_ids = self._index.match(query, self.results_per_query)
+            body = json.dumps({"events": [self._raw_events[e] for e in event_ids]}).encode()
+            self._bodies[query] = body
+        return body
+
+    def __call__(self, query: str, dedupe_events: bool = True) -> List[Dict[str, Any]]:
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return _parse_search_response(json.loads(self.body(query)), query, dedupe_events)
+
+    async def search_async(self, query: str, dedupe_events: bool = True) -> List[Dict[str, Any]]:
+        """Async variant for AsyncSearchRecommender and the ASGI app."""
+        self.calls += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return _parse_search_response(json.loads(self.body(query)), query, dedupe_events)
+
+
+def load_corpus(path: str, synthetic_markets: int) -> List[Dict[str, Any]]:
+    """Fixture events plus deterministic synthetic events for a realistic pool size."""
+    with open(path) as f:
+        data = json.load(f)
+    events = data.get("events", []) if isinstance(data, dict) else data
+    if synthetic_markets:
+        events = events + synthetic_events(synthetic_markets)
+    return events
+
+
+def make_watchlists(events: List[Dict[str, Any]], seed: int = 7) -> Dict[str, List[Dict[str, Any]]]:
+    """Small/medium/large watchlists sampled from the corpus markets."""
+    markets = [
+        {"id": str(m["id"]), "title": m.get("question") or e.get("title", ""), "volume": float(m.get("volume") or 0)}
+        for e in events for m in e.get("markets", [])
+    ]
+    rng = random.Random(seed)
+    return {name: rng.sample(markets, min(size, len(markets))) for name, size in WATCHLIST_SIZES.items()}
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies_s: List[float], wall_s: float) -> Dict[str, float]:
+    """Throughput and latency percentiles (milliseconds) for one scenario."""
+    values = sorted(latencies_s)
+    return {
+        "requests": len(values),
+        "throughput_rps": len(values) / wall_s if wall_s > 0 else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "mean_ms": sum(values) / len(values) * 1000 if values else 0.0,
+    }
+
+
+def bench_sync(call: Callable[[], Any], iterations: int) -> Dict[str, float]:
+    """Time `iterations` sequential calls."""
+    call()  # warm up tokenizer and parse caches
+    latencies = []
+    wall_start = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, time.perf_counter() - wall_start)
+
+
+async def bench_async(call: Callable[[], Any], iterations: int, concurrency: int) -> Dict[str, float]:
+    """Time `iterations` coroutine calls, `concurrency` at a time."""
+    await call()
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await call()
+            latencies.append(time.perf_counter() - start)
+            if isinstance(response, httpx.Response):
+                response.raise_for_status()
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(iterations)))
+    return summarize(latencies, time.perf_counter() - wall_start)
+
+
+def run_direct(search: FixtureSearch, watchlists, iterations: int, use_cache: bool) -> Dict[str, Any]:
+    """SearchRecommender called in-process, no HTTP layer."""
+    results = {}
+    cache = TTLCache(ttl=3600) if use_cache else None
+    recommender = SearchRecommender(search_func=search, debug=False, cache=cache)
+    for name, watchlist in watchlists.items():
+        results[f"recommendations/{name}"] = bench_sync(
+            lambda: recommender.get_recommendations(watchlist, top_n=10), iterations
+        )
+    results["similar"] = bench_sync(
+        lambda: recommender.get_similar_markets(watchlists["small"][0], limit=3), iterations
+    )
+    return results
+
+
+async def run_asgi(search: FixtureSearch, watchlists, iterations: int, concurrency: int, use_cache: bool) -> Dict[str, Any]:
+    """
+    The FastAPI app through an in-process ASGI client. The response cache is
+    only on with use_cache, so by default every request is recomputed.
+    """
+    import main
+
+    cache = TTLCache(ttl=3600) if use_cache else None
+    original = (main.recommender, main.result_cache)
+    main.recommender = AsyncSearchRecommender(search_func=search.search_async, debug=False, cache=cache)
+    main.result_cache = ResultCache() if use_cache else ResultCache(TTLCache(ttl=0, stale_ttl=0))
+
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for name, watchlist in watchlists.items():
+                body = {"watchlist": watchlist, "disliked_items": watchlist[:1]}
+                results[f"/api/recommendations/{name}"] = await bench_async(
+                    lambda body=body: client.post("/api/recommendations", json=body), iterations, concurrency
+                )
+            similar_body = {"market": watchlists["small"][0], "limit": 3}
+            results["/api/similar"] = await bench_async(
+                lambda: client.post("/api/similar", json=similar_body), iterations, concurrency
+            )
+            results["/api/search"] = await bench_async(
+                lambda: client.get("/api/search/bitcoin"), iterations, concurrency
+            )
+    finally:
+        main.recommender, main.result_cache = original
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_table(title: str, results: Dict[str, Dict[str, float]]) -> None:
+    print(f"\n{title}")
+    print(f"{'scenario':36} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in results.items():
+        print(f"{name:36} {r['throughput_rps']:9.1f} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['p99_ms']:9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Raw Gamma events JSON")
+    parser.add_argument("--corpus-markets", type=int, default=4000, help="Synthetic markets added to the corpus")
+    parser.add_argument("--responses", default=DEFAULT_RESPONSES, help="Recorded {query: public-search body} JSON")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated upstream latency per call")
+    parser.add_argument("--cache", action="store_true", help="Put a TTLCache in front of the fixture search and enable the API response cache")
+    parser.add_argument("--output", help="Results JSON path (default bench_results/recommendations-<time>.json)")
+    args = parser.parse_args()
+
+    events = load_corpus(args.corpus, args.corpus_markets)
+    recorded = None
+    if args.responses:
+        with open(args.responses) as f:
+            recorded = json.load(f)
+    search = FixtureSearch(events, recorded=recorded, latency_ms=args.latency_ms)
+    watchlists = make_watchlists(events)
+
+    print("=" * 60)
+    print(f"RECOMMENDATION BENCHMARK ({sum(len(e.get('markets', [])) for e in events):,} corpus markets, "
+          f"{args.iterations} iterations)")
+    print("=" * 60)
+
+    direct = run_direct(search, watchlists, args.iterations, args.cache)
+    print_table("SearchRecommender (in-process)", direct)
+
+    asgi = asyncio.run(run_asgi(search, watchlists, args.iterations, args.concurrency, args.cache))
+    print_table(f"FastAPI via ASGI (concurrency {args.concurrency})", asgi)
+
+    report = {
+        "created_at": time.time(),
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {**vars(args), "watchlist_sizes": WATCHLIST_SIZES},
+        "direct": direct,
+        "asgi": asgi,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"recommendations-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark snapshot save/restore time for a large synthetic catalog.
+Run with: python bench_snapshot.py [num_markets]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from market_catalog import MarketCatalog
+from snapshot import load_snapshot, save_snapshot
+
+WORDS = [
+    "bitcoin", "ethereum", "solana", "trump", "senate", "house", "election",
+    "nba", "nfl", "lakers", "celtics", "chiefs", "fed", "rates", "openai",
+    "nvidia", "apple", "tesla", "oscar", "grammy", "taylor", "swift", "china",
+    "ukraine", "russia", "israel", "recession", "inflation", "gdp", "tariffs",
+]
+
+
+def synthetic_events(num_markets: int, markets_per_event: int = 4):
+    """Generate Gamma-shaped events with random titles, volumes and dates."""
+    rng = random.Random(42)
+    events = []
+    for e in range(num_markets // markets_per_event):
+        topic = " ".join(rng.sample(WORDS, 3))
+        events.append({
+            "id": f"ev{e}",
+            "title": f"{topic} event {e}",
+            "slug": f"event-{e}",
+            "image": "",
+            "createdAt": "2026-01-01T00:00:00Z",
+            "endDate": "2026-12-31T00:00:00Z",
+            "markets": [
+                {
+                    "id": f"m{e}-{i}",
+                    "question": f"Will {topic} happen by option {i}?",
+                    "volume": str(rng.uniform(0, 5_000_000)),
+                }
+                for i in range(markets_per_event)
+            ],
+        })
+    return events
+
+
+def main():
+    num_markets = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    print("=" * 60)
+    print(f"SNAPSHOT BENCHMARK ({num_markets:,} markets)")
+    print("=" * 60)
+
+    catalog = MarketCatalog()
+    start = time.perf_counter()
+    catalog.ingest(synthetic_events(num_markets))
+    print(f"Ingest from raw events:  {time.perf_counter() - start:.2f}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snapshot.db")
+
+        start = time.perf_counter()
+        save_snapshot(path, catalog)
+        print(f"Save snapshot:           {time.perf_counter() - start:.2f}s "
+              f"({os.path.getsize(path) / 1e6:.1f} MB)")
+
+        restored = MarketCatalog()
+        start = time.perf_counter()
+        info = load_snapshot(path, restored)
+        print(f"Load snapshot (startup): {time.perf_counter() - start:.2f}s "
+              f"({info['events']:,} events)")
+
+    assert restored.stats()["markets"] == catalog.stats()["markets"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+"""
+TTLCache: bounded in-process cache for Gamma search results.
+
+Entries expire after a TTL, the least recently used ones are evicted once the
+entry or byte budget is exceeded, and entries that are only slightly stale are
+served immediately while a background refresh fetches a fresh copy
+(stale-while-revalidate).
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from tracing import current_trace
+
+# Background refreshes for sync callers run here so request threads never wait on them
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+_refresh_lock = threading.Lock()
+_refresh_waiting = 0
+
+
+def _submit_refresh(fn: Callable, *args) -> None:
+    """Run fn(*args) on the refresh executor, counting it as waiting until a worker picks it up."""
+    global _refresh_waiting
+    with _refresh_lock:
+        _refresh_waiting += 1
+
+    def run():
+        global _refresh_waiting
+        with _refresh_lock:
+            _refresh_waiting -= 1
+        fn(*args)
+
+    _refresh_executor.submit(run)
+
+
+def refresh_queue_depth() -> int:
+    """Number of stale-while-revalidate refreshes waiting for a worker thread."""
+    with _refresh_lock:
+        return _refresh_waiting
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate the memory cost of a cached value by its JSON-encoded length.
+
+    Args:
+        value: Any JSON-serializable value (e.g. a list of market dicts).
+
+    Returns:
+        Size estimate in bytes.
+    """
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class CacheEntry:
+    """A cached value with its size and the wall-clock time it was stored."""
+
+    __slots__ = ("value", "size", "stored_at")
+
+    def __init__(self, value: Any, size: int, stored_at: float):
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+
+
+class TTLCache:
+    """
+    Thread-safe TTL + LRU cache with byte-size accounting and
+    stale-while-revalidate support.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl: float = 300.0,
+        stale_ttl: float = 600.0,
+        clock: Callable[[], float] = time.time,
+        sizeof: Callable[[Any], int] = estimate_size
+    ):
+        """
+        Initialize the TTLCache.
+
+        Args:
+            max_entries: Maximum number of entries before LRU eviction.
+            max_bytes: Maximum total estimated size before LRU eviction.
+            ttl: Seconds an entry is considered fresh.
+            stale_ttl: Extra seconds past the TTL during which a stale entry is
+                       still served while it is refreshed in the background.
+                       0 disables stale-while-revalidate.
+            clock: Wall-clock time source (wall time so entries can be persisted).
+            sizeof: Function estimating the size of a value in bytes.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self.sizeof = sizeof
+
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._bytes = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    @classmethod
+    def from_env(cls, prefix: str = "SEARCH_CACHE") -> "TTLCache":
+        """
+        Build a cache from <prefix>_* environment variables
+        (TTL, STALE_TTL, MAX_ENTRIES, MAX_BYTES).
+        """
+        return cls(
+            max_entries=int(os.environ.get(f"{prefix}_MAX_ENTRIES", 2048)),
+            max_bytes=int(os.environ.get(f"{prefix}_MAX_BYTES", 32 * 1024 * 1024)),
+            ttl=float(os.environ.get(f"{prefix}_TTL", 300.0)),
+            stale_ttl=float(os.environ.get(f"{prefix}_STALE_TTL", 600.0)),
+        )
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[Any], str]:
+        """
+        Look up a key and classify the result.
+
+        Args:
+            key: Cache key.
+
+        Returns:
+            (value, state) where state is "fresh", "stale" (servable but due
+            for a refresh) or "miss" (value is None).
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, "miss"
+
+            age = now - entry.stored_at
+            if age <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value, "fresh"
+
+            if age <= self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                return entry.value, "stale"
+
+            # Too old to serve at all
+            self._remove(key)
+            self.misses += 1
+            return None, "miss"
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a fresh or stale value for key, or default."""
+        value, state = self.lookup(key)
+        return default if state == "miss" else value
+
+    def is_fresh(self, key: Hashable) -> bool:
+        """Check whether key holds a fresh entry, without touching counters or LRU order."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and self.clock() - entry.stored_at <= self.ttl
+
+    def set(self, key: Hashable, value: Any, stored_at: Optional[float] = None) -> None:
+        """
+        Store a value, evicting least recently used entries if over budget.
+
+        Args:
+            key: Cache key.
+            value: Value to cache.
+            stored_at: Wall-clock time the value was produced (defaults to now).
+        """
+        size = self.sizeof(value)
+        entry = CacheEntry(value, size, self.clock() if stored_at is None else stored_at)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single key if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def items(self) -> List[Tuple[Hashable, CacheEntry]]:
+        """Snapshot of (key, entry) pairs, least recently used first."""
+        with self._lock:
+            return list(self._entries.items())
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove a key and its byte accounting. Caller holds the lock."""
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _begin_refresh(self, key: Hashable) -> bool:
+        """Claim the background refresh for key; False if one is already running."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.refreshes += 1
+            return True
+
+    def _end_refresh(self, key: Hashable) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dict with hits, stale hits, misses, evictions, refreshes, hit ratio,
+            entry count and estimated bytes.
+        """
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refreshes": self.refreshes,
+                "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def search_call_args(query: str, dedupe_events: bool) -> Tuple[tuple, dict]:
+    """
+    Build call arguments for a wrapped search function. dedupe_events is only
+    passed when it isn't the default, so plain search_func(query) callables
+    can be wrapped too.
+    """
+    if dedupe_events:
+        return (query,), {}
+    return (query,), {"dedupe_events": False}
+
+
+def cached_search(search_func: Callable, cache: TTLCache) -> Callable:
+    """
+    Wrap a sync search function (query, dedupe_events=True) with a TTLCache.
+
+    Stale entries are returned immediately and refreshed on a background
+    thread. Empty results aren't cached, since search_gamma_api also returns
+    [] when the upstream call fails.
+
+    Args:
+        search_func: Function with the search_gamma_api signature.
+        cache: Cache shared by every caller of the wrapped function.
+
+    Returns:
+        Cached function with the same signature.
+    """
+    def refresh(query: str, dedupe_events: bool, key: Tuple[str, bool]) -> None:
+        try:
+            args, kwargs = search_call_args(query, dedupe_events)
+            results = search_func(*args, **kwargs)
+            if results:
+                cache.set(key, results)
+        except Exception:
+            pass  # e.g. throttled: keep serving the stale entry until a refresh succeeds
+        finally:
+            cache._end_refresh(key)
+
+    def search(query: str, dedupe_events: bool = True) -> List[Dict[str, Any]]:
+        key = (query, dedupe_events)
+        value, state = cache.lookup(key)
+        trace = current_trace()
+        if trace is not None:
+            trace.debug("cache.lookup", query=query, state=state)
+
+        if state == "fresh":
+            return value
+        if state == "stale":
+            if cache._begin_refresh(key):
+                _submit_refresh(refresh, query, dedupe_events, key)
+            return value
+
+        args, kwargs = search_call_args(query, dedupe_events)
+        results = search_func(*args, **kwargs)
+        if results:
+            cache.set(key, results)
+        return results
+
+    search.cache = cache
+    search.__wrapped__ = search_func
+    return search
+
+
+def cached_search_async(search_func: Callable, cache: TTLCache) -> Callable:
+    """
+    Async counterpart of cached_search. Stale entries are refreshed in a
+    background task on the running event loop.
+
+    Args:
+        search_func: Coroutine function with the search_gamma_api signature.
+        cache: Cache shared by every caller of the wrapped function.
+
+    Returns:
+        Cached coroutine function with the same signature.
+    """
+    background_tasks = set()
+
+    async def refresh(query: str, dedupe_events: bool, key: Tuple[str, bool]) -> None:
+        try:
+            args, kwargs = search_call_args(query, dedupe_events)
+            results = await search_func(*args, **kwargs)
+            if results:
+                cache.set(key, results)
+        except Exception:
+            pass  # e.g. throttled: keep serving the stale entry until a refresh succeeds
+        finally:
+            cache._end_refresh(key)
+
+    async def search(query: str, dedupe_events: bool = True) -> List[Dict[str, Any]]:
+        key = (query, dedupe_events)
+        value, state = cache.lookup(key)
+        trace = current_trace()
+        if trace is not None:
+            trace.debug("cache.lookup", query=query, state=state)
+
+        if state == "fresh":
+            return value
+        if state == "stale":
+            if cache._begin_refresh(key):
+                # Keep a reference so the task isn't garbage collected mid-flight
+                task = asyncio.get_running_loop().create_task(refresh(query, dedupe_events, key))
+                background_tasks.add(task)
+                task.add_done_callback(background_tasks.discard)
+            return value
+
+        args, kwargs = search_call_args(query, dedupe_events)
+        results = await search_func(*args, **kwargs)
+        if results:
+            cache.set(key, results)
+        return results
+
+    search.cache = cache
+    search.__wrapped__ = search_func
+    return search
+
+
+def wrap_search(search_func: Callable, cache: TTLCache) -> Callable:
+    """Wrap a sync or async search function with the matching cache wrapper."""
+    if asyncio.iscoroutinefunction(search_func):
+        return cached_search_async(search_func, cache)
+    return cached_search(search_func, cache)
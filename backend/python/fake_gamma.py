@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Polymarket Gamma API, with latency and fault injection.
+
+Serves /public-search and /events from a fixture corpus so load tests run
+the real search_gamma_api code path (HTTP client, pool, parsing) without
+touching Polymarket. Latency, server errors, 429 throttling and slow bodies
+are configurable at startup and can be changed at runtime via PUT /_faults.
+
+Run with:
+    python fake_gamma.py --port 8100 --latency-ms 80 --latency-dist lognormal --throttle-rate 0.05
+    GAMMA_BASE_URL=http://127.0.0.1:8100 uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from market_catalog import _CatalogIndex
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "gamma_events_sample.json")
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+# FaultConfig fields that aren't floats, for parsing env vars
+_FIELD_TYPES = {"latency_dist": str, "error_status": int, "max_in_flight": int, "seed": int}
+
+
+@dataclass
+class FaultConfig:
+    """
+    Latency and failure behaviour of the fake server. Rates are per request
+    probabilities, checked in order: throttle, error, slow body.
+    """
+
+    latency_ms: float = 0.0        # fixed value, uniform center, or lognormal median
+    latency_dist: str = "fixed"    # fixed | uniform | lognormal
+    latency_spread: float = 0.0    # uniform: +/- ms; lognormal: sigma
+    error_rate: float = 0.0        # fraction answered with error_status
+    error_status: int = 500
+    throttle_rate: float = 0.0     # fraction answered with 429
+    max_in_flight: int = 0         # 429 once this many requests are in flight (0 = unlimited)
+    retry_after: float = 1.0       # Retry-After seconds on 429s
+    slow_body_rate: float = 0.0    # fraction whose body is trickled out
+    slow_body_ms: float = 0.0      # total time spent sending a slow body
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls, prefix: str = "FAKE_GAMMA") -> "FaultConfig":
+        """Build a config from {prefix}_LATENCY_MS, {prefix}_ERROR_RATE, etc."""
+        values = {}
+        for f in fields(cls):
+            raw = os.environ.get(f"{prefix}_{f.name.upper()}")
+            if raw is not None:
+                values[f.name] = _FIELD_TYPES.get(f.name, float)(raw)
+        return cls(**values)
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Draw one response delay in seconds."""
+        if self.latency_dist == "uniform":
+            ms = rng.uniform(self.latency_ms - self.latency_spread, self.latency_ms + self.latency_spread)
+        elif self.latency_dist == "lognormal" and self.latency_ms > 0:
+            ms = rng.lognormvariate(math.log(self.latency_ms), self.latency_spread)
+        else:
+            ms = self.latency_ms
+        return max(ms, 0.0) / 1000
+
+
+class FakeGamma:
+    """Fixture corpus, fault config and request counters behind the fake app."""
+
+    def __init__(self, events: List[Dict[str, Any]], config: Optional[FaultConfig] = None):
+        self.events = events
+        self._raw_events = {str(e.get("id")): e for e in events}
+        self._index = _CatalogIndex.build(events)
+        self.config = config or FaultConfig()
+        self.rng = random.Random(self.config.seed)
+        self.in_flight = 0
+        self.counts: Dict[str, int] = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0, "slow_bodies": 0}
+
+    def search(self, query: str, limit: int) -> Dict[str, Any]:
+        """public-search body: raw events matching every query token, by volume."""
+        event_ids = self._index.match(query, limit)
+        return {
+            "events": [self._raw_events[e] for e in event_ids],
+            "pagination": {"hasMore": False, "totalResults": len(event_ids)},
+        }
+
+    def page(self, limit: int, offset: int) -> List[Dict[str, Any]]:
+        """One /events page, in corpus order."""
+        return self.events[offset:offset + limit]
+
+    async def respond(self, body: Any) -> Response:
+        """Apply the configured latency and faults to a response body."""
+        config = self.config
+        self.counts["requests"] += 1
+        self.in_flight += 1
+        try:
+            if (config.max_in_flight and self.in_flight > config.max_in_flight) or self.rng.random() < config.throttle_rate:
+                self.counts["throttled"] += 1
+                return JSONResponse(
+                    {"error": "rate limited"}, status_code=429,
+                    headers={"Retry-After": f"{config.retry_after:g}"}
+                )
+
+            await asyncio.sleep(config.sample_latency(self.rng))
+
+            if self.rng.random() < config.error_rate:
+                self.counts["errors"] += 1
+                return JSONResponse({"error": "injected failure"}, status_code=config.error_status)
+
+            payload = json.dumps(body).encode()
+            self.counts["ok"] += 1
+            if config.slow_body_ms and self.rng.random() < config.slow_body_rate:
+                self.counts["slow_bodies"] += 1
+                return StreamingResponse(
+                    _trickle(payload, config.slow_body_ms / 1000), media_type="application/json"
+                )
+            return Response(payload, media_type="application/json")
+        finally:
+            self.in_flight -= 1
+
+
+async def _trickle(payload: bytes, duration: float, chunks: int = 10):
+    """Yield the body in chunks spread over `duration` seconds."""
+    size = max(1, math.ceil(len(payload) / chunks))
+    for i in range(0, len(payload), size):
+        await asyncio.sleep(duration / chunks)
+        yield payload[i:i + size]
+
+
+def create_app(events: List[Dict[str, Any]], config: Optional[FaultConfig] = None) -> FastAPI:
+    """
+    Build the fake Gamma app.
+
+    Args:
+        events: Raw Gamma events to serve.
+        config: Initial fault configuration (defaults to no latency or faults).
+
+    Returns:
+        FastAPI app; its FakeGamma state is at app.state.gamma.
+    """
+    gamma = FakeGamma(events, config)
+    app = FastAPI(title="Fake Gamma API")
+    app.state.gamma = gamma
+
+    @app.get("/public-search")
+    async def public_search(q: str = "", limit_per_type: int = 20):
+        return await gamma.respond(gamma.search(q, limit_per_type))
+
+    @app.get("/events")
+    async def list_events(
+        limit: int = 500,
+        offset: int = 0,
+        active: Optional[str] = Query(None),
+        closed: Optional[str] = Query(None)
+    ):
+        return await gamma.respond(gamma.page(limit, offset))
+
+    @app.get("/_faults")
+    async def get_faults():
+        return asdict(gamma.config)
+
+    @app.put("/_faults")
+    async def update_faults(request: Request):
+        """Change fault settings at runtime; unknown keys are rejected."""
+        updates = await request.json()
+        unknown = set(updates) - {f.name for f in fields(FaultConfig)}
+        if unknown:
+            return JSONResponse({"error": f"unknown settings: {sorted(unknown)}"}, status_code=400)
+        gamma.config = FaultConfig(**{**asdict(gamma.config), **updates})
+        return asdict(gamma.config)
+
+    @app.get("/_stats")
+    async def stats():
+        return {**gamma.counts, "in_flight": gamma.in_flight}
+
+    return app
+
+
+def load_events(path: str, synthetic_markets: int = 0) -> List[Dict[str, Any]]:
+    """Fixture events (list or {"events": [...]}) plus optional synthetic ones."""
+    with open(path) as f:
+        data = json.load(f)
+    events = data.get("events", []) if isinstance(data, dict) else data
+    if synthetic_markets:
+        from bench_snapshot import synthetic_events
+        events = events + synthetic_events(synthetic_markets)
+    return events
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument("--synthetic-markets", type=int, default=0)
+    env = FaultConfig.from_env()
+    parser.add_argument("--latency-ms", type=float, default=env.latency_ms)
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default=env.latency_dist)
+    parser.add_argument("--latency-spread", type=float, default=env.latency_spread)
+    parser.add_argument("--error-rate", type=float, default=env.error_rate)
+    parser.add_argument("--error-status", type=int, default=env.error_status)
+    parser.add_argument("--throttle-rate", type=float, default=env.throttle_rate)
+    parser.add_argument("--max-in-flight", type=int, default=env.max_in_flight)
+    parser.add_argument("--retry-after", type=float, default=env.retry_after)
+    parser.add_argument("--slow-body-rate", type=float, default=env.slow_body_rate)
+    parser.add_argument("--slow-body-ms", type=float, default=env.slow_body_ms)
+    parser.add_argument("--seed", type=int, default=env.seed)
+    args = parser.parse_args()
+
+    config = FaultConfig(**{f.name: getattr(args, f.name) for f in fields(FaultConfig)})
+    events = load_events(args.fixture, args.synthetic_markets)
+    print(f"Fake Gamma serving {len(events)} events on http://{args.host}:{args.port} with {asdict(config)}")
+    uvicorn.run(create_app(events, config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Process-wide, bounded concurrency for the keyword fan-out.
+
+FanoutExecutor is one long-lived thread pool shared by every sync
+recommendation request, so the fan-out no longer spawns and tears down a
+pool per request. Its worker count is the global cap on concurrent searches,
+and its queue is FIFO, so requests are served in arrival order and none can
+starve another.
+
+AsyncFanoutLimiter is the asyncio counterpart: a FIFO semaphore that caps
+in-flight upstream calls across all requests on the event loop.
+
+Both report queue depth, in-flight work and queue wait time to /metrics.
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from cache import search_call_args
+from metrics import FANOUT_WAIT, REGISTRY
+
+
+class FanoutExecutor:
+    """
+    Bounded thread pool for search fan-out, shared across requests.
+
+    Tasks run in a copy of the submitter's context, so request tracing
+    follows them onto the worker threads.
+    """
+
+    def __init__(self, max_workers: int = 32, name: str = "fanout"):
+        """
+        Initialize the FanoutExecutor. Threads are started on demand, up to
+        max_workers, and then reused.
+
+        Args:
+            max_workers: Maximum concurrent searches across all requests.
+            name: Thread name prefix and metrics label.
+        """
+        self.max_workers = max_workers
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        self._submitted = 0
+
+    @classmethod
+    def from_env(cls) -> "FanoutExecutor":
+        """Build an executor sized by FANOUT_MAX_WORKERS (default 32)."""
+        return cls(max_workers=int(os.environ.get("FANOUT_MAX_WORKERS", 32)))
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Queue fn(*args, **kwargs) behind any earlier submissions.
+
+        Returns:
+            Future with the call's result.
+        """
+        enqueued = time.perf_counter()
+        context = contextvars.copy_context()
+        with self._lock:
+            self._queued += 1
+            self._submitted += 1
+
+        def run():
+            FANOUT_WAIT.observe(time.perf_counter() - enqueued, self.name)
+            with self._lock:
+                self._queued -= 1
+                self._in_flight += 1
+            try:
+                return context.run(fn, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+        future = self._executor.submit(run)
+        future.add_done_callback(self._release_cancelled)
+        return future
+
+    def _release_cancelled(self, future: Future) -> None:
+        """A future cancelled while still queued never runs, so take it off the queue count here."""
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get queue and worker usage.
+
+        Returns:
+            Dict with max_workers, queued, in_flight and submitted.
+        """
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "in_flight": self._in_flight,
+                "submitted": self._submitted,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker threads (after queued tasks finish if wait)."""
+        self._executor.shutdown(wait=wait)
+
+
+class AsyncFanoutLimiter:
+    """
+    FIFO cap on concurrent upstream calls on an event loop. Waiters are
+    admitted in the order they arrived (asyncio.Semaphore is fair).
+    """
+
+    def __init__(self, max_in_flight: int = 32, name: str = "async"):
+        """
+        Initialize the AsyncFanoutLimiter.
+
+        Args:
+            max_in_flight: Maximum concurrent upstream calls per event loop.
+            name: Metrics label.
+        """
+        self.max_in_flight = max_in_flight
+        self.name = name
+        # One semaphore per loop, so the limiter survives asyncio.run() in tests/scripts
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self._queued = 0
+        self._in_flight = 0
+        self._calls = 0
+
+    @classmethod
+    def from_env(cls) -> "AsyncFanoutLimiter":
+        """Build a limiter sized by FANOUT_MAX_IN_FLIGHT (default 32)."""
+        return cls(max_in_flight=int(os.environ.get("FANOUT_MAX_IN_FLIGHT", 32)))
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_in_flight)
+        return semaphore
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Await fn(*args, **kwargs) once a slot is free."""
+        semaphore = self._semaphore()
+        enqueued = time.perf_counter()
+        self._queued += 1
+        self._calls += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._queued -= 1
+        FANOUT_WAIT.observe(time.perf_counter() - enqueued, self.name)
+
+        self._in_flight += 1
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            self._in_flight -= 1
+            semaphore.release()
+
+    def wrap(self, search_func: Callable) -> Callable:
+        """Limit an async search function (query, dedupe_events=True)."""
+        async def search(query: str, dedupe_events: bool = True) -> List[Dict[str, Any]]:
+            args, kwargs = search_call_args(query, dedupe_events)
+            return await self.run(search_func, *args, **kwargs)
+
+        search.__wrapped__ = search_func
+        return search
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get queue and slot usage.
+
+        Returns:
+            Dict with max_in_flight, queued, in_flight and calls.
+        """
+        return {
+            "max_in_flight": self.max_in_flight,
+            "queued": self._queued,
+            "in_flight": self._in_flight,
+            "calls": self._calls,
+        }
+
+
+_shared_lock = threading.Lock()
+_shared_executor: Optional[FanoutExecutor] = None
+_shared_limiter: Optional[AsyncFanoutLimiter] = None
+
+
+def shared_executor() -> FanoutExecutor:
+    """The process-wide FanoutExecutor (created on first use)."""
+    global _shared_executor
+    with _shared_lock:
+        if _shared_executor is None:
+            _shared_executor = FanoutExecutor.from_env()
+        return _shared_executor
+
+
+def shared_limiter() -> AsyncFanoutLimiter:
+    """The process-wide AsyncFanoutLimiter (created on first use)."""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = AsyncFanoutLimiter.from_env()
+        return _shared_limiter
+
+
+def _shared_stat(key: str) -> Dict[tuple, int]:
+    values = {}
+    if _shared_executor is not None:
+        values[(_shared_executor.name,)] = _shared_executor.stats()[key]
+    if _shared_limiter is not None:
+        values[(_shared_limiter.name,)] = _shared_limiter.stats()[key]
+    return values
+
+
+REGISTRY.gauge_func(
+    "polyflix_fanout_queue_depth", "Searches waiting for a fan-out slot.",
+    lambda: _shared_stat("queued"), ("pool",)
+)
+REGISTRY.gauge_func(
+    "polyflix_fanout_in_flight", "Searches currently holding a fan-out slot.",
+    lambda: _shared_stat("in_flight"), ("pool",)
+)
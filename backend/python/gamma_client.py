@@ -0,0 +1,186 @@
+"""
+GammaClient / AsyncGammaClient: shared, pooled HTTP clients for the Polymarket Gamma API.
+
+Keeps TCP/TLS connections to gamma-api.polymarket.com warm across requests so
+the keyword fan-out in SearchRecommender._scattershot_search doesn't pay a new
+handshake for every query.
+"""
+
+import os
+import threading
+from typing import List, Dict, Any
+
+import httpx
+
+from search_recommender import search_gamma_api, search_gamma_api_async
+
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]")
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class _BaseGammaClient:
+    """Pool configuration shared by the sync and async Gamma clients."""
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 10.0,
+        http2: bool = True,
+        transport=None
+    ):
+        """
+        Initialize the client. No connections are opened until open()
+        is called or the first search is made.
+
+        Args:
+            max_connections: Maximum number of concurrent connections in the pool.
+            max_keepalive_connections: Idle connections kept alive for reuse.
+            keepalive_expiry: Seconds an idle connection is kept before closing.
+            timeout: Per-request timeout in seconds.
+            http2: Whether to negotiate HTTP/2 (ignored if `h2` isn't installed).
+            transport: Optional httpx transport, mainly for tests.
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.transport = transport
+        self._client = None
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a client from GAMMA_* environment variables, falling back
+        to the defaults for anything that isn't set.
+        """
+        return cls(
+            max_connections=int(os.environ.get("GAMMA_MAX_CONNECTIONS", 20)),
+            max_keepalive_connections=int(os.environ.get("GAMMA_MAX_KEEPALIVE", 10)),
+            keepalive_expiry=float(os.environ.get("GAMMA_KEEPALIVE_EXPIRY", 30.0)),
+            timeout=float(os.environ.get("GAMMA_TIMEOUT", 10.0)),
+            http2=os.environ.get("GAMMA_HTTP2", "1") != "0",
+        )
+
+
+class GammaClient(_BaseGammaClient):
+    """
+    Lifecycle-managed, connection-pooled client for Gamma searches.
+
+    One instance is meant to be shared by the whole process: httpx.Client is
+    thread-safe, so every request and every fan-out worker thread reuses the
+    same pool of keep-alive connections.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+
+    def open(self) -> httpx.Client:
+        """
+        Create the underlying connection pool if it doesn't exist yet.
+
+        Returns:
+            The shared httpx.Client.
+        """
+        with self._lock:
+            if self._client is None or self._client.is_closed:
+                self._client = httpx.Client(
+                    limits=self.limits,
+                    timeout=self.timeout,
+                    http2=self.http2,
+                    transport=self.transport,
+                )
+            return self._client
+
+    def close(self) -> None:
+        """Close the pool and drop all keep-alive connections."""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    @property
+    def client(self) -> httpx.Client:
+        """The shared httpx.Client, opened lazily on first use."""
+        client = self._client
+        if client is None or client.is_closed:
+            client = self.open()
+        return client
+
+    def search(self, query: str, dedupe_events: bool = True, raise_errors: bool = False) -> List[Dict[str, Any]]:
+        """
+        Drop-in replacement for search_gamma_api that uses the shared pool.
+        Suitable for SearchRecommender(search_func=client.search).
+        """
+        return search_gamma_api(query, dedupe_events=dedupe_events, client=self.client, raise_errors=raise_errors)
+
+    def __enter__(self) -> "GammaClient":
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class AsyncGammaClient(_BaseGammaClient):
+    """
+    Event-loop counterpart of GammaClient built on httpx.AsyncClient.
+
+    Used by AsyncSearchRecommender so upstream calls never block the
+    uvicorn event loop.
+    """
+
+    def open(self) -> httpx.AsyncClient:
+        """
+        Create the underlying connection pool if it doesn't exist yet.
+
+        Returns:
+            The shared httpx.AsyncClient.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+                transport=self.transport,
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Close the pool and drop all keep-alive connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared httpx.AsyncClient, opened lazily on first use."""
+        client = self._client
+        if client is None or client.is_closed:
+            client = self.open()
+        return client
+
+    async def search(self, query: str, dedupe_events: bool = True, raise_errors: bool = False) -> List[Dict[str, Any]]:
+        """
+        Async drop-in for search_gamma_api that uses the shared pool.
+        Suitable for AsyncSearchRecommender(search_func=client.search).
+        """
+        return await search_gamma_api_async(
+            query, dedupe_events=dedupe_events, client=self.client, raise_errors=raise_errors
+        )
+
+    async def __aenter__(self) -> "AsyncGammaClient":
+        self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
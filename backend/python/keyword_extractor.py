@@ -0,0 +1,401 @@
+"""
+Gemini keyword extraction with a shared model client, a result cache and a
+latency budget.
+
+The google-generativeai model is configured and built once per extractor
+instead of on every request. Results are cached under a fingerprint of the
+normalized title set, so a watchlist seen recently costs no LLM call, and
+the cache is persisted with the other snapshot state (see snapshot.py).
+Calls that miss the budget return None so the caller falls back to the
+heuristic keywords. In race mode the late call keeps running and caches its
+answer for the next request with the same titles.
+
+Any object with generate(prompt) -> str and async generate_async(prompt) ->
+str can stand in for the Gemini client; StubKeywordModel is a local one for
+tests.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from cache import TTLCache
+from tracing import current_trace
+
+# Gemini setup - uses free tier
+try:
+    import google.generativeai as genai
+    GEMINI_AVAILABLE = True
+except ImportError:
+    GEMINI_AVAILABLE = False
+    genai = None
+
+DEFAULT_GEMINI_MODEL = "gemini-1.5-flash"
+
+# Blocking model calls from sync callers run here so they can be timed out
+_gemini_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="gemini")
+
+
+def build_prompt(titles: List[str], num_keywords: int) -> str:
+    """The keyword extraction prompt for a set of watchlist titles."""
+    return f"""You are helping find prediction markets similar to a user's watchlist.
+
+Given these prediction market titles from a user's watchlist:
+{chr(10).join(f'- {title}' for title in titles)}
+
+Extract {num_keywords} search keywords/phrases that would find SIMILAR prediction markets.
+
+Rules:
+- Focus on topics, entities, and themes (e.g., "NBA", "Bitcoin", "Trump", "Oscar")
+- Include both broad categories and specific entities
+- Do NOT include numbers, dates, prices, or years
+- Do NOT include generic words like "win", "price", "above", "prediction"
+- Each keyword should be 1-3 words
+
+Return ONLY a JSON array of strings, nothing else. Example: ["NBA finals", "Lakers", "basketball championship"]"""
+
+
+def parse_keywords(text: str, num_keywords: int) -> Optional[List[str]]:
+    """
+    Parse the model's reply into keywords.
+
+    Args:
+        text: Raw reply, a JSON array of strings (optionally in a markdown code block).
+        num_keywords: Maximum number of keywords to keep.
+
+    Returns:
+        List of keywords, or None if the reply isn't a JSON array of strings.
+    """
+    text = text.strip()
+
+    # Handle markdown code blocks if present
+    if text.startswith("```"):
+        text = text.split("```")[1]
+        if text.startswith("json"):
+            text = text[4:]
+        text = text.strip()
+
+    try:
+        keywords = json.loads(text)
+    except ValueError:
+        keywords = None
+
+    if isinstance(keywords, list) and all(isinstance(k, str) for k in keywords):
+        return keywords[:num_keywords]
+    print(f"Gemini returned unexpected format: {text}")
+    return None
+
+
+def titles_fingerprint(titles: List[str], num_keywords: int) -> str:
+    """
+    Cache key for a title set: titles are lowercased, whitespace-collapsed,
+    deduplicated and sorted, so order and formatting don't matter.
+
+    Returns:
+        32-character hex digest.
+    """
+    normalized = sorted({" ".join(title.lower().split()) for title in titles})
+    encoded = json.dumps([num_keywords, normalized], separators=(",", ":"), ensure_ascii=False).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class GeminiModel:
+    """google-generativeai client, configured and built once."""
+
+    def __init__(self, api_key: str, model_name: str = DEFAULT_GEMINI_MODEL):
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+    async def generate_async(self, prompt: str) -> str:
+        return (await self.model.generate_content_async(prompt)).text
+
+
+class StubKeywordModel:
+    """
+    Local stand-in for GeminiModel: answers with a canned reply (or
+    reply(prompt) if callable) after an optional delay, or raises error.
+    """
+
+    def __init__(
+        self,
+        reply: Union[str, Callable[[str], str]] = '["bitcoin", "ethereum"]',
+        delay: float = 0.0,
+        error: Optional[Exception] = None
+    ):
+        self.reply = reply
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def _answer(self, prompt: str) -> str:
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.reply(prompt) if callable(self.reply) else self.reply
+
+    def generate(self, prompt: str) -> str:
+        time.sleep(self.delay)
+        return self._answer(prompt)
+
+    async def generate_async(self, prompt: str) -> str:
+        await asyncio.sleep(self.delay)
+        return self._answer(prompt)
+
+
+class KeywordExtractor:
+    """Cached, time-boxed LLM keyword extraction (see module docstring)."""
+
+    def __init__(
+        self,
+        model: Any = None,
+        api_key: Optional[str] = None,
+        model_name: str = DEFAULT_GEMINI_MODEL,
+        cache: Optional[TTLCache] = None,
+        timeout: Optional[float] = 2.0,
+        race: bool = True
+    ):
+        """
+        Initialize the KeywordExtractor.
+
+        Args:
+            model: Model client (see module docstring). Defaults to a
+                   GeminiModel built on first use, if the SDK and a key are available.
+            api_key: Gemini API key (falls back to GEMINI_API_KEY env var).
+            model_name: Gemini model for the default client.
+            cache: TTLCache for extracted keywords (default: 1 day, 10k title sets).
+            timeout: Seconds to wait for the model (None waits indefinitely).
+            race: If True, a call that misses the timeout keeps running and
+                  caches its keywords; if False it is cancelled (async) or
+                  its answer discarded (sync).
+        """
+        self.model = model
+        self.api_key = api_key
+        self.model_name = model_name
+        if cache is None:
+            cache = TTLCache(max_entries=10000, ttl=86400.0, stale_ttl=0.0)
+        self.cache = cache
+        self.timeout = timeout
+        self.race = race
+        self._model_checked = model is not None
+        self._lock = threading.Lock()
+        self._background = set()
+
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.late_answers = 0
+
+    @classmethod
+    def from_env(cls, api_key: Optional[str] = None, prefix: str = "GEMINI") -> "KeywordExtractor":
+        """
+        Build from <prefix>_MODEL, <prefix>_TIMEOUT_MS (default 2000, 0 = no
+        timeout), <prefix>_RACE (default 1), <prefix>_CACHE_TTL (seconds,
+        default 86400) and <prefix>_CACHE_MAX_ENTRIES (default 10000).
+        """
+        timeout_ms = float(os.environ.get(f"{prefix}_TIMEOUT_MS", 2000))
+        return cls(
+            api_key=api_key,
+            model_name=os.environ.get(f"{prefix}_MODEL", DEFAULT_GEMINI_MODEL),
+            cache=TTLCache(
+                max_entries=int(os.environ.get(f"{prefix}_CACHE_MAX_ENTRIES", 10000)),
+                ttl=float(os.environ.get(f"{prefix}_CACHE_TTL", 86400)),
+                stale_ttl=0.0,
+            ),
+            timeout=timeout_ms / 1000 if timeout_ms > 0 else None,
+            race=os.environ.get(f"{prefix}_RACE", "1") != "0",
+        )
+
+    def _get_model(self) -> Any:
+        """The model client, built once; None if Gemini is unavailable."""
+        if self._model_checked:
+            return self.model
+        with self._lock:
+            if not self._model_checked:
+                api_key = self.api_key or os.environ.get("GEMINI_API_KEY")
+                if not GEMINI_AVAILABLE:
+                    print("Gemini SDK not available, falling back to heuristic extraction")
+                elif not api_key:
+                    print("No GEMINI_API_KEY found, falling back to heuristic extraction")
+                else:
+                    try:
+                        self.model = GeminiModel(api_key, self.model_name)
+                    except Exception as e:
+                        print(f"Gemini setup failed: {e}")
+                self._model_checked = True
+        return self.model
+
+    def _lookup(self, titles: List[str], num_keywords: int):
+        """(cache key, cached keywords or None, model or None) for a request."""
+        key = titles_fingerprint(titles, num_keywords)
+        cached = self.cache.get(key)
+        model = None if cached is not None else self._get_model()
+        return key, cached, model
+
+    def _store(self, key: str, text: str, num_keywords: int, late: bool = False) -> Optional[List[str]]:
+        """Parse a reply and cache the keywords if it was usable."""
+        keywords = parse_keywords(text, num_keywords)
+        if keywords is not None:
+            self.cache.set(key, keywords)
+            if late:
+                self.late_answers += 1
+        return keywords
+
+    def _record(self, outcome: str, **fields) -> None:
+        trace = current_trace()
+        if trace is not None:
+            trace.event("keywords.gemini", outcome=outcome, **fields)
+
+    def extract(self, titles: List[str], num_keywords: int = 5) -> Optional[List[str]]:
+        """
+        Extract keywords, from the cache or the model within the timeout.
+
+        Args:
+            titles: Watchlist market titles.
+            num_keywords: Number of keywords to extract.
+
+        Returns:
+            List of keywords, or None if Gemini is unavailable, fails or is too slow.
+        """
+        key, cached, model = self._lookup(titles, num_keywords)
+        if cached is not None:
+            self._record("cached")
+            return cached
+        if model is None:
+            return None
+
+        self.calls += 1
+        future = _gemini_executor.submit(model.generate, build_prompt(titles, num_keywords))
+        try:
+            text = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.timeouts += 1
+            if self.race:
+                future.add_done_callback(lambda f: self._store_late(key, f, num_keywords))
+            else:
+                future.cancel()
+            print(f"Gemini extraction timed out after {self.timeout}s, falling back to heuristic extraction")
+            self._record("timeout", timeout=self.timeout)
+            return None
+        except Exception as e:
+            self.errors += 1
+            print(f"Gemini extraction failed: {e}")
+            self._record("error", error=repr(e))
+            return None
+
+        keywords = self._store(key, text, num_keywords)
+        if keywords is not None:
+            print(f"Gemini extracted keywords: {keywords}")
+        self._record("answered" if keywords is not None else "unparsable")
+        return keywords
+
+    async def extract_async(self, titles: List[str], num_keywords: int = 5) -> Optional[List[str]]:
+        """
+        Async extract: awaits the model's async call within the timeout, so
+        the event loop is never blocked on the LLM.
+
+        Args:
+            titles: Watchlist market titles.
+            num_keywords: Number of keywords to extract.
+
+        Returns:
+            List of keywords, or None if Gemini is unavailable, fails or is too slow.
+        """
+        key, cached, model = self._lookup(titles, num_keywords)
+        if cached is not None:
+            self._record("cached")
+            return cached
+        if model is None:
+            return None
+
+        self.calls += 1
+        task = asyncio.ensure_future(model.generate_async(build_prompt(titles, num_keywords)))
+        try:
+            # Shielded in race mode so the timeout doesn't cancel the call
+            text = await asyncio.wait_for(asyncio.shield(task) if self.race else task, self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            if self.race:
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+                task.add_done_callback(lambda t: self._store_late(key, t, num_keywords))
+            print(f"Gemini extraction timed out after {self.timeout}s, falling back to heuristic extraction")
+            self._record("timeout", timeout=self.timeout)
+            return None
+        except Exception as e:
+            self.errors += 1
+            print(f"Gemini extraction failed: {e}")
+            self._record("error", error=repr(e))
+            return None
+
+        keywords = self._store(key, text, num_keywords)
+        if keywords is not None:
+            print(f"Gemini extracted keywords: {keywords}")
+        self._record("answered" if keywords is not None else "unparsable")
+        return keywords
+
+    def _store_late(self, key: str, future: Any, num_keywords: int) -> None:
+        """Done callback for a call that missed the timeout in race mode."""
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._store(key, future.result(), num_keywords, late=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get extractor counters.
+
+        Returns:
+            Dict with model calls, timeouts, errors, late answers cached in
+            race mode, and the keyword cache's hits, misses and entries.
+        """
+        cache_stats = self.cache.stats()
+        return {
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "late_answers": self.late_answers,
+            "cache_hits": cache_stats["hits"],
+            "cache_misses": cache_stats["misses"],
+            "cache_entries": cache_stats["entries"],
+        }
+
+
+# One extractor (model client + cache) per API key, shared by every recommender
+_shared_extractors: Dict[Optional[str], KeywordExtractor] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_extractor(api_key: Optional[str] = None) -> KeywordExtractor:
+    """The process-wide KeywordExtractor for an API key (configured from the environment)."""
+    with _shared_lock:
+        extractor = _shared_extractors.get(api_key)
+        if extractor is None:
+            extractor = _shared_extractors[api_key] = KeywordExtractor.from_env(api_key=api_key)
+        return extractor
+
+
+def extract_keywords_with_gemini(
+    titles: List[str],
+    num_keywords: int = 5,
+    api_key: Optional[str] = None
+) -> Optional[List[str]]:
+    """
+    Use Gemini to extract search keywords from watchlist titles.
+
+    Args:
+        titles: List of market titles from user's watchlist.
+        num_keywords: Number of keywords to extract.
+        api_key: Gemini API key (falls back to GEMINI_API_KEY env var).
+
+    Returns:
+        List of keywords, or None if Gemini is unavailable/fails.
+    """
+    return shared_extractor(api_key).extract(titles, num_keywords)
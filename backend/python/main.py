@@ -3,17 +3,191 @@ Polyflix Backend API - FastAPI Application
 Netflix for Prediction Markets - Search & Scoring Engine
 """
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 
-from search_recommender import SearchRecommender, search_gamma_api
+from async_recommender import AsyncSearchRecommender
+import cache
+from cache import TTLCache
+from gamma_client import AsyncGammaClient
+from keyword_extractor import KeywordExtractor
+from market_catalog import catalog
+from metrics import CONTENT_TYPE, REGISTRY, REQUEST_LATENCY, register_stats
+from rate_limiter import RateGovernor, UpstreamThrottled
+from relevance import RelevanceScorer
+from resilience import CircuitOpen, Resilience
+from result_cache import ResultCache, etag_matches, request_fingerprint, response_etag
+from singleflight import SingleFlight
+from search_recommender import RecommendationSession, public_market
+from snapshot import load_snapshot, save_snapshot
+from tracing import (
+    TRACE_HEADER,
+    configure_trace_logging,
+    current_trace,
+    sample_rate_from_env,
+    start_trace,
+    trace_from_header,
+)
+
+# Shared connection pool for all Gamma API calls (configured via GAMMA_* env vars)
+gamma_client = AsyncGammaClient.from_env()
+
+# Live Gamma searches, innermost first: token bucket + adaptive concurrency
+# (GAMMA_RATE_*/GAMMA_CONCURRENCY* env vars), then hedging, retries and a
+# circuit breaker (GAMMA_HEDGE*/GAMMA_ERROR_RETRIES/GAMMA_BREAKER_* env vars)
+gamma_governor = RateGovernor.from_env()
+gamma_resilience = Resilience.from_env()
+
+
+async def strict_gamma_search(query: str, dedupe_events: bool = True):
+    """Gamma search that raises on failure, so the layers above can react."""
+    return await gamma_client.search(query, dedupe_events=dedupe_events, raise_errors=True)
+
+
+upstream_search = gamma_resilience.wrap(gamma_governor.wrap(strict_gamma_search))
+
+# Search result cache shared by /api/search and recommendation fan-out (SEARCH_CACHE_* env vars)
+search_cache = TTLCache.from_env("SEARCH_CACHE")
+
+# Coalesces identical in-flight upstream queries across concurrent requests
+search_flight = SingleFlight()
+
+# Encoded /api/recommendations responses per watchlist + dislikes (RESULT_CACHE_* env vars)
+result_cache = ResultCache.from_env()
+
+# Incremental recommendation sessions; idle ones expire after SESSION_TTL_SECONDS
+sessions = TTLCache(
+    max_entries=int(os.environ.get("SESSION_MAX_ENTRIES", 10000)),
+    max_bytes=int(os.environ.get("SESSION_MAX_BYTES", 256 * 1024 * 1024)),
+    ttl=float(os.environ.get("SESSION_TTL_SECONDS", 1800)),
+    stale_ttl=0.0,
+    sizeof=lambda session: cache.estimate_size(session.results_by_keyword),
+)
+
+
+# Gemini keyword extraction when USE_GEMINI=1: one model client, cached per title
+# set and time-boxed (GEMINI_TIMEOUT_MS, GEMINI_RACE, GEMINI_CACHE_* env vars)
+USE_GEMINI = os.environ.get("USE_GEMINI") == "1"
+keyword_extractor = KeywordExtractor.from_env()
+
+# Serve searches from the local market catalog when CATALOG_REFRESH_SECONDS > 0
+CATALOG_REFRESH_SECONDS = float(os.environ.get("CATALOG_REFRESH_SECONDS", 0))
+
+# Persist catalog + search cache to this file for warm restarts (disabled if unset)
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH")
+SNAPSHOT_INTERVAL_SECONDS = float(os.environ.get("SNAPSHOT_INTERVAL_SECONDS", 300))
+
+# Latency budget for /api/recommendations and /api/similar when the request sets no
+# deadline_ms; keywords still outstanding then are dropped (0 = wait for every keyword)
+DEFAULT_DEADLINE_MS = float(os.environ.get("RECOMMEND_DEADLINE_MS", 0)) or None
+
+# Most entries accepted by /api/recommendations/batch in one call
+BATCH_MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", 100))
+
+# Trace requests that send the X-Polyflix-Trace header, plus this fraction of the rest
+TRACE_SAMPLE_RATE = sample_rate_from_env()
+configure_trace_logging()
+
+# Scrape-time gauges read straight from the shared cache, single-flight and catalog
+register_stats("polyflix_search_cache", "Search result cache", search_cache.stats,
+               ["hit_ratio", "hits", "stale_hits", "misses", "evictions", "entries", "bytes"])
+register_stats("polyflix_singleflight", "Upstream query coalescing", search_flight.stats,
+               ["coalesced_ratio", "calls", "coalesced", "in_flight"])
+register_stats("polyflix_result_cache", "Recommendation response cache", result_cache.stats,
+               ["hit_ratio", "hits", "misses", "not_modified", "evictions", "entries", "bytes"])
+register_stats("polyflix_gamma_governor", "Gamma rate governor", gamma_governor.stats,
+               ["limit", "in_flight", "queued", "calls", "throttled", "retries", "paused_ms"])
+register_stats("polyflix_gamma_resilience", "Gamma hedging, retries and circuit breaker", gamma_resilience.stats,
+               ["breaker_state_code", "breaker_opens", "breaker_rejected", "retries", "hedges",
+                "hedge_wins", "hedge_win_ratio", "hedge_delay_ms"])
+register_stats("polyflix_sessions", "Incremental recommendation sessions", sessions.stats,
+               ["entries", "bytes", "evictions"])
+register_stats("polyflix_gemini", "Gemini keyword extraction", keyword_extractor.stats,
+               ["calls", "timeouts", "errors", "late_answers", "cache_hits", "cache_entries"])
+register_stats("polyflix_catalog", "Local market catalog", catalog.stats, ["events", "markets"])
+REGISTRY.gauge_func(
+    "polyflix_cache_refresh_queue_depth",
+    "Stale-while-revalidate refreshes waiting for a worker thread.",
+    cache.refresh_queue_depth,
+)
+
+
+async def catalog_first_search(query: str, dedupe_events: bool = True):
+    """Answer from the in-memory catalog, falling back to the live API on no match."""
+    if catalog.ready:
+        results = catalog.search(query, dedupe_events=dedupe_events)
+        if results:
+            return results
+    return await upstream_search(query, dedupe_events=dedupe_events)
+
+
+async def refresh_catalog_forever(interval: float):
+    """Re-ingest active markets into the catalog every `interval` seconds."""
+    if catalog.ready:
+        # Catalog came from a snapshot: only refresh once it's due
+        age = time.time() - catalog.last_refresh
+        await asyncio.sleep(max(0.0, interval - age))
+    while True:
+        try:
+            count = await catalog.refresh_async(gamma_client.client)
+            print(f"Market catalog refreshed: {count} markets")
+        except Exception as e:
+            print(f"Market catalog refresh failed: {e}")
+        await asyncio.sleep(interval)
+
+
+async def snapshot_forever(path: str, interval: float):
+    """Write a catalog + cache snapshot every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(save_snapshot, path, catalog, search_cache, keyword_extractor.cache)
+        except Exception as e:
+            print(f"Snapshot write failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    On startup: restore the snapshot (if configured) before serving traffic,
+    open the Gamma connection pool and start background refreshers.
+    On shutdown: stop them, write a final snapshot and close the pool.
+    """
+    background_tasks = []
+
+    if SNAPSHOT_PATH:
+        info = await asyncio.to_thread(load_snapshot, SNAPSHOT_PATH, catalog, search_cache, keyword_extractor.cache)
+        print(f"Snapshot restore from {SNAPSHOT_PATH}: {info}")
+        background_tasks.append(asyncio.create_task(snapshot_forever(SNAPSHOT_PATH, SNAPSHOT_INTERVAL_SECONDS)))
+
+    gamma_client.open()
+    if CATALOG_REFRESH_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(refresh_catalog_forever(CATALOG_REFRESH_SECONDS)))
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    if SNAPSHOT_PATH:
+        await asyncio.to_thread(save_snapshot, SNAPSHOT_PATH, catalog, search_cache, keyword_extractor.cache)
+    await gamma_client.close()
+
 
 app = FastAPI(
     title="Polyflix API",
     description="Search-Based Recommendation Engine for Prediction Markets",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware for frontend integration
@@ -23,10 +197,89 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Polyflix-Trace-Id", "ETag", "X-Polyflix-Cache"],
 )
 
-# Initialize the recommender with debug mode on (uses real Gamma API by default)
-recommender = SearchRecommender(debug=True)
+
+# X-Polyflix-Trace as it appears in ASGI scope headers
+TRACE_HEADER_KEY = TRACE_HEADER.lower().encode()
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    """First value of a request header from an ASGI scope (name lower-case), or None."""
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class RequestMiddleware:
+    """
+    Pure ASGI middleware for per-request observability, without the extra
+    task and response re-streaming of an @app.middleware layer:
+
+    - Records per-route latency (labelled by route template, not raw path,
+      with the status from http.response.start) until the response is sent.
+    - Attaches a Trace to requests that ask for one via the X-Polyflix-Trace
+      header or are sampled, and returns its ID in X-Polyflix-Trace-Id.
+      Untraced requests skip all tracing work.
+    """
+
+    def __init__(self, app, sample_rate: float = 0.0):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+        trace = trace_from_header(_header(scope, TRACE_HEADER_KEY), self.sample_rate)
+
+        async def observed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trace is not None:
+                    trace.event("request.done", status=status)
+                    headers = [*message.get("headers", []), (b"x-polyflix-trace-id", trace.trace_id.encode())]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            if trace is None:
+                await self.app(scope, receive, observed_send)
+            else:
+                with start_trace(trace):
+                    trace.event("request.start", method=scope["method"], path=scope["path"], sampled=trace.sampled)
+                    await self.app(scope, receive, observed_send)
+        finally:
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                getattr(route, "path", "unmatched"),
+                scope["method"],
+                str(status),
+            )
+
+
+# Added last, so it is the outermost layer and times and traces the whole request
+app.add_middleware(RequestMiddleware, sample_rate=TRACE_SAMPLE_RATE)
+
+
+# Initialize the recommender (uses real Gamma API via the shared pool).
+# Per-candidate output goes through request tracing; RECOMMENDER_DEBUG=1 re-enables the console prints.
+recommender = AsyncSearchRecommender(
+    search_func=catalog_first_search if CATALOG_REFRESH_SECONDS > 0 else upstream_search,
+    debug=os.environ.get("RECOMMENDER_DEBUG") == "1",
+    use_gemini=USE_GEMINI,
+    cache=search_cache,
+    singleflight=search_flight,
+    keyword_extractor=keyword_extractor,
+    # IDF from the market catalog once it is loaded, else from each candidate pool
+    relevance_scorer=RelevanceScorer(catalog)
+)
 
 
 # Request/Response Models
@@ -48,6 +301,7 @@ class Market(BaseModel):
 class RecommendationRequest(BaseModel):
     watchlist: List[Market]
     disliked_items: Optional[List[Market]] = []
+    deadline_ms: Optional[float] = None
 
 
 class ScoredMarket(BaseModel):
@@ -70,6 +324,10 @@ class RecommendationResponse(BaseModel):
     keywords_used: List[str]
     negative_keywords: List[str]
     total_candidates: int
+    cached_keywords: List[str] = []
+    missing_keywords: List[str] = []
+    timings_ms: Dict[str, float] = {}
+    trace: Optional[List[Dict[str, Any]]] = None
 
 
 @app.get("/")
@@ -83,7 +341,7 @@ async def root():
 
 
 @app.post("/api/recommendations", response_model=RecommendationResponse)
-async def get_recommendations(request: RecommendationRequest):
+async def get_recommendations(request: RecommendationRequest, http_request: Request):
     """
     Get personalized market recommendations based on user's watchlist and dislikes.
 
@@ -94,6 +352,19 @@ async def get_recommendations(request: RecommendationRequest):
     4. Scores each candidate: Base_Score = log(volume) normalized to 0-1
     5. Applies 80% penalty if title contains negative keywords
     6. Returns top 10 sorted by final score
+
+    Per-stage timings are also returned as a Server-Timing header. Send
+    "X-Polyflix-Trace: debug" to get the per-candidate score breakdown in
+    the response's "trace" field.
+
+    With deadline_ms set (or RECOMMEND_DEADLINE_MS), keyword searches still
+    running at the deadline are cancelled, the candidates that did arrive are
+    scored, and the skipped keywords are listed in "missing_keywords".
+
+    Complete responses are cached for RESULT_CACHE_TTL seconds per watchlist
+    and dislike set, and carry an ETag of the recommendations and keywords;
+    a repeat request is served from memory, and answered 304 whenever
+    If-None-Match matches, including after the entry expired and was recomputed.
     """
     if not request.watchlist:
         raise HTTPException(
@@ -105,49 +376,242 @@ async def get_recommendations(request: RecommendationRequest):
     watchlist = [m.model_dump() for m in request.watchlist]
     disliked_items = [m.model_dump() for m in request.disliked_items] if request.disliked_items else []
 
-    # Get recommendations
-    recommendations = recommender.get_recommendations(
+    # Only return trace events to callers that asked for them (not sampled requests);
+    # those responses are per-request, so they skip the result cache
+    trace = current_trace()
+    debug = trace is not None and not trace.sampled
+    key = request_fingerprint(watchlist, disliked_items, top_n=10)
+    if_none_match = http_request.headers.get("if-none-match")
+
+    cached = None if debug else result_cache.get(key)
+    if cached is not None:
+        headers = {"ETag": cached.etag, "X-Polyflix-Cache": "hit", "Server-Timing": "cache;desc=hit"}
+        if etag_matches(if_none_match, cached.etag):
+            result_cache.record_not_modified()
+            return Response(status_code=304, headers=headers)
+        return Response(content=cached.body, media_type="application/json", headers=headers)
+
+    # Get recommendations, with the keywords and timings the recommender actually used
+    result = await recommender.get_recommendations(
         watchlist=watchlist,
         disliked_items=disliked_items,
-        top_n=10
+        top_n=10,
+        return_result=True,
+        deadline_ms=request.deadline_ms or DEFAULT_DEADLINE_MS
     )
 
-    # Extract keywords for response metadata
-    from search_recommender import STOP_WORDS
-    import string
-    from collections import Counter
-
-    # Recalculate keywords for response (could cache this)
-    watchlist_titles = [m["title"] for m in watchlist]
-    word_counter = Counter()
-    for title in watchlist_titles:
-        cleaned = title.lower().translate(str.maketrans('', '', string.punctuation))
-        words = [w for w in cleaned.split() if w not in STOP_WORDS and len(w) > 2]
-        word_counter.update(words)
-    positive_keywords = [word for word, _ in word_counter.most_common(3)]
-
-    # Negative keywords
-    negative_keywords = set()
-    for item in disliked_items:
-        cleaned = item["title"].lower().translate(str.maketrans('', '', string.punctuation))
-        words = {w for w in cleaned.split() if w not in STOP_WORDS and len(w) > 2}
-        negative_keywords.update(words)
-
-    return RecommendationResponse(
-        recommendations=recommendations,
-        keywords_used=positive_keywords,
-        negative_keywords=list(negative_keywords),
-        total_candidates=len(recommendations)
+    response = RecommendationResponse(
+        recommendations=result.recommendations,
+        keywords_used=result.keywords,
+        negative_keywords=result.negative_keywords,
+        total_candidates=result.total_candidates,
+        cached_keywords=result.cached_keywords,
+        missing_keywords=result.missing_keywords,
+        timings_ms=result.timings,
+        trace=trace.events if debug else None
     )
+    body = response.model_dump_json().encode()
+
+    # Partial results (keywords dropped at the deadline) are never cached
+    headers = {"Server-Timing": result.server_timing(), "X-Polyflix-Cache": "bypass"}
+    if not debug and not result.missing_keywords:
+        content = response.model_dump(mode="json", include={"recommendations"})["recommendations"]
+        etag = response_etag(content, result.keywords, result.negative_keywords)
+        result_cache.put(key, body, etag)
+        headers["ETag"] = etag
+        headers["X-Polyflix-Cache"] = "miss"
+        # The client may already hold these recommendations from an expired entry
+        if etag_matches(if_none_match, etag):
+            result_cache.record_not_modified()
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class BatchRecommendationRequest(BaseModel):
+    requests: List[RecommendationRequest]
+    top_n: Optional[int] = 10
+    deadline_ms: Optional[float] = None
+
+
+class BatchRecommendationResponse(BaseModel):
+    results: List[RecommendationResponse]
+    keyword_requests: int
+    unique_keywords: int
+
+
+@app.post("/api/recommendations/batch", response_model=BatchRecommendationResponse)
+async def get_recommendations_batch(request: BatchRecommendationRequest):
+    """
+    Recommendations for many watchlists (users or home-screen rows) in one call.
+
+    Keywords are extracted for every entry and each distinct keyword is
+    searched upstream once; every entry is still scored against its own
+    dislikes. Results come back in request order; an entry with an empty
+    watchlist gets an empty result. The batch-level deadline_ms applies
+    (per-entry deadline_ms is ignored).
+    """
+    if len(request.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large: {len(request.requests)} requests (max {BATCH_MAX_REQUESTS})."
+        )
+
+    entries = [
+        {
+            "watchlist": [m.model_dump() for m in entry.watchlist],
+            "disliked_items": [m.model_dump() for m in entry.disliked_items] if entry.disliked_items else [],
+        }
+        for entry in request.requests
+    ]
+    results = await recommender.get_recommendations_batch(
+        entries, top_n=request.top_n or 10, deadline_ms=request.deadline_ms or DEFAULT_DEADLINE_MS
+    )
+
+    return BatchRecommendationResponse(
+        results=[
+            RecommendationResponse(
+                recommendations=result.recommendations,
+                keywords_used=result.keywords,
+                negative_keywords=result.negative_keywords,
+                total_candidates=result.total_candidates,
+                cached_keywords=result.cached_keywords,
+                missing_keywords=result.missing_keywords,
+                timings_ms=result.timings
+            )
+            for result in results
+        ],
+        keyword_requests=sum(len(result.keywords) for result in results),
+        unique_keywords=len({k for result in results for k in result.keywords}),
+    )
+
+
+@app.post("/api/recommendations/stream")
+async def stream_recommendations(request: RecommendationRequest, http_request: Request):
+    """
+    Streaming variant of /api/recommendations.
+
+    Emits a "keywords" event, then a "provisional" ranking each time a
+    keyword search lands, then a "final" event with the same fields as the
+    /api/recommendations response. Sent as newline-delimited JSON, or as
+    Server-Sent Events when the client accepts text/event-stream.
+    """
+    if not request.watchlist:
+        raise HTTPException(
+            status_code=400,
+            detail="Watchlist cannot be empty. Add some markets to get recommendations."
+        )
+
+    watchlist = [m.model_dump() for m in request.watchlist]
+    disliked_items = [m.model_dump() for m in request.disliked_items] if request.disliked_items else []
+    events = recommender.stream_recommendations(
+        watchlist=watchlist,
+        disliked_items=disliked_items,
+        top_n=10,
+        deadline_ms=request.deadline_ms or DEFAULT_DEADLINE_MS
+    )
+
+    if "text/event-stream" in http_request.headers.get("accept", ""):
+        async def body():
+            async for event in events:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        media_type = "text/event-stream"
+    else:
+        async def body():
+            async for event in events:
+                yield json.dumps(event) + "\n"
+        media_type = "application/x-ndjson"
+
+    # X-Accel-Buffering stops nginx-style proxies from holding events back
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+class SessionUpdateRequest(BaseModel):
+    add: List[Market] = []
+    remove: List[str] = []
+    dislike: List[Market] = []
+    deadline_ms: Optional[float] = None
+
+
+class SessionResponse(RecommendationResponse):
+    session_id: str
+    watchlist_size: int
+
+
+def _session_response(session: RecommendationSession, result) -> SessionResponse:
+    """Render a session update as a RecommendationResponse plus the session fields."""
+    return SessionResponse(
+        session_id=session.session_id,
+        watchlist_size=len(session.watchlist),
+        recommendations=result.recommendations,
+        keywords_used=result.keywords,
+        negative_keywords=result.negative_keywords,
+        total_candidates=result.total_candidates,
+        cached_keywords=result.cached_keywords,
+        missing_keywords=result.missing_keywords,
+        timings_ms=result.timings
+    )
+
+
+@app.post("/api/sessions", response_model=SessionResponse)
+async def create_session(request: RecommendationRequest):
+    """
+    Start an incremental recommendation session from a watchlist and dislikes
+    (either may be empty). Returns the first recommendations and a session_id
+    for /api/sessions/{session_id} updates.
+    """
+    session = RecommendationSession()
+    result = await recommender.update_session(
+        session,
+        add=[m.model_dump() for m in request.watchlist],
+        dislike=[m.model_dump() for m in request.disliked_items or []],
+        deadline_ms=request.deadline_ms or DEFAULT_DEADLINE_MS
+    )
+    sessions.set(session.session_id, session)
+    return _session_response(session, result)
+
+
+@app.post("/api/sessions/{session_id}", response_model=SessionResponse)
+async def update_session(session_id: str, request: SessionUpdateRequest):
+    """
+    Add or remove watchlist markets and add dislikes in a session.
+
+    Only keywords the change introduces are searched upstream; removals and
+    dislikes re-rank the session's existing candidate pool without any
+    upstream call. Sessions idle for SESSION_TTL_SECONDS expire (404).
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired.")
+
+    result = await recommender.update_session(
+        session,
+        add=[m.model_dump() for m in request.add],
+        remove=request.remove,
+        dislike=[m.model_dump() for m in request.dislike],
+        deadline_ms=request.deadline_ms or DEFAULT_DEADLINE_MS
+    )
+    # Re-store to refresh the idle timer and the size estimate
+    sessions.set(session_id, session)
+    return _session_response(session, result)
+
+
+@app.delete("/api/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """End a session and free its candidate pool."""
+    sessions.invalidate(session_id)
+    return {"deleted": session_id}
 
 
 @app.get("/api/search/{query}")
 async def search_markets(query: str):
     """
-    Direct search endpoint using the Gamma API.
+    Direct search endpoint using the Gamma API (through the search cache).
     Useful for testing and debugging.
     """
-    results = search_gamma_api(query)
+    try:
+        results = [public_market(m) for m in await recommender.search_func(query)]
+    except (CircuitOpen, UpstreamThrottled, httpx.HTTPError) as e:
+        raise HTTPException(status_code=503, detail=f"Gamma API unavailable: {e}")
     return {
         "query": query,
         "results": results,
@@ -155,9 +619,52 @@ async def search_markets(query: str):
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: endpoint and stage latency, upstream calls, cache and coalescing."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit/miss/eviction counters for the search result cache."""
+    return search_cache.stats()
+
+
+@app.get("/api/catalog/stats")
+async def catalog_stats():
+    """Size and freshness of the local market catalog."""
+    return catalog.stats()
+
+
+@app.get("/api/singleflight/stats")
+async def singleflight_stats():
+    """Leader vs. coalesced counts for upstream Gamma queries."""
+    return search_flight.stats()
+
+
+@app.get("/api/fanout/stats")
+async def fanout_stats():
+    """Queue depth and in-flight upstream calls for the shared fan-out limiter."""
+    return recommender.limiter.stats()
+
+
+@app.get("/api/ratelimit/stats")
+async def ratelimit_stats():
+    """Adaptive concurrency limit, queue and throttling counters for Gamma calls."""
+    return gamma_governor.stats()
+
+
+@app.get("/api/upstream/stats")
+async def upstream_stats():
+    """Circuit breaker state, hedge win rate and retries for Gamma calls."""
+    return gamma_resilience.stats()
+
+
 class SimilarMarketsRequest(BaseModel):
     market: Market
     limit: Optional[int] = 3
+    deadline_ms: Optional[float] = None
 
 
 @app.post("/api/similar")
@@ -165,78 +672,15 @@ async def get_similar_markets(request: SimilarMarketsRequest):
     """
     Get similar markets based on a single market.
     Uses the market title to extract keywords and find related markets.
+    Honours deadline_ms the same way as /api/recommendations.
     """
     market_data = request.market.model_dump()
     market_data["volume"] = request.market.get_volume_int()  # Ensure volume is int
     limit = request.limit or 3
-    title = market_data.get("title", "")
-
-    # For a single market, extract more keywords directly from the title
-    # to ensure we have enough search terms
-    keywords = recommender._extract_keywords_from_title(title, top_n=4)
-
-    if recommender.debug:
-        print(f"\n{'='*60}")
-        print(f"SIMILAR MARKETS for: {title[:50]}...")
-        print(f"Extracted keywords: {keywords}")
-        print(f"{'='*60}")
-
-    if not keywords:
-        # Fallback: use the full title as a search query
-        keywords = [title.split()[0]] if title else []
-        if recommender.debug:
-            print(f"No keywords extracted, using fallback: {keywords}")
-
-    if not keywords:
-        return {
-            "similar": [],
-            "source_market": title,
-            "count": 0,
-            "keywords_used": []
-        }
-
-    # Search using extracted keywords
-    candidates = recommender._scattershot_search(keywords)
 
-    if not candidates:
-        return {
-            "similar": [],
-            "source_market": title,
-            "count": 0,
-            "keywords_used": keywords
-        }
-
-    # Score and filter candidates (exclude the source market)
-    import math
-    max_log_volume = max(math.log(m["volume"] + 1) for m in candidates.values())
-    source_id = market_data.get("id", "")
-    source_title_lower = title.lower().strip()
-
-    scored_markets = []
-    for market_id, candidate in candidates.items():
-        # Skip the source market itself
-        if market_id == source_id or candidate["title"].lower().strip() == source_title_lower:
-            continue
-
-        score_result = recommender._calculate_score(candidate, set(), max_log_volume)
-        scored_markets.append({
-            **candidate,
-            "score": score_result["final_score"],
-            "volume_score": score_result["volume_score"],
-            "novelty_score": score_result["novelty_score"],
-            "penalized": False,
-        })
-
-    # Sort by score and return top results
-    scored_markets.sort(key=lambda x: x["score"], reverse=True)
-    similar = scored_markets[:limit]
-
-    return {
-        "similar": similar,
-        "source_market": title,
-        "count": len(similar),
-        "keywords_used": keywords
-    }
+    return await recommender.get_similar_markets(
+        market_data, limit=limit, deadline_ms=request.deadline_ms or DEFAULT_DEADLINE_MS
+    )
 
 
 @app.get("/api/test")
@@ -267,7 +711,7 @@ async def test_recommendations():
     for item in sample_dislikes:
         print(f"  - {item['title']}")
 
-    recommendations = recommender.get_recommendations(
+    recommendations = await recommender.get_recommendations(
         watchlist=sample_watchlist,
         disliked_items=sample_dislikes,
         top_n=10
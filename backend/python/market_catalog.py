@@ -0,0 +1,316 @@
+"""
+MarketCatalog: a local copy of active Polymarket markets with an inverted index.
+
+Bulk-ingests active events from the Gamma /events endpoint (or a recorded JSON
+dump), normalizes them into the same market dicts search_gamma_api returns,
+and indexes title tokens so searches are answered in memory instead of with a
+round trip to public-search.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from search_recommender import GAMMA_BASE_URL, _normalize_event
+from tokenizer import STOP_WORDS, token_set, tokenize
+
+GAMMA_EVENTS_URL = os.environ.get("GAMMA_EVENTS_URL", f"{GAMMA_BASE_URL}/events")
+
+
+class MarketCatalog:
+    """
+    In-memory catalog of markets grouped by event, with a token -> event
+    inverted index. Posting lists are kept sorted by event volume, so a
+    search walks the shortest list and stops as soon as it has enough hits.
+
+    Ingestion builds a complete new index and swaps it in with a single
+    assignment, so searches never take a lock.
+    """
+
+    def __init__(self, results_per_query: int = 20):
+        """
+        Initialize an empty MarketCatalog.
+
+        Args:
+            results_per_query: Maximum events returned per search, mirroring
+                               public-search's limit_per_type.
+        """
+        self.results_per_query = results_per_query
+        self._index = _CatalogIndex.build([])
+        self.last_refresh: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        """True once at least one ingestion has populated the catalog."""
+        return self.last_refresh is not None
+
+    def ingest(self, events: Iterable[Dict[str, Any]], ingested_at: Optional[float] = None) -> int:
+        """
+        Replace the catalog contents with a new set of raw Gamma events.
+
+        Args:
+            events: Raw event objects (each with an optional markets array).
+            ingested_at: Wall-clock time the events were fetched (defaults to now).
+
+        Returns:
+            Number of markets in the new catalog.
+        """
+        self._index = _CatalogIndex.build(events)
+        self.last_refresh = time.time() if ingested_at is None else ingested_at
+        return self._index.market_count
+
+    def ingest_file(self, path: str) -> int:
+        """
+        Ingest a recorded JSON dump: either a list of events (/events format)
+        or an object with an "events" list (public-search format).
+
+        Args:
+            path: Path to the JSON file.
+
+        Returns:
+            Number of markets in the new catalog.
+        """
+        with open(path) as f:
+            data = json.load(f)
+        events = data.get("events", []) if isinstance(data, dict) else data
+        return self.ingest(events)
+
+    def refresh(self, client: Optional[httpx.Client] = None, page_size: int = 500, max_pages: int = 100) -> int:
+        """
+        Fetch all active events from the Gamma API and ingest them.
+
+        Args:
+            client: Optional shared httpx.Client (e.g. GammaClient.client).
+            page_size: Events requested per page.
+            max_pages: Safety cap on the number of pages fetched.
+
+        Returns:
+            Number of markets in the new catalog.
+        """
+        http = client or httpx
+        events = []
+        for page in range(max_pages):
+            response = http.get(GAMMA_EVENTS_URL, params=_page_params(page, page_size), timeout=30.0)
+            response.raise_for_status()
+            batch = response.json()
+            events.extend(batch)
+            if len(batch) < page_size:
+                break
+        return self.ingest(events)
+
+    async def refresh_async(self, client: httpx.AsyncClient, page_size: int = 500, max_pages: int = 100) -> int:
+        """
+        Async version of refresh() for use on the event loop. The index is
+        built in a worker thread (seconds for 100k markets) and swapped in
+        atomically, so requests keep being served from the old one meanwhile.
+
+        Args:
+            client: Shared httpx.AsyncClient (e.g. AsyncGammaClient.client).
+            page_size: Events requested per page.
+            max_pages: Safety cap on the number of pages fetched.
+
+        Returns:
+            Number of markets in the new catalog.
+        """
+        events = []
+        for page in range(max_pages):
+            response = await client.get(GAMMA_EVENTS_URL, params=_page_params(page, page_size), timeout=30.0)
+            response.raise_for_status()
+            batch = response.json()
+            events.extend(batch)
+            if len(batch) < page_size:
+                break
+        return await asyncio.to_thread(self.ingest, events)
+
+    def search(self, query: str, dedupe_events: bool = True) -> List[Dict[str, Any]]:
+        """
+        Search the catalog. Drop-in replacement for search_gamma_api, usable
+        as SearchRecommender(search_func=catalog.search).
+
+        Every non-stop-word token of the query must appear in the event
+        (event title or any of its market questions). Matches are ranked
+        by event volume.
+
+        Args:
+            query: Search term.
+            dedupe_events: If True, only return one market per event (highest volume).
+
+        Returns:
+            List of market dictionaries in search_gamma_api's shape.
+        """
+        index = self._index
+        event_ids = index.match(query, self.results_per_query)
+
+        markets = []
+        for event_id in event_ids:
+            event_markets = index.events[event_id]
+            if dedupe_events:
+                event_markets = event_markets[:1]
+            for market in event_markets:
+                markets.append({**market, "query_matched": query})
+        return markets
+
+    def load_normalized(
+        self,
+        normalized: Iterable[Tuple[str, str, List[Dict[str, Any]]]],
+        ingested_at: Optional[float] = None
+    ) -> int:
+        """
+        Replace the catalog contents with already-normalized events, e.g. rows
+        read back from a snapshot (see export()).
+
+        Args:
+            normalized: (event_id, event_title, markets) tuples.
+            ingested_at: Wall-clock time the data was originally fetched.
+
+        Returns:
+            Number of markets in the new catalog.
+        """
+        self._index = _CatalogIndex.from_normalized(normalized)
+        self.last_refresh = time.time() if ingested_at is None else ingested_at
+        return self._index.market_count
+
+    def export(self) -> List[Tuple[str, str, List[Dict[str, Any]]]]:
+        """
+        Dump the catalog as (event_id, event_title, markets) tuples, the
+        format accepted by load_normalized().
+        """
+        index = self._index
+        return [
+            (event_id, index.event_titles[event_id], event_markets)
+            for event_id, event_markets in index.events.items()
+        ]
+
+    def markets(self) -> List[Dict[str, Any]]:
+        """All markets currently in the catalog."""
+        return [m for event_markets in self._index.events.values() for m in event_markets]
+
+    @property
+    def document_count(self) -> int:
+        """Number of events, the documents for IDF statistics (see relevance.py)."""
+        return len(self._index.events)
+
+    def document_frequency(self, token: str) -> int:
+        """Number of events whose titles or market titles contain token."""
+        return len(self._index.posting_sets.get(token, ()))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get catalog size and freshness.
+
+        Returns:
+            Dict with event, market and token counts and the last refresh time.
+        """
+        index = self._index
+        return {
+            "events": len(index.events),
+            "markets": index.market_count,
+            "tokens": len(index.postings),
+            "last_refresh": self.last_refresh,
+        }
+
+
+class _CatalogIndex:
+    """Immutable snapshot of catalog contents plus its inverted index."""
+
+    __slots__ = ("events", "event_titles", "postings", "posting_sets", "market_count")
+
+    def __init__(self, events, event_titles, postings, posting_sets, market_count):
+        self.events = events
+        self.event_titles = event_titles
+        self.postings = postings
+        self.posting_sets = posting_sets
+        self.market_count = market_count
+
+    @classmethod
+    def build(cls, raw_events: Iterable[Dict[str, Any]]) -> "_CatalogIndex":
+        """Normalize raw Gamma events and index them."""
+        normalized = []
+        for raw_event in raw_events:
+            event_markets = _normalize_event(raw_event, query="", dedupe_events=False)
+            if event_markets:
+                normalized.append((event_markets[0]["event_id"], raw_event.get("title", ""), event_markets))
+        return cls.from_normalized(normalized)
+
+    @classmethod
+    def from_normalized(cls, normalized: Iterable[Tuple[str, str, List[Dict[str, Any]]]]) -> "_CatalogIndex":
+        """Index already-normalized (event_id, event_title, markets) rows."""
+        events: Dict[str, List[Dict[str, Any]]] = {}
+        event_titles: Dict[str, str] = {}
+        event_volume: Dict[str, int] = {}
+        token_events: Dict[str, set] = {}
+
+        for event_id, event_title, event_markets in normalized:
+            # Highest volume first, so [0] is what dedupe_events would pick
+            event_markets.sort(key=lambda m: m["volume"], reverse=True)
+            events[event_id] = event_markets
+            event_titles[event_id] = event_title
+            event_volume[event_id] = event_markets[0]["volume"]
+
+            tokens = set(token_set(event_title))
+            for market in event_markets:
+                tokens.update(token_set(market["title"]))
+            for token in tokens:
+                token_events.setdefault(token, set()).add(event_id)
+
+        postings = {
+            token: sorted(ids, key=lambda e: event_volume[e], reverse=True)
+            for token, ids in token_events.items()
+        }
+        posting_sets = {token: frozenset(ids) for token, ids in token_events.items()}
+        market_count = sum(len(m) for m in events.values())
+        return cls(events, event_titles, postings, posting_sets, market_count)
+
+    def match(self, query: str, limit: int) -> List[str]:
+        """Return up to `limit` event IDs containing every query token, by volume."""
+        tokens = tokenize(query)
+        meaningful = [t for t in tokens if t not in STOP_WORDS]
+        tokens = meaningful or tokens
+        if not tokens:
+            return []
+
+        postings = []
+        for token in set(tokens):
+            posting = self.postings.get(token)
+            if posting is None:
+                return []
+            postings.append((posting, self.posting_sets[token]))
+
+        # Walk the shortest (volume-sorted) posting list, check the others by set membership
+        postings.sort(key=lambda p: len(p[0]))
+        shortest = postings[0][0]
+        others = [ids for _, ids in postings[1:]]
+
+        matched = []
+        for event_id in shortest:
+            if all(event_id in other for other in others):
+                matched.append(event_id)
+                if len(matched) >= limit:
+                    break
+        return matched
+
+
+def _page_params(page: int, page_size: int) -> Dict[str, Any]:
+    """Query parameters for one page of active, open events."""
+    return {
+        "active": "true",
+        "closed": "false",
+        "limit": page_size,
+        "offset": page * page_size,
+    }
+
+
+# Process-wide catalog used by catalog_search
+catalog = MarketCatalog()
+
+
+def catalog_search(query: str, dedupe_events: bool = True) -> List[Dict[str, Any]]:
+    """
+    Search the process-wide catalog with search_gamma_api's signature, so it
+    can be passed straight to SearchRecommender(search_func=catalog_search).
+    """
+    return catalog.search(query, dedupe_events=dedupe_events)
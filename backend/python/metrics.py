@@ -0,0 +1,364 @@
+"""
+Prometheus-compatible metrics for the recommendation engine.
+
+Counters and histograms are sharded per thread: each thread records into its
+own dict, so the hot path never takes a lock (a lock is only taken the first
+time a thread touches a metric). Shards are summed when /metrics is scraped.
+Gauges are callbacks evaluated at scrape time, so cache and single-flight
+stats are read straight from their owners instead of being mirrored.
+
+Rendered in the Prometheus text exposition format (version 0.0.4).
+"""
+
+import asyncio
+import bisect
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from cache import search_call_args
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers in-memory catalog hits through slow upstream calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_SIZE_BUCKETS = (0, 5, 10, 20, 40, 60, 80, 100, 150, 200, 300)
+
+# Label sets beyond a metric's cap are folded into this value
+OVERFLOW_LABEL = "__other__"
+
+# Shards of exited threads are folded together once a metric has this many
+MAX_LIVE_SHARDS = 64
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _ShardedMetric:
+    """Base class: per-thread value dicts keyed by label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), max_label_sets: Optional[int] = None):
+        """
+        Args:
+            name: Metric name (e.g. polyflix_requests_total).
+            help: One-line description for the # HELP line.
+            labelnames: Label names, in the order values are passed.
+            max_label_sets: Cap on distinct label sets; extra ones are
+                            recorded under OVERFLOW_LABEL.
+        """
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.max_label_sets = max_label_sets
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, Dict[Tuple[str, ...], Any]]] = []
+        self._retired: Dict[Tuple[str, ...], Any] = {}
+        self._label_sets: set = set()
+        self._lock = threading.Lock()
+
+    def _shard(self) -> Dict[Tuple[str, ...], Any]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._lock:
+                if len(self._shards) >= MAX_LIVE_SHARDS:
+                    self._fold_dead_shards()
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+        return shard
+
+    def _fold_dead_shards(self) -> None:
+        """Merge shards of exited threads into the retired totals (lock held)."""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                for key, value in shard.items():
+                    self._merge(self._retired, key, value)
+        self._shards = live
+
+    def _merge(self, totals: Dict[Tuple[str, ...], Any], key: Tuple[str, ...], value: Any) -> None:
+        raise NotImplementedError
+
+    def _collect(self) -> Dict[Tuple[str, ...], Any]:
+        """Sum of all shards, including retired ones."""
+        with self._lock:
+            self._fold_dead_shards()
+            shards = [self._retired] + [shard for _, shard in self._shards]
+        totals: Dict[Tuple[str, ...], Any] = {}
+        for shard in shards:
+            for key, value in dict(shard).items():
+                self._merge(totals, key, value)
+        return totals
+
+    def _key(self, label_values: Tuple[str, ...]) -> Tuple[str, ...]:
+        if self.max_label_sets is None or label_values in self._label_sets:
+            return label_values
+        with self._lock:
+            if len(self._label_sets) < self.max_label_sets:
+                self._label_sets.add(label_values)
+                return label_values
+        return (OVERFLOW_LABEL,) * len(label_values)
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_ShardedMetric):
+    """Monotonic counter. Use inc(*label_values, amount=1)."""
+
+    kind = "counter"
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        shard = self._shard()
+        key = self._key(label_values)
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def _merge(self, totals, key, value):
+        totals[key] = totals.get(key, 0.0) + value
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        """Current totals by label values, summed across threads."""
+        return self._collect()
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self.values().items())
+        ]
+
+
+class UpDownCounter(Counter):
+    """Sharded counter that can go down (in-flight work), exposed as a gauge."""
+
+    kind = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(_ShardedMetric):
+    """Cumulative histogram. Use observe(value, *label_values)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, max_label_sets: Optional[int] = None):
+        super().__init__(name, help, labelnames, max_label_sets)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *label_values: str) -> None:
+        shard = self._shard()
+        key = self._key(label_values)
+        state = shard.get(key)
+        if state is None:
+            # [per-bucket counts..., +Inf count, sum]
+            state = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def _merge(self, totals, key, value):
+        if key in totals:
+            totals[key] = [a + b for a, b in zip(totals[key], value)]
+        else:
+            totals[key] = list(value)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[List[int], float]]:
+        """Per-bucket (non-cumulative) counts and sums by label values."""
+        return {key: (state[:-1], state[-1]) for key, state in self._collect().items()}
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class GaugeFunc:
+    """Gauge evaluated at scrape time from a callback."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, func: Callable[[], Any], labelnames: Sequence[str] = ()):
+        """
+        Args:
+            name: Metric name.
+            help: One-line description.
+            func: Returns a number, or a {label values tuple: number} dict
+                  when labelnames is set.
+            labelnames: Label names for dict-valued callbacks.
+        """
+        self.name = name
+        self.help = help
+        self.func = func
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> List[str]:
+        value = self.func()
+        if value is None:
+            return []
+        if not self.labelnames:
+            return [f"{self.name} {_format_value(value)}"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+            for key, v in sorted(value.items())
+        ]
+
+
+class Registry:
+    """Named collection of metrics rendered together for /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add a metric (replacing any with the same name) and return it."""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = (), **kwargs) -> Counter:
+        return self.register(Counter(name, help, labelnames, **kwargs))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, **kwargs))
+
+    def gauge_func(self, name: str, help: str, func: Callable[[], Any], labelnames: Sequence[str] = ()) -> GaugeFunc:
+        return self.register(GaugeFunc(name, help, func, labelnames))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Per-keyword series are capped so user-derived keywords can't explode cardinality
+MAX_KEYWORD_LABELS = int(os.environ.get("METRICS_MAX_KEYWORD_LABELS", 200))
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "polyflix_http_request_duration_seconds",
+    "HTTP request latency by route, method and status.",
+    ("route", "method", "status"),
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    "polyflix_recommendation_stage_duration_seconds",
+    "Recommendation pipeline stage latency (extract, search, score, select, total).",
+    ("stage",),
+)
+CANDIDATE_POOL_SIZE = REGISTRY.histogram(
+    "polyflix_candidate_pool_size",
+    "Unique candidates gathered by the keyword fan-out per request.",
+    buckets=POOL_SIZE_BUCKETS,
+)
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "polyflix_upstream_search_duration_seconds",
+    "Latency of search calls that missed the cache, by keyword.",
+    ("keyword",),
+    max_label_sets=MAX_KEYWORD_LABELS,
+)
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "polyflix_upstream_search_errors_total",
+    "Failed search calls, by keyword and error type.",
+    ("keyword", "error"),
+    max_label_sets=MAX_KEYWORD_LABELS,
+)
+FANOUT_WAIT = REGISTRY.histogram(
+    "polyflix_fanout_wait_seconds",
+    "Time searches spend queued for a fan-out slot, by pool.",
+    ("pool",),
+)
+SEARCHES_IN_FLIGHT = REGISTRY.register(UpDownCounter(
+    "polyflix_upstream_searches_in_flight",
+    "Search calls currently waiting on the upstream.",
+))
+
+
+def observe_stages(timings_ms: Dict[str, float], total_candidates: int) -> None:
+    """Record a RecommendationResult's stage timings and candidate pool size."""
+    for stage, ms in timings_ms.items():
+        STAGE_LATENCY.observe(ms / 1000, stage)
+    CANDIDATE_POOL_SIZE.observe(total_candidates)
+
+
+def register_stats(name: str, help: str, stats: Callable[[], Dict[str, Any]], keys: Iterable[str]) -> None:
+    """
+    Expose selected numeric fields of a stats() dict as gauges named
+    {name}_{key}, e.g. register_stats("polyflix_search_cache", ..., cache.stats,
+    ["hit_ratio", "entries"]).
+    """
+    for key in keys:
+        REGISTRY.gauge_func(f"{name}_{key}", f"{help} ({key}).", lambda key=key: stats().get(key))
+
+
+def timed_search(search_func: Callable) -> Callable:
+    """
+    Wrap a sync or async search function (query, dedupe_events=True) to record
+    per-keyword upstream latency, raised errors and in-flight calls. Meant to
+    sit innermost, under the cache and single-flight wrappers, so only calls
+    that actually go upstream are measured.
+    """
+    if asyncio.iscoroutinefunction(search_func):
+        async def search(query: str, dedupe_events: bool = True):
+            args, kwargs = search_call_args(query, dedupe_events)
+            SEARCHES_IN_FLIGHT.inc()
+            start = time.perf_counter()
+            try:
+                return await search_func(*args, **kwargs)
+            except Exception as e:
+                UPSTREAM_ERRORS.inc(query, type(e).__name__)
+                raise
+            finally:
+                UPSTREAM_LATENCY.observe(time.perf_counter() - start, query)
+                SEARCHES_IN_FLIGHT.dec()
+    else:
+        def search(query: str, dedupe_events: bool = True):
+            args, kwargs = search_call_args(query, dedupe_events)
+            SEARCHES_IN_FLIGHT.inc()
+            start = time.perf_counter()
+            try:
+                return search_func(*args, **kwargs)
+            except Exception as e:
+                UPSTREAM_ERRORS.inc(query, type(e).__name__)
+                raise
+            finally:
+                UPSTREAM_LATENCY.observe(time.perf_counter() - start, query)
+                SEARCHES_IN_FLIGHT.dec()
+
+    search.__wrapped__ = search_func
+    return search
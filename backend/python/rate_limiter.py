@@ -0,0 +1,447 @@
+"""
+Client-side rate governing for Gamma API calls.
+
+RateGovernor sits in front of the upstream search and combines:
+
+- a TokenBucket that caps the request rate (with a burst allowance),
+- AdaptiveConcurrency, an AIMD limit on in-flight calls: it grows by one
+  slot per window of successful calls and shrinks when latency climbs
+  above its baseline or when Gamma answers 429,
+- a priority queue, so the first keywords of a request are sent before the
+  tail ones (see SEARCH_PRIORITY),
+- retries for throttled calls that honour Retry-After by pausing all
+  admissions, instead of letting every caller hammer the API at once.
+
+Decreases happen at most once per cooldown window, so one burst of 429s
+halves the limit once instead of collapsing it to the minimum. Throughput
+then hovers just under the upstream's real limit rather than swinging
+between overload and backoff.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from cache import search_call_args
+from metrics import FANOUT_WAIT
+
+# Lower runs first. The fan-out sets this to each keyword's position in the
+# request; calls made outside a fan-out (e.g. /api/search) get priority 0.
+SEARCH_PRIORITY: contextvars.ContextVar[int] = contextvars.ContextVar("search_priority", default=0)
+
+
+class UpstreamThrottled(Exception):
+    """Raised when the upstream answers 429 Too Many Requests."""
+
+    def __init__(self, query: str, retry_after: Optional[float] = None):
+        super().__init__(f"upstream throttled query '{query}'")
+        self.query = query
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, holding at most `burst`.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the TokenBucket (full).
+
+        Args:
+            rate: Tokens added per second.
+            burst: Bucket capacity (default max(1, rate)).
+            clock: Monotonic time source, replaceable in tests.
+        """
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token if one is available.
+
+        Returns:
+            0.0 if a token was taken, else seconds until the next one is due
+            (nothing is taken in that case).
+        """
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limit driven by call latency and throttling.
+
+    Each successful call adds 1/limit (about +1 per full window of calls).
+    A 429 multiplies the limit by `backoff`; a call slower than the latency
+    target multiplies it by `latency_backoff`. The target is either fixed or
+    `latency_tolerance` times the lowest recent latency.
+    """
+
+    def __init__(
+        self,
+        initial: int = 16,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_target: Optional[float] = None,
+        latency_tolerance: float = 2.0,
+        backoff: float = 0.5,
+        latency_backoff: float = 0.9,
+        cooldown: float = 1.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the AdaptiveConcurrency limit.
+
+        Args:
+            initial: Starting limit.
+            min_limit: The limit never drops below this.
+            max_limit: The limit never grows above this.
+            latency_target: Fixed latency (seconds) above which the limit
+                            shrinks; None derives it from observed latency.
+            latency_tolerance: Derived target as a multiple of the baseline.
+            backoff: Multiplier applied on a 429.
+            latency_backoff: Multiplier applied on a slow call.
+            cooldown: Minimum seconds between two decreases.
+            clock: Monotonic time source, replaceable in tests.
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.cooldown = cooldown
+        self.clock = clock
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._baseline: Optional[float] = None
+        self._last_decrease = float("-inf")
+
+    @property
+    def limit(self) -> int:
+        """Current number of calls allowed in flight."""
+        return max(self.min_limit, int(self._limit))
+
+    def target(self) -> float:
+        """Latency (seconds) above which a call counts as a congestion signal."""
+        if self.latency_target:
+            return self.latency_target
+        if self._baseline is None:
+            return float("inf")
+        return self._baseline * self.latency_tolerance
+
+    def on_success(self, latency: float) -> None:
+        """Record a completed call; grow the limit unless it was slow."""
+        slow = latency > self.target()
+        # Let the baseline drift up slowly so a lasting latency shift becomes the new normal
+        self._baseline = latency if self._baseline is None else min(latency, self._baseline * 1.01)
+        if slow:
+            self._decrease(self.latency_backoff)
+        else:
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+    def on_throttle(self) -> None:
+        """Record a 429 from the upstream."""
+        self._decrease(self.backoff)
+
+    def _decrease(self, factor: float) -> None:
+        now = self.clock()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._limit = max(self.min_limit, self._limit * factor)
+
+
+class _Waiter:
+    """A queued call; ordered by (priority, arrival)."""
+
+    __slots__ = ("priority", "seq", "wake")
+
+    def __init__(self, priority: int, seq: int, wake: Callable[[], None]):
+        self.priority = priority
+        self.seq = seq
+        self.wake = wake
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class RateGovernor:
+    """
+    Admits upstream calls through a token bucket and an adaptive concurrency
+    limit, highest priority first, retrying throttled calls.
+
+    Works for sync callers (threads) and async callers (any event loop);
+    both share the same limits when mixed.
+    """
+
+    def __init__(
+        self,
+        bucket: Optional[TokenBucket] = None,
+        concurrency: Optional[AdaptiveConcurrency] = None,
+        max_retries: int = 2,
+        default_retry_after: float = 1.0,
+        max_retry_after: float = 10.0,
+        name: str = "gamma",
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the RateGovernor.
+
+        Args:
+            bucket: Optional TokenBucket; None means no rate cap.
+            concurrency: AdaptiveConcurrency limit (default AdaptiveConcurrency()).
+            max_retries: Retries for a throttled call before UpstreamThrottled
+                         is raised to the caller.
+            default_retry_after: Pause (seconds) after a 429 without Retry-After.
+            max_retry_after: Cap on the pause taken from Retry-After.
+            name: Metrics label for queue wait time.
+            clock: Monotonic time source, replaceable in tests.
+        """
+        self.bucket = bucket
+        self.concurrency = concurrency or AdaptiveConcurrency(clock=clock)
+        self.max_retries = max_retries
+        self.default_retry_after = default_retry_after
+        self.max_retry_after = max_retry_after
+        self.name = name
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+
+    @classmethod
+    def from_env(cls, prefix: str = "GAMMA") -> "RateGovernor":
+        """
+        Build a governor from environment variables:
+
+            {prefix}_RATE_LIMIT          requests/second, 0 = no rate cap (default 0)
+            {prefix}_RATE_BURST          token bucket capacity (default = rate)
+            {prefix}_CONCURRENCY         initial in-flight limit (default 16)
+            {prefix}_CONCURRENCY_MIN     lower bound (default 1)
+            {prefix}_CONCURRENCY_MAX     upper bound (default 64)
+            {prefix}_LATENCY_TARGET_MS   fixed latency target, 0 = derived (default 0)
+            {prefix}_MAX_RETRIES         retries per throttled call (default 2)
+        """
+        env = os.environ.get
+        rate = float(env(f"{prefix}_RATE_LIMIT", 0))
+        burst = float(env(f"{prefix}_RATE_BURST", 0)) or None
+        latency_target_ms = float(env(f"{prefix}_LATENCY_TARGET_MS", 0))
+        return cls(
+            bucket=TokenBucket(rate, burst) if rate > 0 else None,
+            concurrency=AdaptiveConcurrency(
+                initial=int(env(f"{prefix}_CONCURRENCY", 16)),
+                min_limit=int(env(f"{prefix}_CONCURRENCY_MIN", 1)),
+                max_limit=int(env(f"{prefix}_CONCURRENCY_MAX", 64)),
+                latency_target=latency_target_ms / 1000 or None,
+            ),
+            max_retries=int(env(f"{prefix}_MAX_RETRIES", 2)),
+        )
+
+    # -- admission -----------------------------------------------------------
+
+    def _enqueue(self, priority: int, wake: Callable[[], None]) -> _Waiter:
+        waiter = _Waiter(priority, next(self._seq), wake)
+        with self._lock:
+            heapq.heappush(self._queue, waiter)
+            self.calls += 1
+        return waiter
+
+    def _admit(self, waiter: _Waiter) -> Optional[float]:
+        """
+        Admit waiter if it is at the head of the queue and a slot, a token and
+        the throttle pause all allow it. Must hold self._lock.
+
+        Returns:
+            0.0 if admitted, seconds to wait before retrying, or None to wait
+            until woken by a release.
+        """
+        if self._queue[0] is not waiter or self._in_flight >= self.concurrency.limit:
+            return None
+        now = self.clock()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.bucket is not None:
+            delay = self.bucket.reserve()
+            if delay > 0:
+                return delay
+        heapq.heappop(self._queue)
+        self._in_flight += 1
+        # The next waiter may fit too (limit > in_flight, burst tokens left)
+        self._wake_head()
+        return 0.0
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Drop a waiter that gave up (cancelled or errored) while queued."""
+        with self._lock:
+            if waiter in self._queue:
+                self._queue.remove(waiter)
+                heapq.heapify(self._queue)
+                self._wake_head()
+
+    def _wake_head(self) -> None:
+        if self._queue:
+            self._queue[0].wake()
+
+    def acquire(self, priority: int = 0) -> None:
+        """Block the calling thread until a call may go upstream."""
+        event = threading.Event()
+        enqueued = time.perf_counter()
+        waiter = self._enqueue(priority, event.set)
+        admitted = False
+        try:
+            while True:
+                with self._lock:
+                    delay = self._admit(waiter)
+                    if delay == 0.0:
+                        admitted = True
+                        break
+                    event.clear()
+                event.wait(delay)
+        finally:
+            if not admitted:
+                self._abandon(waiter)
+        FANOUT_WAIT.observe(time.perf_counter() - enqueued, self.name)
+
+    async def acquire_async(self, priority: int = 0) -> None:
+        """Wait (without blocking the event loop) until a call may go upstream."""
+        event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        enqueued = time.perf_counter()
+        waiter = self._enqueue(priority, lambda: loop.call_soon_threadsafe(event.set))
+        admitted = False
+        try:
+            while True:
+                with self._lock:
+                    delay = self._admit(waiter)
+                    if delay == 0.0:
+                        admitted = True
+                        break
+                    event.clear()
+                try:
+                    await asyncio.wait_for(event.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if not admitted:
+                self._abandon(waiter)
+        FANOUT_WAIT.observe(time.perf_counter() - enqueued, self.name)
+
+    def release(self, latency: float, outcome: str = "ok", retry_after: Optional[float] = None) -> None:
+        """
+        Free the slot taken by acquire() and feed the outcome to the limit.
+
+        Args:
+            latency: Seconds the upstream call took.
+            outcome: "ok", "throttled" (429) or "error" (other exception,
+                     which doesn't move the limit).
+            retry_after: Retry-After seconds sent with a 429, if any.
+        """
+        with self._lock:
+            self._in_flight -= 1
+            if outcome == "ok":
+                self.concurrency.on_success(latency)
+            elif outcome == "throttled":
+                self.throttled += 1
+                self.concurrency.on_throttle()
+                pause = min(retry_after or self.default_retry_after, self.max_retry_after)
+                self._paused_until = max(self._paused_until, self.clock() + pause)
+            self._wake_head()
+
+    # -- calls ---------------------------------------------------------------
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) under the governor at SEARCH_PRIORITY,
+        retrying on UpstreamThrottled up to max_retries times.
+        """
+        priority = SEARCH_PRIORITY.get()
+        for attempt in itertools.count():
+            self.acquire(priority)
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except UpstreamThrottled as e:
+                self.release(time.perf_counter() - start, "throttled", e.retry_after)
+                if attempt >= self.max_retries:
+                    raise
+                self.retries += 1
+                continue
+            except BaseException:
+                self.release(time.perf_counter() - start, "error")
+                raise
+            self.release(time.perf_counter() - start)
+            return result
+
+    async def call_async(self, fn: Callable, *args, **kwargs) -> Any:
+        """Async counterpart of call() for coroutine functions."""
+        priority = SEARCH_PRIORITY.get()
+        for attempt in itertools.count():
+            await self.acquire_async(priority)
+            start = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except UpstreamThrottled as e:
+                self.release(time.perf_counter() - start, "throttled", e.retry_after)
+                if attempt >= self.max_retries:
+                    raise
+                self.retries += 1
+                continue
+            except BaseException:
+                self.release(time.perf_counter() - start, "error")
+                raise
+            self.release(time.perf_counter() - start)
+            return result
+
+    def wrap(self, search_func: Callable) -> Callable:
+        """Govern a sync or async search function (query, dedupe_events=True)."""
+        if asyncio.iscoroutinefunction(search_func):
+            async def search(query: str, dedupe_events: bool = True) -> List[Dict[str, Any]]:
+                args, kwargs = search_call_args(query, dedupe_events)
+                return await self.call_async(search_func, *args, **kwargs)
+        else:
+            def search(query: str, dedupe_events: bool = True) -> List[Dict[str, Any]]:
+                args, kwargs = search_call_args(query, dedupe_events)
+                return self.call(search_func, *args, **kwargs)
+
+        search.__wrapped__ = search_func
+        return search
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the current limits and counters.
+
+        Returns:
+            Dict with limit, in_flight, queued, rate, calls, throttled,
+            retries and paused_ms (time left on a Retry-After pause).
+        """
+        with self._lock:
+            return {
+                "limit": self.concurrency.limit,
+                "in_flight": self._in_flight,
+                "queued": len(self._queue),
+                "rate": self.bucket.rate if self.bucket is not None else None,
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "paused_ms": max(0.0, self._paused_until - self.clock()) * 1000,
+            }
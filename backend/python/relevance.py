@@ -0,0 +1,169 @@
+"""
+RelevanceScorer: local TF-IDF relevance of candidate markets to a watchlist.
+
+Titles become sparse TF-IDF vectors over their meaningful tokens. A candidate's
+relevance is the cosine similarity between its vector and the centroid of the
+watchlist vectors, computed for the whole candidate pool in one sparse
+matrix-vector product (SciPy) or with dict-based sparse vectors when SciPy is
+not installed. IDF statistics come from the market catalog when it is loaded
+and otherwise from the candidate pool itself plus the watchlist, so relevance
+separates on-topic results from incidental keyword matches without widening
+the upstream fan-out.
+"""
+
+import math
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+from tokenizer import STOP_WORDS, TOKEN_CACHE_SIZE, tokenize
+
+# SciPy sparse matrices power the vectorized path (falls back to dict vectors)
+try:
+    import numpy as np
+    from scipy import sparse
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+    np = None
+    sparse = None
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def relevance_terms(title: str) -> Tuple[str, ...]:
+    """
+    Terms of a title for TF-IDF: tokens that aren't stop words, numbers or
+    shorter than 3 characters (repeats kept, they are the term frequency).
+    """
+    return tuple(
+        token for token in tokenize(title)
+        if token not in STOP_WORDS and len(token) > 2 and not any(c.isdigit() for c in token)
+    )
+
+
+class _PoolFrequencies:
+    """Document frequencies over the titles being scored (when no catalog is loaded)."""
+
+    def __init__(self, term_lists: List[Tuple[str, ...]]):
+        self.document_count = len(term_lists)
+        self._df = Counter(term for terms in term_lists for term in set(terms))
+
+    def document_frequency(self, term: str) -> int:
+        return self._df.get(term, 0)
+
+
+class RelevanceScorer:
+    """Cosine similarity of candidate titles to a watchlist's TF-IDF centroid."""
+
+    def __init__(self, catalog: Any = None):
+        """
+        Initialize the RelevanceScorer.
+
+        Args:
+            catalog: Optional MarketCatalog (anything with ready, document_count
+                     and document_frequency(term)) to take IDF statistics from.
+                     Until it is ready, IDF comes from the candidate pool.
+        """
+        self.catalog = catalog
+
+    def score(self, reference_titles: List[str], candidates: List[Dict[str, Any]]) -> List[float]:
+        """
+        Relevance of each candidate to the reference titles.
+
+        Args:
+            reference_titles: Watchlist titles (or a source market's title).
+            candidates: Market dictionaries with a title.
+
+        Returns:
+            One similarity in [0, 1] per candidate, in input order; all 1.0 if
+            the reference titles have no usable terms (nothing to compare to).
+        """
+        if not candidates:
+            return []
+        reference_terms = [relevance_terms(title) for title in reference_titles]
+        candidate_terms = [relevance_terms(m.get("title", "")) for m in candidates]
+        if not any(reference_terms):
+            return [1.0] * len(candidates)
+
+        if self.catalog is not None and self.catalog.ready:
+            frequencies = self.catalog
+        else:
+            frequencies = _PoolFrequencies(candidate_terms + reference_terms)
+        idf = _idf_weights(frequencies, reference_terms, candidate_terms)
+
+        if SCIPY_AVAILABLE:
+            return _cosine_sparse(reference_terms, candidate_terms, idf)
+        return _cosine_dicts(reference_terms, candidate_terms, idf)
+
+
+def _idf_weights(frequencies: Any, *term_lists: List[Tuple[str, ...]]) -> Dict[str, float]:
+    """Smoothed IDF, ln((1 + N) / (1 + df)) + 1, for every term that occurs."""
+    n = frequencies.document_count
+    terms = {term for lists in term_lists for terms in lists for term in terms}
+    return {term: math.log((1 + n) / (1 + frequencies.document_frequency(term))) + 1 for term in terms}
+
+
+def _unit_vector(terms: Tuple[str, ...], idf: Dict[str, float]) -> Dict[str, float]:
+    """L2-normalized TF-IDF vector of one title as {term: weight}."""
+    weights = {term: count * idf[term] for term, count in Counter(terms).items()}
+    norm = math.sqrt(sum(w * w for w in weights.values()))
+    return {term: w / norm for term, w in weights.items()} if norm else {}
+
+
+def _centroid(reference_terms: List[Tuple[str, ...]], idf: Dict[str, float]) -> Dict[str, float]:
+    """L2-normalized mean of the reference titles' unit vectors."""
+    total: Dict[str, float] = {}
+    for terms in reference_terms:
+        for term, w in _unit_vector(terms, idf).items():
+            total[term] = total.get(term, 0.0) + w
+    norm = math.sqrt(sum(w * w for w in total.values()))
+    return {term: w / norm for term, w in total.items()}
+
+
+def _cosine_dicts(
+    reference_terms: List[Tuple[str, ...]],
+    candidate_terms: List[Tuple[str, ...]],
+    idf: Dict[str, float]
+) -> List[float]:
+    """Pure-Python cosine similarities over dict sparse vectors."""
+    centroid = _centroid(reference_terms, idf)
+    similarities = []
+    for terms in candidate_terms:
+        vector = _unit_vector(terms, idf)
+        similarities.append(min(1.0, sum(w * centroid.get(term, 0.0) for term, w in vector.items())))
+    return similarities
+
+
+def _cosine_sparse(
+    reference_terms: List[Tuple[str, ...]],
+    candidate_terms: List[Tuple[str, ...]],
+    idf: Dict[str, float]
+) -> List[float]:
+    """
+    Cosine similarities as one CSR matrix-vector product: candidate TF-IDF
+    rows times the centroid, divided by the row norms.
+    """
+    centroid = _centroid(reference_terms, idf)
+    vocabulary = {term: i for i, term in enumerate(idf)}
+    query = np.zeros(len(vocabulary))
+    for term, w in centroid.items():
+        query[vocabulary[term]] = w
+
+    indptr = [0]
+    indices: List[int] = []
+    data: List[float] = []
+    for terms in candidate_terms:
+        for term, count in Counter(terms).items():
+            indices.append(vocabulary[term])
+            data.append(count * idf[term])
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(candidate_terms), len(vocabulary)),
+    )
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    dots = matrix @ query
+    with np.errstate(invalid="ignore", divide="ignore"):
+        similarities = np.where(norms > 0, dots / norms, 0.0)
+    return np.minimum(similarities, 1.0).tolist()
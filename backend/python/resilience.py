@@ -0,0 +1,383 @@
+"""
+Tail-latency and failure protection for upstream Gamma searches.
+
+Resilience wraps a search function that raises on failure (see
+search_gamma_api's raise_errors) with:
+
+- hedged requests: if a call hasn't answered within the recent p95
+  latency, a duplicate is sent and whichever answers first wins; the
+  loser is cancelled,
+- bounded retries with full-jitter exponential backoff for transient
+  errors (connection problems, timeouts, 5xx),
+- a CircuitBreaker that fails fast with CircuitOpen after repeated
+  transient failures, then lets a single probe through once the reset
+  timeout has passed.
+
+Hedges are only sent while the breaker is closed, so a struggling upstream
+never sees duplicate load. 429s are left to rate_limiter.RateGovernor.
+"""
+
+import asyncio
+import contextvars
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from cache import search_call_args
+
+# Sync hedging runs both the primary and the duplicate call here
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling the upstream while the breaker is open."""
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether an error is worth retrying: transport failures and 5xx responses."""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed -> open after failure_threshold transient failures in a row;
+    open -> half_open once reset_timeout has passed; half_open lets one
+    probe through and closes on success or reopens on failure.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the CircuitBreaker (closed).
+
+        Args:
+            failure_threshold: Consecutive failures that open the breaker.
+            reset_timeout: Seconds to stay open before probing, and the
+                           longest a single probe may hold the half-open slot.
+            clock: Monotonic time source, replaceable in tests.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opens = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now (claims the probe when half-open)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = self.clock()
+            if self.state == OPEN:
+                if now - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+            # A probe that never reported back (e.g. cancelled) expires after reset_timeout
+            if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self._probe_started = now
+            return True
+
+    def record_success(self) -> None:
+        """The upstream answered: close the breaker."""
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        """A transient failure: open the breaker if it was probing or over the threshold."""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opens += 1
+                self.state = OPEN
+                self._opened_at = self.clock()
+                self._probe_started = None
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies, for the hedge delay."""
+
+    def __init__(self, window: int = 500):
+        self._samples: deque = deque(maxlen=window)
+
+    def add(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The q-quantile (0-1) of the window, or None if it's empty."""
+        if not self._samples:
+            return None
+        values = sorted(self._samples)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Resilience:
+    """
+    Hedging, retries and a circuit breaker around one upstream search
+    function. Supports sync and async search functions via wrap().
+    """
+
+    def __init__(
+        self,
+        breaker: Optional[CircuitBreaker] = None,
+        retries: int = 2,
+        backoff_base: float = 0.1,
+        backoff_max: float = 2.0,
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        hedge_min_delay: float = 0.05,
+        hedge_max_delay: float = 2.0,
+        min_samples: int = 20,
+        rng: Optional[random.Random] = None
+    ):
+        """
+        Initialize Resilience.
+
+        Args:
+            breaker: CircuitBreaker (default CircuitBreaker()).
+            retries: Retries per call for transient errors.
+            backoff_base: Backoff cap (seconds) for the first retry; doubles per retry.
+            backoff_max: Upper bound on the backoff cap.
+            hedge: Whether to send hedged duplicates for slow calls.
+            hedge_quantile: Latency quantile after which a call is hedged.
+            hedge_min_delay: Lower bound on the hedge delay (seconds).
+            hedge_max_delay: Upper bound on the hedge delay (seconds).
+            min_samples: Latencies to observe before hedging starts.
+            rng: Random source for backoff jitter.
+        """
+        self.breaker = breaker or CircuitBreaker()
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self.min_samples = min_samples
+        self.rng = rng or random.Random()
+        self.latencies = LatencyTracker()
+        self.calls = 0
+        self.retried = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @classmethod
+    def from_env(cls, prefix: str = "GAMMA") -> "Resilience":
+        """
+        Build from environment variables:
+
+            {prefix}_ERROR_RETRIES             retries for transient errors (default 2)
+            {prefix}_RETRY_BACKOFF_MS          first backoff cap (default 100)
+            {prefix}_HEDGE                     "0" disables hedging (default on)
+            {prefix}_HEDGE_QUANTILE            hedge after this latency quantile (default 0.95)
+            {prefix}_HEDGE_MIN_MS              lower bound on the hedge delay (default 50)
+            {prefix}_BREAKER_FAILURES          consecutive failures to open (default 5)
+            {prefix}_BREAKER_RESET_SECONDS     open time before probing (default 30)
+        """
+        env = os.environ.get
+        return cls(
+            breaker=CircuitBreaker(
+                failure_threshold=int(env(f"{prefix}_BREAKER_FAILURES", 5)),
+                reset_timeout=float(env(f"{prefix}_BREAKER_RESET_SECONDS", 30)),
+            ),
+            retries=int(env(f"{prefix}_ERROR_RETRIES", 2)),
+            backoff_base=float(env(f"{prefix}_RETRY_BACKOFF_MS", 100)) / 1000,
+            hedge=env(f"{prefix}_HEDGE", "1") != "0",
+            hedge_quantile=float(env(f"{prefix}_HEDGE_QUANTILE", 0.95)),
+            hedge_min_delay=float(env(f"{prefix}_HEDGE_MIN_MS", 50)) / 1000,
+        )
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None if hedging is off for now."""
+        if not self.hedge or self.breaker.state != CLOSED or len(self.latencies) < self.min_samples:
+            return None
+        delay = self.latencies.quantile(self.hedge_quantile)
+        return min(max(delay, self.hedge_min_delay), self.hedge_max_delay)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter backoff before retry number attempt + 1."""
+        return self.rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _settle(self, error: Optional[Exception], attempt: int) -> bool:
+        """
+        Feed an attempt's outcome to the breaker.
+
+        Returns:
+            True if the call should be retried.
+        """
+        if error is None or not is_transient(error):
+            # The upstream answered (even a 4xx or 429), so it isn't down
+            self.breaker.record_success()
+            return False
+        self.breaker.record_failure()
+        if attempt >= self.retries or self.breaker.state == OPEN:
+            return False
+        self.retried += 1
+        return True
+
+    # -- sync ----------------------------------------------------------------
+
+    def _timed(self, fn: Callable, args, kwargs) -> Any:
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.latencies.add(time.perf_counter() - start)
+        return result
+
+    def _attempt(self, fn: Callable, args, kwargs) -> Any:
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._timed(fn, args, kwargs)
+
+        def submit():
+            return _hedge_executor.submit(contextvars.copy_context().run, self._timed, fn, args, kwargs)
+
+        futures = [submit()]
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            self.hedges += 1
+            futures.append(submit())
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if len(futures) > 1 and future is futures[1]:
+                        self.hedge_wins += 1
+                    # A losing thread can't be interrupted; its result is dropped
+                    return future.result()
+        return futures[0].result()
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """Call fn with hedging, retries and the breaker; raises CircuitOpen when open."""
+        self.calls += 1
+        for attempt in itertools.count():
+            if not self.breaker.allow():
+                raise CircuitOpen("upstream circuit breaker is open")
+            try:
+                result = self._attempt(fn, args, kwargs)
+            except Exception as e:
+                if not self._settle(e, attempt):
+                    raise
+                time.sleep(self.backoff(attempt))
+                continue
+            self._settle(None, attempt)
+            return result
+
+    # -- async ---------------------------------------------------------------
+
+    async def _timed_async(self, fn: Callable, args, kwargs) -> Any:
+        start = time.perf_counter()
+        result = await fn(*args, **kwargs)
+        self.latencies.add(time.perf_counter() - start)
+        return result
+
+    async def _attempt_async(self, fn: Callable, args, kwargs) -> Any:
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._timed_async(fn, args, kwargs)
+
+        tasks = [asyncio.ensure_future(self._timed_async(fn, args, kwargs))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedges += 1
+                tasks.append(asyncio.ensure_future(self._timed_async(fn, args, kwargs)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1 and task is tasks[1]:
+                            self.hedge_wins += 1
+                        return task.result()
+            # Every attempt failed: surface the primary's error
+            return tasks[0].result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def call_async(self, fn: Callable, *args, **kwargs) -> Any:
+        """Async counterpart of call() for coroutine functions."""
+        self.calls += 1
+        for attempt in itertools.count():
+            if not self.breaker.allow():
+                raise CircuitOpen("upstream circuit breaker is open")
+            try:
+                result = await self._attempt_async(fn, args, kwargs)
+            except Exception as e:
+                if not self._settle(e, attempt):
+                    raise
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+            self._settle(None, attempt)
+            return result
+
+    def wrap(self, search_func: Callable) -> Callable:
+        """Protect a sync or async search function (query, dedupe_events=True)."""
+        if asyncio.iscoroutinefunction(search_func):
+            async def search(query: str, dedupe_events: bool = True) -> List[Dict[str, Any]]:
+                args, kwargs = search_call_args(query, dedupe_events)
+                return await self.call_async(search_func, *args, **kwargs)
+        else:
+            def search(query: str, dedupe_events: bool = True) -> List[Dict[str, Any]]:
+                args, kwargs = search_call_args(query, dedupe_events)
+                return self.call(search_func, *args, **kwargs)
+
+        search.__wrapped__ = search_func
+        return search
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get breaker state and hedging/retry counters.
+
+        Returns:
+            Dict with breaker_state (and its numeric breaker_state_code:
+            0 closed, 1 half-open, 2 open), breaker_opens, breaker_rejected,
+            calls, retries, hedges, hedge_wins, hedge_win_ratio and
+            hedge_delay_ms (None until enough latencies are observed).
+        """
+        delay = self.hedge_delay()
+        return {
+            "breaker_state": self.breaker.state,
+            "breaker_state_code": STATE_CODES[self.breaker.state],
+            "breaker_opens": self.breaker.opens,
+            "breaker_rejected": self.breaker.rejected,
+            "calls": self.calls,
+            "retries": self.retried,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_win_ratio": self.hedge_wins / self.hedges if self.hedges else 0.0,
+            "hedge_delay_ms": delay * 1000 if delay is not None else None,
+        }
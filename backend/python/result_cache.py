@@ -0,0 +1,164 @@
+"""
+Per-user cache of rendered /api/recommendations responses.
+
+The frontend asks for recommendations again on every page navigation with
+the same watchlist and dislikes. Responses are cached under a fingerprint of
+the request, an order-independent hash of the watchlist IDs and titles
+and the dislike IDs, as already-encoded JSON with an ETag. The ETag hashes
+only the recommendations and keywords (not timings or cache bookkeeping), so
+a recompute that yields the same list keeps it. A repeat request is answered
+from memory, or with 304 Not Modified when the client sends the ETag back in
+If-None-Match.
+
+Entries live in a TTLCache with a short TTL and LRU eviction and no
+stale-while-revalidate: a slightly old recommendation is refreshed by the
+next request, not served.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from cache import TTLCache
+
+
+def request_fingerprint(
+    watchlist: List[Dict[str, Any]],
+    disliked_items: Optional[List[Dict[str, Any]]] = None,
+    top_n: int = 10
+) -> str:
+    """
+    Canonical hash of a recommendation request.
+
+    Watchlist entries contribute their ID and normalized title, since keywords
+    come from titles. Dislikes contribute their IDs. Both are sorted, so
+    reordering the lists doesn't change the fingerprint.
+
+    Returns:
+        32-character hex digest.
+    """
+    canonical = {
+        "watchlist": sorted(
+            (str(m.get("id", "")), " ".join((m.get("title") or "").lower().split())) for m in watchlist
+        ),
+        "disliked": sorted(str(m.get("id", "")) for m in disliked_items or []),
+        "top_n": top_n,
+    }
+    encoded = json.dumps(canonical, separators=(",", ":"), ensure_ascii=False).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def response_etag(
+    recommendations: List[Dict[str, Any]],
+    keywords: List[str],
+    negative_keywords: List[str]
+) -> str:
+    """
+    ETag of a recommendation response's content.
+
+    Hashes the recommendations (in rank order) and the keywords, leaving out
+    per-run fields like timings_ms and cached_keywords, so recomputing the
+    same recommendations gives the same ETag.
+
+    Returns:
+        Quoted 24-character hex digest.
+    """
+    canonical = {
+        "recommendations": recommendations,
+        "keywords": keywords,
+        "negative_keywords": negative_keywords,
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode()
+    return f'"{hashlib.blake2b(encoded, digest_size=12).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches etag (weak comparison, * allowed)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class CachedResponse:
+    """An encoded response body and its ETag."""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes, etag: str):
+        self.body = body
+        self.etag = etag
+
+
+class ResultCache:
+    """Encoded recommendation responses keyed by request_fingerprint()."""
+
+    def __init__(self, cache: Optional[TTLCache] = None):
+        """
+        Initialize the ResultCache.
+
+        Args:
+            cache: Backing TTLCache (default: 30s TTL, 10k entries, no stale serving).
+        """
+        if cache is None:
+            cache = TTLCache(max_entries=10000, max_bytes=64 * 1024 * 1024, ttl=30.0, stale_ttl=0.0, sizeof=_body_size)
+        self.cache = cache
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, prefix: str = "RESULT_CACHE") -> "ResultCache":
+        """
+        Build from <prefix>_TTL (seconds, default 30; 0 disables caching),
+        <prefix>_MAX_ENTRIES (default 10000) and <prefix>_MAX_BYTES.
+        """
+        return cls(TTLCache(
+            max_entries=int(os.environ.get(f"{prefix}_MAX_ENTRIES", 10000)),
+            max_bytes=int(os.environ.get(f"{prefix}_MAX_BYTES", 64 * 1024 * 1024)),
+            ttl=float(os.environ.get(f"{prefix}_TTL", 30.0)),
+            stale_ttl=0.0,
+            sizeof=_body_size,
+        ))
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache.ttl > 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """The cached response for a fingerprint, if still fresh."""
+        value, state = self.cache.lookup(key)
+        return value if state == "fresh" else None
+
+    def put(self, key: str, body: bytes, etag: str) -> CachedResponse:
+        """
+        Cache an encoded body and its ETag (from response_etag()) under a fingerprint.
+
+        Returns:
+            The CachedResponse.
+        """
+        entry = CachedResponse(body, etag)
+        if self.enabled:
+            self.cache.set(key, entry)
+        return entry
+
+    def record_not_modified(self) -> None:
+        """Count a 304 Not Modified answered from an ETag match."""
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            The TTLCache stats plus not_modified (304 responses sent).
+        """
+        with self._lock:
+            not_modified = self.not_modified
+        return {**self.cache.stats(), "not_modified": not_modified}
+
+
+def _body_size(entry: CachedResponse) -> int:
+    return len(entry.body) + len(entry.etag)
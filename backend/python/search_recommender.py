@@ -3,123 +3,160 @@ SearchRecommender: A meta-search engine with weighted scoring for Polyflix.
 Implements the "Search, Sieve, and Score" workflow.
 """
 
+import logging
 import os
 import math
-import string
+import heapq
 import httpx
-import json
+import time
+import uuid
 from collections import Counter
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Set, Any, Optional
-from datetime import datetime, timezone
-
-# Gemini setup - uses free tier
+from operator import itemgetter
+from dataclasses import dataclass, field
+from concurrent.futures import TimeoutError as FutureTimeoutError, as_completed
+from typing import List, Dict, Iterator, Set, Any, Optional, Tuple
+from datetime import datetime
+
+from cache import TTLCache, wrap_search
+from fanout import FanoutExecutor, shared_executor
+from keyword_extractor import KeywordExtractor, shared_extractor
+from keyword_extractor import extract_keywords_with_gemini  # noqa: F401  # re-exported for test_gemini
+from singleflight import SingleFlight, singleflight_search
+from tokenizer import STOP_WORDS, tokenize, token_set, topic_signature
+from metrics import UPSTREAM_ERRORS, observe_stages, timed_search
+from rate_limiter import SEARCH_PRIORITY, UpstreamThrottled
+from relevance import RelevanceScorer
+from tracing import current_trace
+
+# NumPy powers the vectorized score_batch path (falls back to per-market scoring)
 try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
+    import numpy as np
+    NUMPY_AVAILABLE = True
 except ImportError:
-    GEMINI_AVAILABLE = False
-    genai = None
+    NUMPY_AVAILABLE = False
+    np = None
 
-GAMMA_API_URL = "https://gamma-api.polymarket.com/public-search"
+# Point GAMMA_BASE_URL (or GAMMA_API_URL directly) at a local fake_gamma.py server for load tests
+GAMMA_BASE_URL = os.environ.get("GAMMA_BASE_URL", "https://gamma-api.polymarket.com").rstrip("/")
+GAMMA_API_URL = os.environ.get("GAMMA_API_URL", f"{GAMMA_BASE_URL}/public-search")
 
 
-def extract_keywords_with_gemini(
-    titles: List[str],
-    num_keywords: int = 5,
-    api_key: Optional[str] = None
-) -> Optional[List[str]]:
+def _normalize_market(
+    market: Dict[str, Any],
+    event: Dict[str, Any],
+    query: str
+) -> Dict[str, Any]:
     """
-    Use Gemini to extract search keywords from watchlist titles.
+    Convert one Gamma market (or a market-less event) into our market dict.
 
     Args:
-        titles: List of market titles from user's watchlist.
-        num_keywords: Number of keywords to extract.
-        api_key: Gemini API key (falls back to GEMINI_API_KEY env var).
+        market: Raw Gamma market object (pass the event itself for events
+                without a markets array).
+        event: The raw event the market belongs to.
+        query: The search term, recorded on the market as query_matched.
 
     Returns:
-        List of keywords, or None if Gemini is unavailable/fails.
+        Market dictionary with id, title, volume, dates and event metadata,
+        plus internal _created_ts/_end_ts epoch seconds (see public_market).
     """
-    if not GEMINI_AVAILABLE:
-        print("Gemini SDK not available, falling back to heuristic extraction")
-        return None
+    if market is event:
+        # No markets array, treat the event itself as a market
+        normalized = {
+            "id": event.get("id", ""),
+            "title": event.get("title", ""),
+            "volume": int(float(event.get("volume", 0))),
+            "query_matched": query,
+            "image": event.get("image", ""),
+            "slug": event.get("slug", ""),
+            "created_at": event.get("createdAt"),
+            "end_date": event.get("endDate"),
+            "event_id": event.get("id", ""),
+        }
+    else:
+        normalized = {
+            "id": market.get("id", ""),
+            "title": market.get("question", event.get("title", "")),
+            "volume": int(float(market.get("volume", 0))),
+            "query_matched": query,
+            "image": event.get("image", ""),
+            "slug": event.get("slug", ""),
+            "created_at": market.get("createdAt") or event.get("createdAt"),
+            "end_date": market.get("endDate") or event.get("endDate"),
+            "event_id": event.get("id", ""),
+        }
 
-    api_key = api_key or os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        print("No GEMINI_API_KEY found, falling back to heuristic extraction")
-        return None
+    # Parse dates once here so scoring only does integer arithmetic
+    normalized["_created_ts"] = _to_epoch(normalized["created_at"])
+    normalized["_end_ts"] = _to_epoch(normalized["end_date"])
+    return normalized
 
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
 
-        prompt = f"""You are helping find prediction markets similar to a user's watchlist.
+def _normalize_event(
+    event: Dict[str, Any],
+    query: str,
+    dedupe_events: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Convert a raw Gamma event into market dictionaries.
 
-Given these prediction market titles from a user's watchlist:
-{chr(10).join(f'- {title}' for title in titles)}
+    Args:
+        event: Raw Gamma event object (from public-search or /events).
+        query: The search term, recorded on each market as query_matched.
+        dedupe_events: If True, only keep the highest-volume market of the event.
 
-Extract {num_keywords} search keywords/phrases that would find SIMILAR prediction markets.
+    Returns:
+        List of market dictionaries.
+    """
+    event_markets = event.get("markets", [])
 
-Rules:
-- Focus on topics, entities, and themes (e.g., "NBA", "Bitcoin", "Trump", "Oscar")
-- Include both broad categories and specific entities
-- Do NOT include numbers, dates, prices, or years
-- Do NOT include generic words like "win", "price", "above", "prediction"
-- Each keyword should be 1-3 words
+    if not event_markets:
+        return [_normalize_market(event, event, query)]
 
-Return ONLY a JSON array of strings, nothing else. Example: ["NBA finals", "Lakers", "basketball championship"]"""
+    if dedupe_events:
+        # Only keep the highest-volume market from each event
+        best_market = max(event_markets, key=lambda m: float(m.get("volume", 0)))
+        return [_normalize_market(best_market, event, query)]
 
-        response = model.generate_content(prompt)
-        text = response.text.strip()
+    # Return all markets from the event
+    return [_normalize_market(market, event, query) for market in event_markets]
 
-        # Parse JSON response
-        # Handle markdown code blocks if present
-        if text.startswith("```"):
-            text = text.split("```")[1]
-            if text.startswith("json"):
-                text = text[4:]
-            text = text.strip()
 
-        keywords = json.loads(text)
+def _parse_search_response(
+    data: Dict[str, Any],
+    query: str,
+    dedupe_events: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Convert a raw Gamma public-search payload into market dictionaries.
 
-        if isinstance(keywords, list) and all(isinstance(k, str) for k in keywords):
-            print(f"Gemini extracted keywords: {keywords}")
-            return keywords[:num_keywords]
-        else:
-            print(f"Gemini returned unexpected format: {text}")
-            return None
+    Args:
+        data: Decoded JSON body from the public-search endpoint.
+        query: The search term, recorded on each market as query_matched.
+        dedupe_events: If True, only keep the highest-volume market per event.
 
-    except Exception as e:
-        print(f"Gemini extraction failed: {e}")
+    Returns:
+        List of market dictionaries with id, title, and volume.
+    """
+    markets = []
+    for event in data.get("events", []):
+        markets.extend(_normalize_event(event, query, dedupe_events))
+    return markets
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds from a Retry-After header, or None if absent or an HTTP date."""
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
         return None
 
 
-# Stop words to filter out non-meaningful words
-STOP_WORDS = {
-    'the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
-    'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
-    'should', 'may', 'might', 'must', 'shall', 'can', 'need', 'dare',
-    'ought', 'used', 'to', 'of', 'in', 'for', 'on', 'with', 'at', 'by',
-    'from', 'as', 'into', 'through', 'during', 'before', 'after', 'above',
-    'below', 'between', 'under', 'again', 'further', 'then', 'once', 'here',
-    'there', 'when', 'where', 'why', 'how', 'all', 'each', 'few', 'more',
-    'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own',
-    'same', 'so', 'than', 'too', 'very', 'just', 'and', 'but', 'if', 'or',
-    'because', 'until', 'while', 'this', 'that', 'these', 'those', 'what',
-    'which', 'who', 'whom', 'win', 'price', 'market', 'prediction', 'will',
-    'yes', 'no', 'over', 'under', 'reach', 'hit', 'end', 'year', 'week',
-    # Months - explicitly exclude to prevent date-based clustering
-    'january', 'february', 'march', 'april', 'may', 'june',
-    'july', 'august', 'september', 'october', 'november', 'december',
-    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
-    # Time-related words that don't add semantic meaning
-    'today', 'tomorrow', 'yesterday', 'week', 'month', 'day', 'days', 'weeks', 'months',
-    'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday',
-    'mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'
-}
-
-
-def search_gamma_api(query: str, dedupe_events: bool = True) -> List[Dict[str, Any]]:
+def search_gamma_api(
+    query: str,
+    dedupe_events: bool = True,
+    client: Optional[httpx.Client] = None,
+    raise_errors: bool = False
+) -> List[Dict[str, Any]]:
     """
     Search the Polymarket Gamma API for markets matching the query.
 
@@ -128,89 +165,243 @@ def search_gamma_api(query: str, dedupe_events: bool = True) -> List[Dict[str, A
         dedupe_events: If True, only return one market per event (highest volume).
                        This prevents showing multiple similar markets like
                        "X by Jan 15", "X by Feb 1" from the same event.
+        client: Optional shared httpx.Client (see gamma_client.GammaClient).
+                Without one, every call opens a fresh connection.
+        raise_errors: If True, failed requests raise instead of returning [],
+                      so resilience.Resilience can retry them or trip its breaker.
 
     Returns:
         List of market dictionaries with id, title, and volume.
+
+    Raises:
+        UpstreamThrottled: The API answered 429, so callers (see
+                           rate_limiter.RateGovernor) can back off and retry
+                           instead of treating it as "no results".
     """
+    params = {
+        "q": query,
+        "limit_per_type": 20,
+    }
+
     try:
-        response = httpx.get(
-            GAMMA_API_URL,
-            params={
-                "q": query,
-                "limit_per_type": 20,
-            },
-            timeout=10.0
-        )
+        if client is None:
+            response = httpx.get(GAMMA_API_URL, params=params, timeout=10.0)
+        else:
+            response = client.get(GAMMA_API_URL, params=params)
+        if response.status_code == 429:
+            raise UpstreamThrottled(query, _retry_after(response))
         response.raise_for_status()
-        data = response.json()
-
-        markets = []
-
-        # Extract markets from events
-        for event in data.get("events", []):
-            event_id = event.get("id", "")
-            event_markets = event.get("markets", [])
-
-            if event_markets:
-                if dedupe_events:
-                    # Only keep the highest-volume market from each event
-                    best_market = max(event_markets, key=lambda m: float(m.get("volume", 0)))
-                    markets.append({
-                        "id": best_market.get("id", ""),
-                        "title": best_market.get("question", event.get("title", "")),
-                        "volume": int(float(best_market.get("volume", 0))),
-                        "query_matched": query,
-                        "image": event.get("image", ""),
-                        "slug": event.get("slug", ""),
-                        "created_at": best_market.get("createdAt") or event.get("createdAt"),
-                        "end_date": best_market.get("endDate") or event.get("endDate"),
-                        "event_id": event_id,
-                    })
-                else:
-                    # Return all markets from the event
-                    for market in event_markets:
-                        markets.append({
-                            "id": market.get("id", ""),
-                            "title": market.get("question", event.get("title", "")),
-                            "volume": int(float(market.get("volume", 0))),
-                            "query_matched": query,
-                            "image": event.get("image", ""),
-                            "slug": event.get("slug", ""),
-                            "created_at": market.get("createdAt") or event.get("createdAt"),
-                            "end_date": market.get("endDate") or event.get("endDate"),
-                            "event_id": event_id,
-                        })
-            else:
-                # No markets array, treat the event itself as a market
-                markets.append({
-                    "id": event_id,
-                    "title": event.get("title", ""),
-                    "volume": int(float(event.get("volume", 0))),
-                    "query_matched": query,
-                    "image": event.get("image", ""),
-                    "slug": event.get("slug", ""),
-                    "created_at": event.get("createdAt"),
-                    "end_date": event.get("endDate"),
-                    "event_id": event_id,
-                })
-
-        return markets
+        return _parse_search_response(response.json(), query, dedupe_events)
+
+    except UpstreamThrottled:
+        raise
+    except httpx.HTTPError as e:
+        if raise_errors:
+            raise
+        print(f"API request failed for query '{query}': {e}")
+        UPSTREAM_ERRORS.inc(query, type(e).__name__)
+        return []
+    except Exception as e:
+        if raise_errors:
+            raise
+        print(f"Error processing response for query '{query}': {e}")
+        UPSTREAM_ERRORS.inc(query, type(e).__name__)
+        return []
+
+
+async def search_gamma_api_async(
+    query: str,
+    dedupe_events: bool = True,
+    client: Optional[httpx.AsyncClient] = None,
+    raise_errors: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Async variant of search_gamma_api for use on the event loop.
+
+    Args:
+        query: Search term to find markets.
+        dedupe_events: If True, only return one market per event (highest volume).
+        client: Optional shared httpx.AsyncClient (see gamma_client.AsyncGammaClient).
+        raise_errors: If True, failed requests raise instead of returning [].
+
+    Returns:
+        List of market dictionaries with id, title, and volume.
+
+    Raises:
+        UpstreamThrottled: The API answered 429, so callers (see
+                           rate_limiter.RateGovernor) can back off and retry
+                           instead of treating it as "no results".
+    """
+    params = {
+        "q": query,
+        "limit_per_type": 20,
+    }
 
+    try:
+        if client is None:
+            async with httpx.AsyncClient(timeout=10.0) as one_off_client:
+                response = await one_off_client.get(GAMMA_API_URL, params=params)
+        else:
+            response = await client.get(GAMMA_API_URL, params=params)
+        if response.status_code == 429:
+            raise UpstreamThrottled(query, _retry_after(response))
+        response.raise_for_status()
+        return _parse_search_response(response.json(), query, dedupe_events)
+
+    except UpstreamThrottled:
+        raise
     except httpx.HTTPError as e:
+        if raise_errors:
+            raise
         print(f"API request failed for query '{query}': {e}")
+        UPSTREAM_ERRORS.inc(query, type(e).__name__)
         return []
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"Error processing response for query '{query}': {e}")
+        UPSTREAM_ERRORS.inc(query, type(e).__name__)
         return []
 
 
+def _to_epoch(value: Any) -> Optional[int]:
+    """
+    Convert a market date (ISO string or datetime) to integer epoch seconds.
+
+    Returns None for missing, unparseable or timezone-naive dates, which the
+    novelty score treats as "no date".
+    """
+    if not value:
+        return None
+    try:
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if value.tzinfo is None:
+            return None
+        return int(value.timestamp())
+    except (ValueError, TypeError, AttributeError, OverflowError):
+        return None
+
+
+def _market_timestamps(market: Dict[str, Any]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Get (created, end) epoch seconds for a market, using the fields parsed
+    at ingestion when present and parsing the ISO strings otherwise.
+    """
+    if "_created_ts" in market:
+        return market["_created_ts"], market["_end_ts"]
+    return _to_epoch(market.get("created_at")), _to_epoch(market.get("end_date"))
+
+
+def public_market(market: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Strip internal fields (keys starting with "_", like the pre-parsed
+    timestamps) so API responses keep the original market dict contract.
+    """
+    return {k: v for k, v in market.items() if not k.startswith("_")}
+
+
+@dataclass
+class RecommendationResult:
+    """
+    Everything get_recommendations(..., return_result=True) produced: the
+    recommendations plus the keywords actually used, the candidate pool size,
+    which keywords were answered from the search cache, which keywords had no
+    results in the pool (failed, or still outstanding at the deadline), and
+    per-stage wall-clock timings in milliseconds.
+    """
+
+    recommendations: List[Dict[str, Any]] = field(default_factory=list)
+    keywords: List[str] = field(default_factory=list)
+    negative_keywords: List[str] = field(default_factory=list)
+    total_candidates: int = 0
+    cached_keywords: List[str] = field(default_factory=list)
+    missing_keywords: List[str] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def server_timing(self) -> str:
+        """
+        Format the stage timings as a Server-Timing header value, e.g.
+        "extract;dur=0.4, search;dur=212.8, score;dur=1.9, select;dur=0.3, total;dur=215.5".
+        """
+        return ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in self.timings.items())
+
+
+@dataclass
+class RecommendationSession:
+    """
+    State carried between SearchRecommender.update_session calls: the
+    watchlist and dislikes so far (keyed by market ID, in insertion order),
+    the positive and negative keywords extracted from them, each keyword's
+    search results, and the candidate pool merged from those results.
+    """
+
+    session_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    watchlist: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    disliked_items: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    keywords: List[str] = field(default_factory=list)
+    negative_keywords: Set[str] = field(default_factory=set)
+    results_by_keyword: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    candidates: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    pool_keywords: Tuple[str, ...] = ()
+
+
+# Sort key for scored markets
+_score_of = itemgetter("score")
+
+
+def _best_first(markets: List[Dict[str, Any]], head: int) -> Iterator[Dict[str, Any]]:
+    """
+    Yield scored markets best first, ties in input order, i.e. in the order of
+    sorted(markets, key=score, reverse=True). Only the top `head` markets are
+    picked up front by partial heap selection (heapq.nlargest, O(n log head));
+    the full sort runs only if the consumer reads past them.
+    """
+    if len(markets) <= 4 * head:
+        yield from sorted(markets, key=_score_of, reverse=True)
+        return
+    yield from heapq.nlargest(head, markets, key=_score_of)
+    yield from sorted(markets, key=_score_of, reverse=True)[head:]
+
+
+def _market_key(market: Dict[str, Any]) -> str:
+    """Session key for a watchlist or disliked market: its ID, else its title."""
+    return str(market.get("id") or market.get("title", ""))
+
+
+def _elapsed_ms(start: float) -> float:
+    """Milliseconds since a time.perf_counter() reading."""
+    return (time.perf_counter() - start) * 1000
+
+
+def _deadline_at(deadline_ms: Optional[float]) -> Optional[float]:
+    """time.perf_counter() value deadline_ms from now, or None for no deadline."""
+    return time.perf_counter() + deadline_ms / 1000 if deadline_ms else None
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until a _deadline_at() deadline (never negative), or None."""
+    return None if deadline is None else max(0.0, deadline - time.perf_counter())
+
+
 class SearchRecommender:
     """
     A meta-search engine that implements the "Search, Sieve, and Score" workflow
     for recommending prediction markets based on user preferences.
     """
 
-    def __init__(self, search_func=None, debug: bool = True, use_gemini: bool = False, gemini_api_key: Optional[str] = None):
+    def __init__(
+        self,
+        search_func=None,
+        debug: bool = True,
+        use_gemini: bool = False,
+        gemini_api_key: Optional[str] = None,
+        cache: Optional[TTLCache] = None,
+        singleflight: Optional[SingleFlight] = None,
+        executor: Optional[FanoutExecutor] = None,
+        keyword_extractor: Optional[KeywordExtractor] = None,
+        relevance_scorer: Optional[RelevanceScorer] = None
+    ):
         """
         Initialize the SearchRecommender.
 
@@ -219,11 +410,33 @@ class SearchRecommender:
             debug: Whether to print debug information for score calculations.
             use_gemini: Whether to use Gemini for keyword extraction (falls back to heuristic if unavailable).
             gemini_api_key: Optional Gemini API key (falls back to GEMINI_API_KEY env var).
+            cache: Optional TTLCache for search results; wraps search_func so every
+                   caller of self.search_func shares it.
+            singleflight: Optional SingleFlight that coalesces concurrent identical
+                          queries (applied beneath the cache, so only misses coalesce).
+            executor: FanoutExecutor for the keyword fan-out. Defaults to the
+                      process-wide one shared by every recommender.
+            keyword_extractor: KeywordExtractor used when use_gemini is set.
+                               Defaults to the process-wide one for gemini_api_key.
+            relevance_scorer: RelevanceScorer for the relevance component.
+                              Defaults to one taking IDF from the candidate pool.
         """
-        self.search_func = search_func or search_gamma_api
+        search_func = self._limit_upstream(timed_search(search_func or search_gamma_api))
+        if singleflight is not None:
+            search_func = singleflight_search(search_func, singleflight)
+        if cache is not None:
+            search_func = wrap_search(search_func, cache)
+        self.cache = cache
+        self.singleflight = singleflight
+        self.search_func = search_func
+        self.executor = executor or shared_executor()
         self.debug = debug
         self.use_gemini = use_gemini
         self.gemini_api_key = gemini_api_key
+        self.keyword_extractor = keyword_extractor
+        if use_gemini and keyword_extractor is None:
+            self.keyword_extractor = shared_extractor(gemini_api_key)
+        self.relevance_scorer = relevance_scorer or RelevanceScorer()
         self.negative_penalty = 0.2  # 80% penalty for negative keyword matches
 
         # Scoring weights (must sum to 1.0)
@@ -231,7 +444,15 @@ class SearchRecommender:
         self.weight_novelty = 0.3
         self.weight_relevance = 0.3
 
-    def _calculate_novelty_score(self, market: Dict[str, Any]) -> float:
+    def _limit_upstream(self, search_func):
+        """
+        Hook for capping concurrent upstream calls beneath the cache and
+        single-flight layers. The sync fan-out is already bounded by the
+        executor, so this is a no-op here.
+        """
+        return search_func
+
+    def _calculate_novelty_score(self, market: Dict[str, Any], now: Optional[int] = None) -> float:
         """
         Calculate novelty score based on creation recency and upcoming end date.
 
@@ -239,52 +460,37 @@ class SearchRecommender:
         - Creation recency: newer markets score higher (decays over 90 days)
         - End date proximity: markets ending soon score higher (within 30 days)
 
+        Args:
+            market: Market dictionary (ideally with pre-parsed _created_ts/_end_ts).
+            now: Epoch seconds to score against; pass one value per request.
+
         Returns:
             Novelty score between 0 and 1.
         """
-        now = datetime.now(timezone.utc)
+        if now is None:
+            now = int(time.time())
+        created_ts, end_ts = _market_timestamps(market)
         creation_score = 0.5  # default if no date
         end_date_score = 0.5  # default if no date
 
         # Creation recency score (newer = higher)
-        created_at = market.get("created_at")
-        if created_at:
-            try:
-                if isinstance(created_at, str):
-                    # Handle ISO format with or without Z
-                    created_at = created_at.replace("Z", "+00:00")
-                    created = datetime.fromisoformat(created_at)
-                else:
-                    created = created_at
-
-                days_old = (now - created).days
-                # Score decays over 90 days: 1.0 for today, 0.0 for 90+ days old
-                creation_score = max(0, 1 - (days_old / 90))
-            except (ValueError, TypeError):
-                pass
+        if created_ts is not None:
+            days_old = (now - created_ts) // 86400
+            # Score decays over 90 days: 1.0 for today, 0.0 for 90+ days old
+            creation_score = max(0, 1 - (days_old / 90))
 
         # End date proximity score (ending soon = higher)
-        end_date = market.get("end_date")
-        if end_date:
-            try:
-                if isinstance(end_date, str):
-                    end_date = end_date.replace("Z", "+00:00")
-                    end = datetime.fromisoformat(end_date)
-                else:
-                    end = end_date
-
-                days_until_end = (end - now).days
-                if days_until_end < 0:
-                    # Already ended
-                    end_date_score = 0
-                elif days_until_end <= 30:
-                    # Ending within 30 days: higher score for sooner
-                    end_date_score = 1 - (days_until_end / 30)
-                else:
-                    # More than 30 days out: flat low score
-                    end_date_score = 0.2
-            except (ValueError, TypeError):
-                pass
+        if end_ts is not None:
+            days_until_end = (end_ts - now) // 86400
+            if days_until_end < 0:
+                # Already ended
+                end_date_score = 0
+            elif days_until_end <= 30:
+                # Ending within 30 days: higher score for sooner
+                end_date_score = 1 - (days_until_end / 30)
+            else:
+                # More than 30 days out: flat low score
+                end_date_score = 0.2
 
         # Combine: 50% creation recency, 50% end date proximity
         return (creation_score * 0.5) + (end_date_score * 0.5)
@@ -306,10 +512,7 @@ class SearchRecommender:
         }
 
         # Clean and tokenize
-        cleaned = title.lower().translate(
-            str.maketrans('', '', string.punctuation)
-        )
-        words = cleaned.split()
+        words = tokenize(title)
 
         # Filter out stop words, short words, and words containing numbers
         meaningful_words = [
@@ -378,6 +581,10 @@ class SearchRecommender:
         seen_keywords = set()
 
         for i, title in enumerate(titles):
+            # Long watchlists fill the budget early; later titles can't contribute
+            if len(all_keywords) >= top_n:
+                break
+
             # Give extra slots to first few titles if budget doesn't divide evenly
             n_keywords = keywords_per_title + (1 if i < extra_slots else 0)
             title_keywords = self._extract_keywords_from_title(title, top_n=n_keywords)
@@ -410,10 +617,7 @@ class SearchRecommender:
         negative_keywords = set()
 
         for title in titles:
-            cleaned = title.lower().translate(
-                str.maketrans('', '', string.punctuation)
-            )
-            words = cleaned.split()
+            words = tokenize(title)
 
             meaningful_words = {
                 word for word in words
@@ -426,17 +630,52 @@ class SearchRecommender:
 
         return negative_keywords
 
-    def _scattershot_search(self, keywords: List[str]) -> Dict[str, Dict[str, Any]]:
+    def _merge_results(
+        self,
+        candidates: Dict[str, Dict[str, Any]],
+        results: List[Dict[str, Any]]
+    ) -> None:
         """
-        Fire off parallel queries for each keyword and aggregate unique results.
+        Merge one keyword's search results into the candidate pool in place.
 
         Args:
-            keywords: List of keywords to search for.
+            candidates: Candidate pool keyed by market ID.
+            results: Markets returned by a single search.
+        """
+        for market in results:
+            market_id = market["id"]
+            # Keep the market if not seen, or update if higher volume
+            if market_id not in candidates or market["volume"] > candidates[market_id]["volume"]:
+                candidates[market_id] = market
+
+    def _search_at(self, index: int, keyword: str) -> List[Dict[str, Any]]:
+        """
+        Run one fan-out search with the keyword's position as its upstream
+        priority, so a rate-limited upstream serves the leading keywords first.
+        """
+        SEARCH_PRIORITY.set(index)
+        return self.search_func(keyword)
+
+    def _fetch_keywords(
+        self,
+        keywords: List[str],
+        deadline: Optional[float] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Run one search per keyword in parallel on the shared, bounded executor.
+
+        Args:
+            keywords: Keywords to search for (each is searched once).
+            deadline: Optional time.perf_counter() value (see _deadline_at). At
+                      the deadline, searches still queued are cancelled and
+                      running ones are abandoned.
 
         Returns:
-            Dictionary of unique markets keyed by market ID.
+            {keyword: results} for the keywords that answered in time; failed
+            and timed-out keywords are absent.
         """
-        candidates = {}
+        trace = current_trace()
+        results_by_keyword = {}
 
         if self.debug:
             print(f"\n{'='*60}")
@@ -444,32 +683,95 @@ class SearchRecommender:
             print(f"{'='*60}")
             print(f"Searching with keywords: {keywords}")
 
-        # Execute searches in parallel
-        with ThreadPoolExecutor(max_workers=len(keywords)) as executor:
-            future_to_keyword = {
-                executor.submit(self.search_func, keyword): keyword
-                for keyword in keywords
-            }
+        future_to_keyword = {
+            self.executor.submit(self._search_at, index, keyword): keyword
+            for index, keyword in enumerate(keywords)
+        }
 
-            for future in as_completed(future_to_keyword):
+        try:
+            for future in as_completed(future_to_keyword, timeout=_remaining(deadline)):
                 keyword = future_to_keyword[future]
                 try:
                     results = future.result()
                     if self.debug:
                         print(f"  '{keyword}' returned {len(results)} results")
-
-                    for market in results:
-                        market_id = market["id"]
-                        # Keep the market if not seen, or update if higher volume
-                        if market_id not in candidates or market["volume"] > candidates[market_id]["volume"]:
-                            candidates[market_id] = market
+                    if trace is not None:
+                        trace.event("search.keyword", keyword=keyword, results=len(results))
+                    results_by_keyword[keyword] = results
 
                 except Exception as e:
                     if self.debug:
                         print(f"  '{keyword}' search failed: {e}")
+                    if trace is not None:
+                        trace.event("search.keyword", logging.WARNING, keyword=keyword, error=repr(e))
+        except FutureTimeoutError:
+            late = [k for f, k in future_to_keyword.items() if not f.done()]
+            for future in future_to_keyword:
+                future.cancel()
+            if self.debug:
+                print(f"  Deadline reached, giving up on: {late}")
+            if trace is not None:
+                trace.event("search.deadline", logging.WARNING, missing=late)
+
+        return results_by_keyword
+
+    def _merge_keyword_results(
+        self,
+        keywords: List[str],
+        results_by_keyword: Dict[str, List[Dict[str, Any]]],
+        missing: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Merge per-keyword results into one candidate pool, in keyword order.
+
+        Args:
+            keywords: The keywords whose results belong in the pool.
+            results_by_keyword: Output of _fetch_keywords.
+            missing: Optional list that receives the keywords with no results entry.
+
+        Returns:
+            Dictionary of unique markets keyed by market ID.
+        """
+        candidates = {}
+        for keyword in keywords:
+            results = results_by_keyword.get(keyword)
+            if results is None:
+                if missing is not None:
+                    missing.append(keyword)
+                continue
+            self._merge_results(candidates, results)
+        return candidates
+
+    def _scattershot_search(
+        self,
+        keywords: List[str],
+        deadline: Optional[float] = None,
+        missing: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Fire off parallel queries for each keyword and aggregate unique results.
+
+        Args:
+            keywords: List of keywords to search for.
+            deadline: Optional time.perf_counter() value (see _deadline_at). At
+                      the deadline, searches still queued are cancelled, running
+                      ones are abandoned, and the pool gathered so far is returned.
+            missing: Optional list that receives, in keyword order, the keywords
+                     that contributed nothing (failed or timed out).
+
+        Returns:
+            Dictionary of unique markets keyed by market ID.
+        """
+        if not keywords:
+            return {}
+        trace = current_trace()
+
+        candidates = self._merge_keyword_results(keywords, self._fetch_keywords(keywords, deadline), missing)
 
         if self.debug:
             print(f"Total unique candidates: {len(candidates)}")
+        if trace is not None:
+            trace.event("search.done", candidates=len(candidates))
 
         return candidates
 
@@ -477,7 +779,9 @@ class SearchRecommender:
         self,
         market: Dict[str, Any],
         negative_keywords: Set[str],
-        max_log_volume: float
+        max_log_volume: float,
+        now: Optional[int] = None,
+        relevance_score: float = 1.0
     ) -> Dict[str, Any]:
         """
         Calculate the final score for a market using weighted scoring algorithm.
@@ -488,6 +792,9 @@ class SearchRecommender:
             market: Market dictionary with title, volume, and dates.
             negative_keywords: Set of keywords that trigger penalty.
             max_log_volume: Maximum log volume for normalization.
+            now: Epoch seconds for the novelty score (defaults to the current time).
+            relevance_score: TF-IDF similarity to the watchlist (see
+                             RelevanceScorer); 1.0 when there is nothing to compare to.
 
         Returns:
             Dict with final score and component scores for debugging.
@@ -500,11 +807,9 @@ class SearchRecommender:
         volume_score = log_volume / max_log_volume if max_log_volume > 0 else 0
 
         # 2. Novelty score: based on creation date and end date (0-1)
-        novelty_score = self._calculate_novelty_score(market)
+        novelty_score = self._calculate_novelty_score(market, now)
 
-        # 3. Relevance score: 1.0 for now (matched via keyword search)
-        # Could be enhanced with semantic similarity later
-        relevance_score = 1.0
+        # 3. Relevance score: passed in, computed for the whole pool by RelevanceScorer
 
         # Weighted combination
         combined_score = (
@@ -514,10 +819,7 @@ class SearchRecommender:
         )
 
         # Check for negative keyword matches
-        title_lower = title.lower()
-        title_words = set(title_lower.translate(
-            str.maketrans('', '', string.punctuation)
-        ).split())
+        title_words = token_set(title)
 
         matching_negative = title_words & negative_keywords
         penalized = bool(matching_negative)
@@ -529,6 +831,20 @@ class SearchRecommender:
 
         final_score = combined_score * penalty_multiplier
 
+        trace = current_trace()
+        if trace is not None and trace.enabled_for(logging.DEBUG):
+            trace.debug(
+                "score.market",
+                market_id=market.get("id"),
+                title=title,
+                volume_score=volume_score,
+                novelty_score=novelty_score,
+                relevance_score=relevance_score,
+                combined=combined_score,
+                final=final_score,
+                matching_negative=sorted(matching_negative),
+            )
+
         if self.debug:
             if penalized:
                 print(f"\n  PENALTY APPLIED: '{title[:50]}...'")
@@ -548,6 +864,144 @@ class SearchRecommender:
             "matching_negative": list(matching_negative) if matching_negative else []
         }
 
+    def score_batch(
+        self,
+        candidates: List[Dict[str, Any]],
+        negative_keywords: Set[str],
+        max_log_volume: Optional[float] = None,
+        now: Optional[int] = None,
+        relevance: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Score many markets in one vectorized pass.
+
+        Volumes and creation/end timestamps are loaded into NumPy arrays and the
+        volume, novelty and weighted scores (plus max-log-volume normalization
+        and the negative-keyword penalty mask) are computed array-wide. Output
+        matches calling _calculate_score per market, up to floating-point
+        rounding in log(). Falls back to that per-market loop without NumPy.
+
+        Args:
+            candidates: Market dictionaries with title, volume, and dates.
+            negative_keywords: Set of keywords that trigger penalty.
+            max_log_volume: Normalization constant; defaults to the maximum
+                            log volume among the candidates.
+            now: Epoch seconds for the novelty score; pass one value per request.
+            relevance: Relevance score per candidate (see RelevanceScorer);
+                       1.0 for every candidate if None.
+
+        Returns:
+            List of score dicts (same keys as _calculate_score), in input order.
+        """
+        if not candidates:
+            return []
+
+        if now is None:
+            now = int(time.time())
+        if relevance is None:
+            relevance = [1.0] * len(candidates)
+
+        if not NUMPY_AVAILABLE:
+            if max_log_volume is None:
+                max_log_volume = max(math.log(m["volume"] + 1) for m in candidates)
+            return [
+                self._calculate_score(m, negative_keywords, max_log_volume, now, r)
+                for m, r in zip(candidates, relevance)
+            ]
+
+        # 1. Volume score: log-normalized (0-1)
+        volumes = np.fromiter((m["volume"] for m in candidates), dtype=np.float64, count=len(candidates))
+        log_volumes = np.log(volumes + 1)
+        if max_log_volume is None:
+            max_log_volume = float(log_volumes.max())
+        if max_log_volume > 0:
+            volume_scores = log_volumes / max_log_volume
+        else:
+            volume_scores = np.zeros(len(candidates))
+
+        # 2. Novelty score: NaN timestamps mean "no date" and keep the 0.5 default
+        timestamps = np.array([_market_timestamps(m) for m in candidates], dtype=np.float64)
+        created = timestamps[:, 0]
+        ends = timestamps[:, 1]
+
+        with np.errstate(invalid="ignore"):
+            days_old = np.floor((now - created) / 86400)
+            creation_scores = np.where(np.isnan(created), 0.5, np.maximum(0, 1 - (days_old / 90)))
+
+            days_until_end = np.floor((ends - now) / 86400)
+            end_date_scores = np.where(
+                np.isnan(ends), 0.5,
+                np.where(days_until_end < 0, 0.0,
+                         np.where(days_until_end <= 30, 1 - (days_until_end / 30), 0.2))
+            )
+        novelty_scores = (creation_scores * 0.5) + (end_date_scores * 0.5)
+
+        # 3. Relevance score: computed for the whole pool by RelevanceScorer
+        relevance_scores = np.asarray(relevance, dtype=np.float64)
+
+        combined_scores = (
+            volume_scores * self.weight_volume +
+            novelty_scores * self.weight_novelty +
+            relevance_scores * self.weight_relevance
+        )
+
+        # Penalty mask from negative keyword matches
+        matching = [
+            token_set(m["title"]) & negative_keywords
+            if negative_keywords else set()
+            for m in candidates
+        ]
+        penalized = np.fromiter((bool(match) for match in matching), dtype=bool, count=len(candidates))
+        final_scores = combined_scores * np.where(penalized, self.negative_penalty, 1.0)
+
+        # Convert back to Python floats once, not per element
+        final_list = final_scores.tolist()
+        volume_list = volume_scores.tolist()
+        novelty_list = novelty_scores.tolist()
+        relevance_list = relevance_scores.tolist()
+        combined_list = combined_scores.tolist()
+
+        trace = current_trace()
+        trace_scores = trace is not None and trace.enabled_for(logging.DEBUG)
+
+        results = []
+        for i, market in enumerate(candidates):
+            result = {
+                "final_score": final_list[i],
+                "volume_score": volume_list[i],
+                "novelty_score": novelty_list[i],
+                "relevance_score": relevance_list[i],
+                "penalized": bool(matching[i]),
+                "matching_negative": list(matching[i]) if matching[i] else []
+            }
+            results.append(result)
+
+            if trace_scores:
+                trace.debug(
+                    "score.market",
+                    market_id=market.get("id"),
+                    title=market["title"],
+                    volume_score=result["volume_score"],
+                    novelty_score=result["novelty_score"],
+                    relevance_score=result["relevance_score"],
+                    combined=combined_list[i],
+                    final=result["final_score"],
+                    matching_negative=sorted(matching[i]),
+                )
+
+            if self.debug:
+                title = market["title"]
+                if result["penalized"]:
+                    print(f"\n  PENALTY APPLIED: '{title[:50]}...'")
+                    print(f"    Matched negative keywords: {matching[i]}")
+                else:
+                    print(f"\n  '{title[:50]}...'")
+                print(f"    Volume: {result['volume_score']:.3f} | Novelty: {result['novelty_score']:.3f} | Relevance: {result['relevance_score']:.3f}")
+                print(f"    Combined: {combined_list[i]:.4f} -> Final: {result['final_score']:.4f}" +
+                      (f" (penalized {(1 - self.negative_penalty) * 100:.0f}%)" if result["penalized"] else ""))
+
+        return results
+
     def _get_topic_signature(self, title: str) -> str:
         """
         Extract a topic signature from a market title to group similar markets.
@@ -559,21 +1013,7 @@ class SearchRecommender:
         Returns:
             A simplified topic signature string
         """
-        # Remove common price/date patterns
-        import re
-        # Remove dollar amounts like $85,000, $100k, etc.
-        title = re.sub(r'\$[\d,]+[km]?\b', '', title, flags=re.IGNORECASE)
-        # Remove date ranges like "January 12-18", "by 2025", etc.
-        title = re.sub(r'\b(january|february|march|april|may|june|july|august|september|october|november|december)\s+\d+[-\d]*', '', title, flags=re.IGNORECASE)
-        title = re.sub(r'\b\d{4}\b', '', title)  # Remove years
-        title = re.sub(r'\b\d+[-\d]+\b', '', title)  # Remove number ranges
-        
-        # Extract key entities (capitalized words, common entities)
-        words = title.lower().translate(str.maketrans('', '', string.punctuation)).split()
-        key_words = [w for w in words if w not in STOP_WORDS and len(w) > 3 and not w.isdigit()]
-        
-        # Return first 2-3 key words as signature
-        return ' '.join(sorted(set(key_words))[:3])
+        return topic_signature(title)
     
     def _select_diverse_results(
         self,
@@ -599,21 +1039,27 @@ class SearchRecommender:
         if not scored_markets or not keywords:
             return scored_markets[:top_n]
 
-        # Group markets by their source keyword
+        # Group markets by their source keyword (each bucket is ranked lazily below)
         keyword_buckets = {kw: [] for kw in keywords}
         for market in scored_markets:
-            source_kw = market.get("query_matched", "")
-            if source_kw in keyword_buckets:
-                keyword_buckets[source_kw].append(market)
+            bucket = keyword_buckets.get(market.get("query_matched", ""))
+            if bucket is not None:
+                bucket.append(market)
 
-        # Sort each bucket by score
-        for kw in keyword_buckets:
-            keyword_buckets[kw].sort(key=lambda x: x["score"], reverse=True)
+        # Topic signatures, computed once per examined market
+        signatures = {}
+
+        def topic_of(market: Dict[str, Any]) -> str:
+            signature = signatures.get(market["id"])
+            if signature is None:
+                signature = signatures[market["id"]] = self._get_topic_signature(market["title"])
+            return signature
 
         # Calculate quota per keyword (at least 1 each if possible)
         num_keywords = len(keywords)
         quota_per_keyword = max(1, top_n // num_keywords)
         extra_slots = top_n - (quota_per_keyword * num_keywords)
+        trace = current_trace()
 
         if self.debug:
             print(f"\n{'='*60}")
@@ -634,14 +1080,14 @@ class SearchRecommender:
             bucket = keyword_buckets[kw]
             added = 0
 
-            for market in bucket:
+            for market in _best_first(bucket, quota + top_n):
                 if added >= quota:
                     break
                 if market["id"] not in selected_ids:
                     # Check topic diversity
-                    topic_sig = self._get_topic_signature(market["title"])
+                    topic_sig = topic_of(market)
                     topic_count = topic_counts.get(topic_sig, 0)
-                    
+
                     if topic_count < max_per_topic:
                         selected.append(market)
                         selected_ids.add(market["id"])
@@ -650,18 +1096,20 @@ class SearchRecommender:
 
             if self.debug:
                 print(f"  '{kw}': added {added}/{quota} (bucket size: {len(bucket)})")
+            if trace is not None:
+                trace.event("select.keyword", keyword=kw, added=added, quota=quota, bucket_size=len(bucket))
 
         # Second pass: if we still have slots, fill with highest scoring remaining, respecting topic limits
         if len(selected) < top_n:
-            remaining = [m for m in scored_markets if m["id"] not in selected_ids]
-            remaining.sort(key=lambda x: x["score"], reverse=True)
-            for market in remaining:
+            for market in _best_first(scored_markets, 2 * top_n):
                 if len(selected) >= top_n:
                     break
+                if market["id"] in selected_ids:
+                    continue
                 # Check topic diversity
-                topic_sig = self._get_topic_signature(market["title"])
+                topic_sig = topic_of(market)
                 topic_count = topic_counts.get(topic_sig, 0)
-                
+
                 if topic_count < max_per_topic:
                     selected.append(market)
                     selected_ids.add(market["id"])
@@ -672,15 +1120,163 @@ class SearchRecommender:
 
         if self.debug:
             print(f"Topic distribution: {dict(sorted(topic_counts.items(), key=lambda x: x[1], reverse=True)[:5])}")
+        if trace is not None:
+            trace.event("select.topics", topic_counts=topic_counts)
 
         return selected[:top_n]
 
+    def _get_positive_keywords(self, watchlist_titles: List[str]) -> List[str]:
+        """
+        Extract search keywords from watchlist titles, trying Gemini first
+        (cached, within its timeout) and falling back to heuristic extraction.
+
+        Args:
+            watchlist_titles: Titles of the markets in the user's watchlist.
+
+        Returns:
+            List of positive keywords to search with.
+        """
+        positive_keywords = None
+        if self.use_gemini:
+            positive_keywords = self.keyword_extractor.extract(watchlist_titles, num_keywords=5)
+        return self._finish_positive_keywords(positive_keywords, watchlist_titles)
+
+    def _finish_positive_keywords(self, positive_keywords: Optional[List[str]], watchlist_titles: List[str]) -> List[str]:
+        """
+        Fall back to heuristic extraction if Gemini gave no keywords, and
+        log/trace which source was used.
+        """
+        source = "gemini"
+        if positive_keywords is None:
+            # Fallback to heuristic extraction
+            source = "heuristic"
+            positive_keywords = self._extract_keywords(watchlist_titles, top_n=6)
+
+        if self.debug:
+            print(f"\nKeywords ({source.capitalize()}): {positive_keywords}")
+        trace = current_trace()
+        if trace is not None:
+            trace.event("keywords.positive", source=source, keywords=positive_keywords)
+
+        return positive_keywords
+
+    def _scored_market(self, market: Dict[str, Any], score_result: Dict[str, Any]) -> Dict[str, Any]:
+        """A candidate as returned to clients: its public fields plus its scores."""
+        return {
+            **public_market(market),
+            "score": score_result["final_score"],
+            "volume_score": score_result["volume_score"],
+            "novelty_score": score_result["novelty_score"],
+            "relevance_score": score_result["relevance_score"],
+            "penalized": score_result["penalized"],
+        }
+
+    def _rank_candidates(
+        self,
+        candidates: Dict[str, Dict[str, Any]],
+        watchlist: List[Dict[str, Any]],
+        positive_keywords: List[str],
+        negative_keywords: Set[str],
+        top_n: int,
+        timings: Optional[Dict[str, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Score the candidate pool and pick a diverse top N.
+
+        Args:
+            candidates: Candidate pool keyed by market ID.
+            watchlist: Markets the user has saved (excluded from results).
+            positive_keywords: Keywords the candidates were searched with.
+            negative_keywords: Keywords that trigger the dislike penalty.
+            top_n: Number of recommendations to return.
+            timings: Optional dict to record "score" and "select" milliseconds in.
+
+        Returns:
+            List of top N recommended markets with scores.
+        """
+        start = time.perf_counter()
+        trace = current_trace()
+
+        if self.debug:
+            print(f"\n{'='*60}")
+            print("SCORE CALCULATIONS")
+            print(f"{'='*60}")
+
+        # Score the whole pool in one pass (max log volume is normalized over all
+        # candidates, relevance is TF-IDF similarity to the watchlist)
+        pool = list(candidates.values())
+        relevance = self.relevance_scorer.score([m.get("title", "") for m in watchlist], pool)
+        score_results = self.score_batch(pool, negative_keywords, relevance=relevance)
+
+        scored_markets = []
+        watchlist_ids = {m.get("id") for m in watchlist}
+        watchlist_titles = {m.get("title", "").lower().strip() for m in watchlist}
+
+        for (market_id, market), score_result in zip(candidates.items(), score_results):
+            # Skip markets already in watchlist (check both ID and title)
+            if market_id in watchlist_ids:
+                if self.debug:
+                    print(f"\n  SKIPPED (in watchlist by ID): '{market['title'][:40]}...'")
+                if trace is not None:
+                    trace.debug("score.skipped", market_id=market_id, reason="watchlist_id")
+                continue
+
+            if market["title"].lower().strip() in watchlist_titles:
+                if self.debug:
+                    print(f"\n  SKIPPED (in watchlist by title): '{market['title'][:40]}...'")
+                if trace is not None:
+                    trace.debug("score.skipped", market_id=market_id, reason="watchlist_title")
+                continue
+
+            scored_markets.append(self._scored_market(market, score_result))
+
+        if timings is not None:
+            timings["score"] = _elapsed_ms(start)
+        start = time.perf_counter()
+
+        # Diverse selection with quota per keyword
+        recommendations = self._select_diverse_results(
+            scored_markets, positive_keywords, top_n
+        )
+
+        if timings is not None:
+            timings["select"] = _elapsed_ms(start)
+
+        if self.debug:
+            print(f"\n{'='*60}")
+            print(f"TOP {top_n} RECOMMENDATIONS (diverse)")
+            print(f"{'='*60}")
+            for i, rec in enumerate(recommendations, 1):
+                penalty_flag = " [PENALIZED]" if rec.get("penalized") else ""
+                print(f"{i}. Score: {rec['score']:.4f}{penalty_flag} [from: {rec.get('query_matched', 'unknown')}]")
+                print(f"   {rec['title']}")
+                print(f"   Volume: ${rec['volume']:,} | Vol: {rec['volume_score']:.2f} | Nov: {rec['novelty_score']:.2f}")
+        if trace is not None:
+            trace.event("recommend.top", results=[
+                {"market_id": rec["id"], "score": rec["score"], "penalized": rec["penalized"],
+                 "query_matched": rec.get("query_matched")}
+                for rec in recommendations
+            ])
+
+        return recommendations
+
+    def _cached_keywords(self, keywords: List[str]) -> List[str]:
+        """
+        Keywords whose search results are fresh in the cache, i.e. that won't
+        go upstream. Checked before the fan-out so refreshed entries don't count.
+        """
+        if self.cache is None:
+            return []
+        return [k for k in keywords if self.cache.is_fresh((k, True))]
+
     def get_recommendations(
         self,
         watchlist: List[Dict[str, Any]],
         disliked_items: List[Dict[str, Any]] = None,
-        top_n: int = 10
-    ) -> List[Dict[str, Any]]:
+        top_n: int = 10,
+        return_result: bool = False,
+        deadline_ms: Optional[float] = None
+    ):
         """
         Get personalized market recommendations based on watchlist and dislikes.
 
@@ -688,11 +1284,25 @@ class SearchRecommender:
             watchlist: List of market objects the user has saved.
             disliked_items: List of market objects the user has dismissed.
             top_n: Number of recommendations to return.
+            return_result: If True, return a RecommendationResult with the
+                           keywords, candidate count, cache hits and stage
+                           timings instead of just the list.
+            deadline_ms: Optional budget for the whole call. Keywords not
+                         answered in time are left out (see
+                         RecommendationResult.missing_keywords) and the rest
+                         are scored as usual.
 
         Returns:
-            List of top N recommended markets with scores.
+            List of top N recommended markets with scores, or a
+            RecommendationResult if return_result is True.
         """
         disliked_items = disliked_items or []
+        result = RecommendationResult()
+        request_start = time.perf_counter()
+        deadline = _deadline_at(deadline_ms)
+        trace = current_trace()
+        if trace is not None:
+            trace.event("recommend.start", watchlist_size=len(watchlist), disliked_size=len(disliked_items), top_n=top_n)
 
         if self.debug:
             print("\n" + "="*60)
@@ -705,94 +1315,446 @@ class SearchRecommender:
         if not watchlist:
             if self.debug:
                 print("WARNING: Empty watchlist, cannot generate recommendations")
-            return []
+            return result if return_result else []
 
         # Step 1: Extract positive keywords from watchlist
+        start = time.perf_counter()
         watchlist_titles = [m.get("title", "") for m in watchlist]
-
-        # Try Gemini first, fall back to heuristic extraction
-        positive_keywords = None
-        if self.use_gemini:
-            positive_keywords = extract_keywords_with_gemini(
-                watchlist_titles,
-                num_keywords=5,
-                api_key=self.gemini_api_key
-            )
-
-        if positive_keywords is None:
-            # Fallback to heuristic extraction
-            positive_keywords = self._extract_keywords(watchlist_titles, top_n=6)
-            if self.debug:
-                print(f"\nKeywords (heuristic): {positive_keywords}")
-        else:
-            if self.debug:
-                print(f"\nKeywords (Gemini): {positive_keywords}")
+        positive_keywords = self._get_positive_keywords(watchlist_titles)
 
         # Step 2: Extract negative keywords from disliked items
         disliked_titles = [m.get("title", "") for m in disliked_items]
         negative_keywords = self._extract_negative_keywords(disliked_titles)
 
+        result.keywords = positive_keywords
+        result.negative_keywords = sorted(negative_keywords)
+        result.timings["extract"] = _elapsed_ms(start)
+
         if self.debug:
             print(f"Negative keywords extracted: {negative_keywords}")
+        if trace is not None:
+            trace.event("keywords.negative", keywords=result.negative_keywords)
 
         # Step 3: Scattershot search with positive keywords
-        candidates = self._scattershot_search(positive_keywords)
+        start = time.perf_counter()
+        result.cached_keywords = self._cached_keywords(positive_keywords)
+        candidates = self._scattershot_search(positive_keywords, deadline, result.missing_keywords)
+        result.total_candidates = len(candidates)
+        result.timings["search"] = _elapsed_ms(start)
 
         if not candidates:
             if self.debug:
                 print("WARNING: No candidates found from search")
-            return []
+        else:
+            # Steps 4-5: Score candidates and select a diverse top N
+            result.recommendations = self._rank_candidates(
+                candidates, watchlist, positive_keywords, negative_keywords, top_n,
+                timings=result.timings
+            )
+
+        result.timings["total"] = _elapsed_ms(request_start)
+        observe_stages(result.timings, result.total_candidates)
+        if trace is not None:
+            trace.event(
+                "recommend.done",
+                total_candidates=result.total_candidates,
+                returned=len(result.recommendations),
+                cached_keywords=result.cached_keywords,
+                missing_keywords=result.missing_keywords,
+                timings_ms=result.timings,
+            )
+        return result if return_result else result.recommendations
+
+    def _batch_keywords(self, request: Dict[str, Any], result: RecommendationResult) -> Tuple[List[str], Set[str]]:
+        """
+        Extract one batch entry's positive and negative keywords, recording
+        them and the "extract" timing on result.
+
+        Returns:
+            (positive keywords, negative keyword set); empty for an empty watchlist.
+        """
+        watchlist = request.get("watchlist") or []
+        if not watchlist:
+            return [], set()
+        start = time.perf_counter()
+        positive_keywords = self._get_positive_keywords([m.get("title", "") for m in watchlist])
+        negative_keywords = self._extract_negative_keywords(
+            [m.get("title", "") for m in request.get("disliked_items") or []]
+        )
+        result.keywords = positive_keywords
+        result.negative_keywords = sorted(negative_keywords)
+        result.timings["extract"] = _elapsed_ms(start)
+        return positive_keywords, negative_keywords
+
+    def _rank_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        results: List[RecommendationResult],
+        keyword_sets: List[Tuple[List[str], Set[str]]],
+        results_by_keyword: Dict[str, List[Dict[str, Any]]],
+        top_n: int,
+        search_ms: float,
+        batch_start: float
+    ) -> None:
+        """
+        Build each batch entry's own pool from the shared per-keyword results
+        and score it against that entry's negative keywords, filling results.
+        """
+        for request, result, (positive_keywords, negative_keywords) in zip(requests, results, keyword_sets):
+            if not positive_keywords:
+                continue
+            candidates = self._merge_keyword_results(positive_keywords, results_by_keyword, result.missing_keywords)
+            result.total_candidates = len(candidates)
+            result.timings["search"] = search_ms
+            if candidates:
+                result.recommendations = self._rank_candidates(
+                    candidates, request["watchlist"], positive_keywords, negative_keywords, top_n,
+                    timings=result.timings
+                )
+            result.timings["total"] = _elapsed_ms(batch_start)
+            observe_stages(result.timings, result.total_candidates)
+
+    def _batch_plan(self, keyword_sets: List[Tuple[List[str], Set[str]]], results: List[RecommendationResult]) -> List[str]:
+        """
+        Collect the distinct keywords of a batch (first-seen order) and record
+        each entry's cached keywords.
+
+        Returns:
+            The unique keywords to search, once each.
+        """
+        unique = list(dict.fromkeys(k for positive_keywords, _ in keyword_sets for k in positive_keywords))
+        cached = set(self._cached_keywords(unique))
+        for (positive_keywords, _), result in zip(keyword_sets, results):
+            result.cached_keywords = [k for k in positive_keywords if k in cached]
+
+        trace = current_trace()
+        if trace is not None:
+            trace.event(
+                "batch.plan",
+                requests=len(results),
+                keyword_requests=sum(len(positive) for positive, _ in keyword_sets),
+                unique_keywords=len(unique),
+            )
+        if self.debug:
+            print(f"Batch of {len(results)}: {len(unique)} unique keywords")
+        return unique
+
+    def get_recommendations_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        top_n: int = 10,
+        deadline_ms: Optional[float] = None
+    ) -> List[RecommendationResult]:
+        """
+        Get recommendations for many watchlists at once.
+
+        Keywords are extracted for every entry first and each distinct keyword
+        is searched once, so upstream calls scale with unique keywords rather
+        than entries x keywords. Each entry is then scored on a pool built from
+        its own keywords' results, against its own negative keywords, so the
+        output matches calling get_recommendations per entry.
+
+        Args:
+            requests: One {"watchlist": [...], "disliked_items": [...]} dict per user or row.
+            top_n: Number of recommendations per entry.
+            deadline_ms: Optional budget for the whole batch (see get_recommendations).
+
+        Returns:
+            One RecommendationResult per request, in order (empty for an empty watchlist).
+        """
+        batch_start = time.perf_counter()
+        deadline = _deadline_at(deadline_ms)
+        results = [RecommendationResult() for _ in requests]
+        keyword_sets = [self._batch_keywords(request, result) for request, result in zip(requests, results)]
+        unique = self._batch_plan(keyword_sets, results)
+
+        start = time.perf_counter()
+        results_by_keyword = self._fetch_keywords(unique, deadline) if unique else {}
+        self._rank_batch(requests, results, keyword_sets, results_by_keyword, top_n, _elapsed_ms(start), batch_start)
+        return results
+
+    def _session_changes(
+        self,
+        session: RecommendationSession,
+        add: Optional[List[Dict[str, Any]]],
+        remove: Optional[List[str]],
+        dislike: Optional[List[Dict[str, Any]]]
+    ) -> Tuple[Optional[Dict[str, Dict[str, Any]]], Dict[str, Dict[str, Any]]]:
+        """
+        Work out a session update without applying it.
+
+        Returns:
+            (the updated watchlist, or None if the update doesn't change it;
+            the dislikes the session doesn't have yet, keyed like disliked_items).
+        """
+        watchlist = None
+        if add or any(str(market_id) in session.watchlist for market_id in remove or []):
+            watchlist = dict(session.watchlist)
+            for market in add or []:
+                watchlist[_market_key(market)] = market
+            for market_id in remove or []:
+                watchlist.pop(str(market_id), None)
+
+        new_dislikes = {}
+        for market in dislike or []:
+            if _market_key(market) not in session.disliked_items:
+                new_dislikes[_market_key(market)] = market
+        return watchlist, new_dislikes
+
+    def _session_commit(
+        self,
+        session: RecommendationSession,
+        watchlist: Optional[Dict[str, Dict[str, Any]]],
+        new_dislikes: Dict[str, Dict[str, Any]],
+        keywords: Optional[List[str]],
+        result: RecommendationResult,
+        start: float
+    ) -> List[str]:
+        """
+        Apply the output of _session_changes (and the keywords extracted from
+        the new watchlist, if it changed) to a session in one step.
+
+        New dislikes just extend the negative keyword set (the extraction is
+        a per-title union, so this matches extracting from every disliked title).
+
+        Returns:
+            The session keywords with no stored results, in keyword order.
+        """
+        if watchlist is not None:
+            session.watchlist = watchlist
+            session.keywords = keywords
+        if new_dislikes:
+            session.disliked_items.update(new_dislikes)
+            session.negative_keywords |= self._extract_negative_keywords(
+                [m.get("title", "") for m in new_dislikes.values()]
+            )
+
+        to_fetch = [k for k in session.keywords if k not in session.results_by_keyword]
+        result.cached_keywords = self._cached_keywords(to_fetch)
+        result.timings["extract"] = _elapsed_ms(start)
+
+        if self.debug:
+            print(f"Session {session.session_id}: keywords {session.keywords}, searching {to_fetch}")
+        trace = current_trace()
+        if trace is not None:
+            trace.event(
+                "session.update",
+                session_id=session.session_id,
+                watchlist_size=len(session.watchlist),
+                new_dislikes=len(new_dislikes),
+                keywords=session.keywords,
+                fetch=to_fetch,
+            )
+        return to_fetch
+
+    def _session_plan(
+        self,
+        session: RecommendationSession,
+        add: Optional[List[Dict[str, Any]]],
+        remove: Optional[List[str]],
+        dislike: Optional[List[Dict[str, Any]]],
+        result: RecommendationResult
+    ) -> List[str]:
+        """
+        Apply watchlist and dislike changes to a session and work out which
+        keywords still need a search. Positive keywords are re-extracted only
+        when the watchlist changed.
+
+        Returns:
+            The session keywords with no stored results, in keyword order.
+        """
+        start = time.perf_counter()
+        watchlist, new_dislikes = self._session_changes(session, add, remove, dislike)
+        keywords = None
+        if watchlist is not None:
+            titles = [m.get("title", "") for m in watchlist.values()]
+            keywords = self._get_positive_keywords(titles) if titles else []
+        return self._session_commit(session, watchlist, new_dislikes, keywords, result, start)
+
+    def _session_rank(
+        self,
+        session: RecommendationSession,
+        fetched: Dict[str, List[Dict[str, Any]]],
+        top_n: int,
+        result: RecommendationResult,
+        request_start: float
+    ) -> None:
+        """
+        Store newly fetched keyword results on the session and re-rank its pool.
+
+        Results for keywords no longer in the session are dropped. The pool is
+        re-merged (in keyword order, from stored results only) when the
+        keyword set or its results changed, so markets whose only source
+        keyword went away leave the pool and the ranking matches a fresh
+        get_recommendations call. A dislike-only update reuses the pool as is
+        and only re-scores it.
+        """
+        session.results_by_keyword.update(fetched)
+        session.results_by_keyword = {
+            k: session.results_by_keyword[k] for k in session.keywords if k in session.results_by_keyword
+        }
+        if fetched or tuple(session.keywords) != session.pool_keywords:
+            session.candidates = self._merge_keyword_results(session.keywords, session.results_by_keyword)
+            session.pool_keywords = tuple(session.keywords)
+
+        result.keywords = list(session.keywords)
+        result.negative_keywords = sorted(session.negative_keywords)
+        result.missing_keywords = [k for k in session.keywords if k not in session.results_by_keyword]
+        result.total_candidates = len(session.candidates)
+        if session.candidates:
+            result.recommendations = self._rank_candidates(
+                session.candidates, list(session.watchlist.values()), session.keywords,
+                session.negative_keywords, top_n, timings=result.timings
+            )
+        result.timings["total"] = _elapsed_ms(request_start)
+        observe_stages(result.timings, result.total_candidates)
+
+    def update_session(
+        self,
+        session: RecommendationSession,
+        add: Optional[List[Dict[str, Any]]] = None,
+        remove: Optional[List[str]] = None,
+        dislike: Optional[List[Dict[str, Any]]] = None,
+        top_n: int = 10,
+        deadline_ms: Optional[float] = None
+    ) -> RecommendationResult:
+        """
+        Incrementally update a session's recommendations.
+
+        Only keywords the session has no results for are searched, so adding
+        a market costs at most the searches for the keywords it introduces,
+        removing one costs none, and a dislike is applied as a re-penalty over
+        the existing pool with no network I/O. Keywords that failed or missed
+        the deadline are retried on the next update. Start from an empty
+        RecommendationSession() and pass the initial watchlist as add.
+
+        Args:
+            session: Session to update in place.
+            add: Markets to add to (or replace in) the watchlist.
+            remove: IDs of watchlist markets to remove.
+            dislike: Markets to add to the disliked items.
+            top_n: Number of recommendations to return.
+            deadline_ms: Optional budget for the searches this update needs.
+
+        Returns:
+            RecommendationResult for the session's updated watchlist and dislikes.
+        """
+        request_start = time.perf_counter()
+        deadline = _deadline_at(deadline_ms)
+        result = RecommendationResult()
+        to_fetch = self._session_plan(session, add, remove, dislike, result)
+
+        start = time.perf_counter()
+        fetched = self._fetch_keywords(to_fetch, deadline) if to_fetch else {}
+        result.timings["search"] = _elapsed_ms(start)
+
+        self._session_rank(session, fetched, top_n, result, request_start)
+        return result
+
+    def _get_similar_keywords(self, title: str) -> List[str]:
+        """
+        Extract search keywords for a single source market.
+
+        Args:
+            title: Title of the source market.
+
+        Returns:
+            List of keywords (may be empty if the title is empty).
+        """
+        # For a single market, extract more keywords directly from the title
+        # to ensure we have enough search terms
+        keywords = self._extract_keywords_from_title(title, top_n=4)
 
-        # Step 4: Calculate scores
         if self.debug:
             print(f"\n{'='*60}")
-            print("SCORE CALCULATIONS")
+            print(f"SIMILAR MARKETS for: {title[:50]}...")
+            print(f"Extracted keywords: {keywords}")
             print(f"{'='*60}")
 
-        # Find max log volume for normalization
-        max_log_volume = max(
-            math.log(m["volume"] + 1) for m in candidates.values()
-        )
+        if not keywords:
+            # Fallback: use the full title as a search query
+            keywords = [title.split()[0]] if title else []
+            if self.debug:
+                print(f"No keywords extracted, using fallback: {keywords}")
 
-        scored_markets = []
-        watchlist_ids = {m.get("id") for m in watchlist}
-        watchlist_titles = {m.get("title", "").lower().strip() for m in watchlist}
+        trace = current_trace()
+        if trace is not None:
+            trace.event("similar.keywords", title=title, keywords=keywords)
 
-        for market_id, market in candidates.items():
-            # Skip markets already in watchlist (check both ID and title)
-            if market_id in watchlist_ids:
-                if self.debug:
-                    print(f"\n  SKIPPED (in watchlist by ID): '{market['title'][:40]}...'")
-                continue
+        return keywords
 
-            if market["title"].lower().strip() in watchlist_titles:
-                if self.debug:
-                    print(f"\n  SKIPPED (in watchlist by title): '{market['title'][:40]}...'")
+    def _rank_similar(
+        self,
+        candidates: Dict[str, Dict[str, Any]],
+        market: Dict[str, Any],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Score candidates for a similar-markets query, excluding the source market.
+
+        Args:
+            candidates: Candidate pool keyed by market ID.
+            market: The source market.
+            limit: Number of similar markets to return.
+
+        Returns:
+            List of the top `limit` similar markets with scores.
+        """
+        pool = list(candidates.values())
+        relevance = self.relevance_scorer.score([market.get("title", "")], pool)
+        score_results = self.score_batch(pool, set(), relevance=relevance)
+        source_id = market.get("id", "")
+        source_title_lower = market.get("title", "").lower().strip()
+
+        scored_markets = []
+        for (market_id, candidate), score_result in zip(candidates.items(), score_results):
+            # Skip the source market itself
+            if market_id == source_id or candidate["title"].lower().strip() == source_title_lower:
                 continue
 
-            score_result = self._calculate_score(market, negative_keywords, max_log_volume)
             scored_markets.append({
-                **market,
+                **public_market(candidate),
                 "score": score_result["final_score"],
                 "volume_score": score_result["volume_score"],
                 "novelty_score": score_result["novelty_score"],
                 "relevance_score": score_result["relevance_score"],
-                "penalized": score_result["penalized"],
+                "penalized": False,
             })
 
-        # Step 5: Diverse selection with quota per keyword
-        recommendations = self._select_diverse_results(
-            scored_markets, positive_keywords, top_n
-        )
+        # Sort by score and return top results
+        scored_markets.sort(key=lambda x: x["score"], reverse=True)
+        return scored_markets[:limit]
 
-        if self.debug:
-            print(f"\n{'='*60}")
-            print(f"TOP {top_n} RECOMMENDATIONS (diverse)")
-            print(f"{'='*60}")
-            for i, rec in enumerate(recommendations, 1):
-                penalty_flag = " [PENALIZED]" if rec.get("penalized") else ""
-                print(f"{i}. Score: {rec['score']:.4f}{penalty_flag} [from: {rec.get('query_matched', 'unknown')}]")
-                print(f"   {rec['title']}")
-                print(f"   Volume: ${rec['volume']:,} | Vol: {rec['volume_score']:.2f} | Nov: {rec['novelty_score']:.2f}")
+    def get_similar_markets(
+        self,
+        market: Dict[str, Any],
+        limit: int = 3,
+        deadline_ms: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Find markets similar to a single source market.
 
-        return recommendations
+        Args:
+            market: The source market (must have a title).
+            limit: Number of similar markets to return.
+            deadline_ms: Optional budget; keywords not answered in time are skipped.
+
+        Returns:
+            Dict with the similar markets, source title, count, keywords used
+            and the keywords that were missing from the pool.
+        """
+        deadline = _deadline_at(deadline_ms)
+        title = market.get("title", "")
+        keywords = self._get_similar_keywords(title)
+
+        missing = []
+        candidates = self._scattershot_search(keywords, deadline, missing) if keywords else {}
+        similar = self._rank_similar(candidates, market, limit) if candidates else []
+
+        return {
+            "similar": similar,
+            "source_market": title,
+            "count": len(similar),
+            "keywords_used": keywords,
+            "missing_keywords": missing
+        }
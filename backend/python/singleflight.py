@@ -0,0 +1,160 @@
+"""
+SingleFlight: coalesce concurrent identical upstream queries.
+
+While a search for a key is in flight, later callers for the same key wait on
+that call's result instead of issuing their own request. Works for both
+thread-based callers (SearchRecommender's executor) and asyncio callers
+(AsyncSearchRecommender).
+"""
+
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Hashable, List
+
+from cache import search_call_args
+
+
+class _Call:
+    """An in-flight sync call that followers can wait on."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key. Only one call per key runs at a
+    time; everyone else who asks for that key while it's running shares its
+    result (or its exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Any, asyncio.Task] = {}
+
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) unless a call for key is already running,
+        in which case wait for that call and return its result.
+
+        Args:
+            key: Identity of the call (e.g. (query, dedupe_events)).
+            fn: Function to execute if this caller is the leader.
+
+        Returns:
+            The result of the (possibly shared) call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Coroutine version of do(). The shared call runs as its own task, so a
+        cancelled caller doesn't cancel the work other callers are waiting on.
+
+        Args:
+            key: Identity of the call (e.g. (query, dedupe_events)).
+            fn: Coroutine function to execute if this caller is the leader.
+
+        Returns:
+            The result of the (possibly shared) call.
+        """
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is not None:
+                self.coalesced += 1
+            else:
+                task = loop.create_task(fn(*args, **kwargs))
+                self._tasks[task_key] = task
+                self.calls += 1
+                task.add_done_callback(lambda t: self._forget_task(task_key, t))
+
+        return await asyncio.shield(task)
+
+    def _forget_task(self, task_key: Any, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get single-flight counters.
+
+        Returns:
+            Dict with leader calls, coalesced calls, coalesced ratio and
+            number of calls currently in flight.
+        """
+        with self._lock:
+            total = self.calls + self.coalesced
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "coalesced_ratio": self.coalesced / total if total else 0.0,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
+
+
+def singleflight_search(search_func: Callable, flight: SingleFlight) -> Callable:
+    """
+    Wrap a sync or async search function (query, dedupe_events=True) so
+    concurrent identical queries share one upstream call.
+
+    Args:
+        search_func: Function with the search_gamma_api signature.
+        flight: SingleFlight shared by every caller of the wrapped function.
+
+    Returns:
+        Wrapped function with the same signature (and sync/async flavour).
+    """
+    if asyncio.iscoroutinefunction(search_func):
+        async def search_async(query: str, dedupe_events: bool = True) -> List[Dict[str, Any]]:
+            args, kwargs = search_call_args(query, dedupe_events)
+            return await flight.do_async((query, dedupe_events), search_func, *args, **kwargs)
+
+        search_async.singleflight = flight
+        search_async.__wrapped__ = search_func
+        return search_async
+
+    def search(query: str, dedupe_events: bool = True) -> List[Dict[str, Any]]:
+        args, kwargs = search_call_args(query, dedupe_events)
+        return flight.do((query, dedupe_events), search_func, *args, **kwargs)
+
+    search.singleflight = flight
+    search.__wrapped__ = search_func
+    return search
@@ -0,0 +1,214 @@
+"""
+Persistent on-disk snapshots of the market catalog, search result cache and
+LLM keyword cache.
+
+Snapshots are single SQLite files with a versioned schema and one
+zlib-compressed JSON blob per event / cache entry. The process loads one
+before serving traffic, so a restart starts warm instead of sending every
+early request to the upstream API. Each cache entry keeps its original fetch
+time, so stale entries are served and revalidated lazily by the TTLCache
+stale-while-revalidate path instead of being trusted as fresh.
+"""
+
+import json
+import os
+import sqlite3
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+from cache import TTLCache
+from market_catalog import MarketCatalog
+
+SNAPSHOT_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE catalog_events (
+    event_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    markets BLOB NOT NULL
+);
+CREATE TABLE search_cache (
+    query TEXT NOT NULL,
+    dedupe_events INTEGER NOT NULL,
+    results BLOB NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (query, dedupe_events)
+);
+CREATE TABLE keyword_cache (
+    fingerprint TEXT PRIMARY KEY,
+    keywords TEXT NOT NULL,
+    stored_at REAL NOT NULL
+);
+"""
+
+
+def _pack(value: Any) -> bytes:
+    """Compact JSON, zlib-compressed (level 1 keeps saves fast)."""
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode(), 1)
+
+
+def _unpack(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob))
+
+
+def save_snapshot(
+    path: str,
+    catalog: Optional[MarketCatalog] = None,
+    cache: Optional[TTLCache] = None,
+    keyword_cache: Optional[TTLCache] = None
+) -> Dict[str, Any]:
+    """
+    Write the catalog, search cache and/or keyword cache to a snapshot file.
+
+    The snapshot is written to a temporary file and renamed into place, so
+    a crash mid-write never leaves a truncated snapshot behind.
+
+    Args:
+        path: Destination file path.
+        catalog: Market catalog to persist (skipped if None or empty).
+        cache: Search result cache to persist (skipped if None).
+        keyword_cache: KeywordExtractor cache to persist (skipped if None).
+
+    Returns:
+        Dict with the number of events and cache entries written (plus
+        keyword_entries when keyword_cache is given).
+    """
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    events_written = 0
+    entries_written = 0
+    written = {}
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(_SCHEMA)
+        meta = {
+            "schema_version": str(SNAPSHOT_SCHEMA_VERSION),
+            "created_at": str(time.time()),
+        }
+
+        if catalog is not None and catalog.ready:
+            rows = [
+                (event_id, title, _pack(markets))
+                for event_id, title, markets in catalog.export()
+            ]
+            conn.executemany("INSERT INTO catalog_events VALUES (?, ?, ?)", rows)
+            meta["catalog_refreshed_at"] = str(catalog.last_refresh)
+            events_written = len(rows)
+
+        if cache is not None:
+            rows = [
+                (key[0], int(key[1]), _pack(entry.value), entry.stored_at)
+                for key, entry in cache.items()
+                if isinstance(key, tuple) and len(key) == 2 and isinstance(key[0], str)
+            ]
+            conn.executemany("INSERT INTO search_cache VALUES (?, ?, ?, ?)", rows)
+            entries_written = len(rows)
+
+        if keyword_cache is not None:
+            rows = [
+                (key, json.dumps(entry.value), entry.stored_at)
+                for key, entry in keyword_cache.items()
+                if isinstance(key, str)
+            ]
+            conn.executemany("INSERT INTO keyword_cache VALUES (?, ?, ?)", rows)
+            written["keyword_entries"] = len(rows)
+
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+    return {"events": events_written, "cache_entries": entries_written, **written}
+
+
+def load_snapshot(
+    path: str,
+    catalog: Optional[MarketCatalog] = None,
+    cache: Optional[TTLCache] = None,
+    keyword_cache: Optional[TTLCache] = None
+) -> Dict[str, Any]:
+    """
+    Restore the catalog, search cache and/or keyword cache from a snapshot file.
+
+    Cache entries keep their original fetch time: fresh ones are served as
+    hits, stale ones are served and refreshed in the background, and entries
+    past the cache's stale window are skipped.
+
+    Args:
+        path: Snapshot file path.
+        catalog: Market catalog to populate (skipped if None).
+        cache: Search result cache to populate (skipped if None).
+        keyword_cache: KeywordExtractor cache to populate (skipped if None).
+                       Snapshots written before it was added simply have none.
+
+    Returns:
+        Dict with what was loaded, or {"loaded": False, "reason": ...} if the
+        file is missing or from an incompatible schema version.
+    """
+    if not os.path.exists(path):
+        return {"loaded": False, "reason": "missing"}
+
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+        except sqlite3.DatabaseError:
+            return {"loaded": False, "reason": "unreadable"}
+
+        if meta.get("schema_version") != str(SNAPSHOT_SCHEMA_VERSION):
+            return {"loaded": False, "reason": f"schema version {meta.get('schema_version')}"}
+
+        result = {
+            "loaded": True,
+            "created_at": float(meta["created_at"]),
+            "events": 0,
+            "cache_entries": 0,
+        }
+
+        if catalog is not None and "catalog_refreshed_at" in meta:
+            normalized = [
+                (event_id, title, _unpack(markets))
+                for event_id, title, markets in conn.execute(
+                    "SELECT event_id, title, markets FROM catalog_events"
+                )
+            ]
+            catalog.load_normalized(normalized, ingested_at=float(meta["catalog_refreshed_at"]))
+            result["events"] = len(normalized)
+            result["catalog_refreshed_at"] = catalog.last_refresh
+
+        if cache is not None:
+            oldest_servable = cache.clock() - (cache.ttl + cache.stale_ttl)
+            rows = conn.execute(
+                "SELECT query, dedupe_events, results, stored_at FROM search_cache "
+                "WHERE stored_at >= ? ORDER BY stored_at",
+                (oldest_servable,)
+            )
+            for query, dedupe_events, results, stored_at in rows:
+                cache.set((query, bool(dedupe_events)), _unpack(results), stored_at=stored_at)
+                result["cache_entries"] += 1
+
+        if keyword_cache is not None:
+            try:
+                rows = conn.execute(
+                    "SELECT fingerprint, keywords, stored_at FROM keyword_cache "
+                    "WHERE stored_at >= ? ORDER BY stored_at",
+                    (keyword_cache.clock() - keyword_cache.ttl,)
+                ).fetchall()
+            except sqlite3.OperationalError:
+                rows = []  # no keyword_cache table
+            for fingerprint, keywords, stored_at in rows:
+                keyword_cache.set(fingerprint, json.loads(keywords), stored_at=stored_at)
+            result["keyword_entries"] = len(rows)
+
+        return result
+    finally:
+        conn.close()
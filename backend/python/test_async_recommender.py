@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Test script for AsyncSearchRecommender.
+Checks that the async pipeline scores exactly like the sync SearchRecommender,
+using a canned search function so it runs offline.
+"""
+
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+from cache import TTLCache
+from search_recommender import RecommendationResult, SearchRecommender
+from async_recommender import AsyncSearchRecommender
+
+FAKE_INDEX = {
+    "bitcoin": [
+        {"id": "b1", "title": "Bitcoin above $150k in 2025?", "volume": 5000000,
+         "query_matched": "bitcoin", "created_at": "2025-01-02T00:00:00Z", "end_date": "2025-12-31T00:00:00Z"},
+        {"id": "b2", "title": "Bitcoin ETF inflows exceed $50B?", "volume": 800000,
+         "query_matched": "bitcoin", "created_at": None, "end_date": None},
+        {"id": "s1", "title": "Super Bowl champion crypto sponsor?", "volume": 300000,
+         "query_matched": "bitcoin", "created_at": None, "end_date": None},
+    ],
+    "ethereum": [
+        {"id": "e1", "title": "Ethereum flips Bitcoin?", "volume": 2000000,
+         "query_matched": "ethereum", "created_at": "2024-06-01T00:00:00Z", "end_date": None},
+        {"id": "b2", "title": "Bitcoin ETF inflows exceed $50B?", "volume": 800000,
+         "query_matched": "ethereum", "created_at": None, "end_date": None},
+    ],
+}
+
+WATCHLIST = [
+    {"id": "w1", "title": "Will Bitcoin reach $150,000 in 2025?", "volume": 5000000},
+    {"id": "w2", "title": "Ethereum ETF approval by SEC?", "volume": 3000000},
+]
+DISLIKED = [{"id": "d1", "title": "Super Bowl winner 2025?", "volume": 2000000}]
+
+
+def fake_search(query):
+    results = []
+    for word in query.lower().split():
+        results.extend(FAKE_INDEX.get(word, []))
+    return [dict(m, query_matched=query) for m in results]
+
+
+async def fake_search_async(query):
+    await asyncio.sleep(0)
+    return fake_search(query)
+
+
+def test_async_matches_sync():
+    """Async and sync recommenders return identical scored output."""
+    print("\n" + "="*70)
+    print("TEST: AsyncSearchRecommender matches SearchRecommender")
+    print("="*70)
+
+    sync_results = SearchRecommender(search_func=fake_search, debug=False).get_recommendations(
+        WATCHLIST, DISLIKED, top_n=5
+    )
+    async_results = asyncio.run(
+        AsyncSearchRecommender(search_func=fake_search_async, debug=False).get_recommendations(
+            WATCHLIST, DISLIKED, top_n=5
+        )
+    )
+
+    assert sync_results, "expected some recommendations"
+    assert [(r["id"], r["score"]) for r in async_results] == [(r["id"], r["score"]) for r in sync_results]
+    for r in async_results:
+        print(f"  {r['score']:.4f}  {r['title']}")
+
+
+def test_async_similar_matches_sync():
+    """get_similar_markets agrees between the two classes."""
+    source = {"id": "b1", "title": "Bitcoin above $150k in 2025?", "volume": 5000000}
+
+    sync_similar = SearchRecommender(search_func=fake_search, debug=False).get_similar_markets(source, limit=3)
+    async_similar = asyncio.run(
+        AsyncSearchRecommender(search_func=fake_search_async, debug=False).get_similar_markets(source, limit=3)
+    )
+
+    assert async_similar["keywords_used"] == sync_similar["keywords_used"]
+    assert [m["id"] for m in async_similar["similar"]] == [m["id"] for m in sync_similar["similar"]]
+    assert "b1" not in {m["id"] for m in async_similar["similar"]}
+
+
+def test_failed_search_is_skipped():
+    """One failing keyword doesn't sink the whole fan-out."""
+    async def flaky_search(query):
+        if query.startswith("ethereum"):
+            raise RuntimeError("upstream down")
+        return await fake_search_async(query)
+
+    recommender = AsyncSearchRecommender(search_func=flaky_search, debug=False)
+    candidates = asyncio.run(recommender._scattershot_search(["bitcoin", "ethereum"]))
+    assert set(candidates) == {"b1", "b2", "s1"}
+
+
+def test_deadline_returns_partial_pool():
+    """At the deadline, slow keywords are cancelled and reported, and the rest are still scored."""
+    cancelled = []
+
+    async def slow_ethereum(query):
+        if "ethereum" in query:
+            try:
+                await asyncio.sleep(2)
+            except asyncio.CancelledError:
+                cancelled.append(query)
+                raise
+        return await fake_search_async(query)
+
+    recommender = AsyncSearchRecommender(search_func=slow_ethereum, debug=False)
+    start = time.perf_counter()
+    result = asyncio.run(recommender.get_recommendations(WATCHLIST, DISLIKED, top_n=5, return_result=True, deadline_ms=200))
+    elapsed = time.perf_counter() - start
+
+    slow_keywords = [k for k in result.keywords if "ethereum" in k]
+    print(f"  {len(result.recommendations)} recommendations in {elapsed * 1000:.0f}ms, missing {result.missing_keywords}")
+    assert slow_keywords and result.missing_keywords == slow_keywords
+    assert sorted(cancelled) == sorted(slow_keywords)
+    assert elapsed < 1.0
+    assert {r["id"] for r in result.recommendations} <= {"b1", "b2", "s1"} and result.recommendations
+
+    def slow_sync(query):
+        if "ethereum" in query:
+            time.sleep(0.5)
+        return fake_search(query)
+
+    start = time.perf_counter()
+    similar = SearchRecommender(search_func=slow_sync, debug=False).get_similar_markets(
+        {"id": "x", "title": "Ethereum and Bitcoin ETF flows", "volume": 1}, deadline_ms=100
+    )
+    assert time.perf_counter() - start < 0.4
+    assert similar["missing_keywords"] == [k for k in similar["keywords_used"] if "ethereum" in k]
+    assert similar["similar"]
+
+    fast = AsyncSearchRecommender(search_func=fake_search_async, debug=False)
+    full = asyncio.run(fast.get_recommendations(WATCHLIST, top_n=5, return_result=True, deadline_ms=5000))
+    assert full.missing_keywords == [] and full.total_candidates == 4
+
+
+def test_stream_recommendations():
+    """Provisional rankings arrive as fast keywords land; the final event matches get_recommendations."""
+    async def slow_ethereum(query):
+        if "ethereum" in query:
+            await asyncio.sleep(0.3)
+        return await fake_search_async(query)
+
+    async def collect(recommender):
+        start = time.perf_counter()
+        events = []
+        async for event in recommender.stream_recommendations(WATCHLIST, DISLIKED, top_n=5):
+            events.append((event, time.perf_counter() - start))
+        return events
+
+    events = asyncio.run(collect(AsyncSearchRecommender(search_func=slow_ethereum, debug=False)))
+    types = [e["type"] for e, _ in events]
+    print(f"  events: {[(e['type'], round(t * 1000)) for e, t in events]}")
+    assert types[0] == "keywords" and types[-1] == "final" and "provisional" in types
+
+    first_card, first_at = next((e, t) for e, t in events if e["type"] == "provisional")
+    assert first_at < 0.2 and first_card["recommendations"]
+    assert first_card["pending"] and all("ethereum" in k for k in first_card["pending"])
+
+    final = events[-1][0]
+    expected = asyncio.run(
+        AsyncSearchRecommender(search_func=fake_search_async, debug=False).get_recommendations(
+            WATCHLIST, DISLIKED, top_n=5, return_result=True
+        )
+    )
+    assert [(r["id"], r["score"]) for r in final["recommendations"]] == [(r["id"], r["score"]) for r in expected.recommendations]
+    assert final["keywords_used"] == expected.keywords and final["missing_keywords"] == []
+
+    # b2 is returned by both "bitcoin" and "ethereum etf"; when the first keyword lands
+    # last, the stream must still attribute it to "bitcoin" like get_recommendations
+    async def slow_bitcoin(query):
+        if query == "bitcoin":
+            await asyncio.sleep(0.1)
+        return await fake_search_async(query)
+
+    final = asyncio.run(collect(AsyncSearchRecommender(search_func=slow_bitcoin, debug=False)))[-1][0]
+    assert [(r["id"], r["score"], r["query_matched"]) for r in final["recommendations"]] == [
+        (r["id"], r["score"], r["query_matched"]) for r in expected.recommendations
+    ]
+
+    import main
+
+    original = main.recommender
+    main.recommender = AsyncSearchRecommender(search_func=slow_ethereum, debug=False)
+
+    async def request():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            body = {"watchlist": WATCHLIST, "disliked_items": DISLIKED}
+            ndjson = await client.post("/api/recommendations/stream", json=body)
+            sse = await client.post("/api/recommendations/stream", json=body, headers={"Accept": "text/event-stream"})
+            return ndjson, sse
+
+    try:
+        ndjson, sse = asyncio.run(request())
+    finally:
+        main.recommender = original
+
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert lines[0]["type"] == "keywords" and lines[-1]["type"] == "final"
+    assert sse.headers["content-type"].startswith("text/event-stream")
+    assert sse.text.startswith("event: keywords\ndata: ") and "event: final\n" in sse.text
+
+
+def test_stream_scores_each_batch_once():
+    """
+    Provisional rankings score only the markets each landed keyword adds (plus
+    shortlist rescoring), not the whole pool again per keyword.
+    """
+    recommender = AsyncSearchRecommender(debug=False)
+    keywords = recommender._extract_keywords([m["title"] for m in WATCHLIST], top_n=6)
+
+    landed = {}
+
+    async def large_search(query):
+        # Land one at a time, last keyword first (so earlier keywords take over shared markets)
+        index = keywords.index(query)
+        landed.setdefault(query, asyncio.Event())
+        if index + 1 < len(keywords):
+            await landed.setdefault(keywords[index + 1], asyncio.Event()).wait()
+        await asyncio.sleep(0.005)
+        landed[query].set()
+        rng = random.Random(query)
+        return [
+            {"id": f"m{rng.randint(0, 6000)}", "title": f"{query} market {i}", "volume": rng.randint(0, 10**6),
+             "query_matched": query, "created_at": None, "end_date": None}
+            for i in range(2000)
+        ]
+
+    recommender.search_func = large_search
+    scored = []
+    score_batch = recommender.score_batch
+
+    def counting_score_batch(candidates, *args, **kwargs):
+        scored.append(len(candidates))
+        return score_batch(candidates, *args, **kwargs)
+
+    recommender.score_batch = counting_score_batch
+
+    async def collect():
+        return [event async for event in recommender.stream_recommendations(WATCHLIST, top_n=10)]
+
+    events = asyncio.run(collect())
+    final = events[-1]
+    provisional = [e for e in events if e["type"] == "provisional"]
+    provisional_scored = sum(scored[:-1])
+    rerank_scored = sum(e["total_candidates"] for e in provisional)
+    print(f"  pool {final['total_candidates']}: {provisional_scored} markets scored across "
+          f"{len(provisional)} provisional rankings (full re-ranks: {rerank_scored})")
+    assert final["keywords_used"] == keywords and len(provisional) == len(keywords)
+    assert scored[-1] == final["total_candidates"]
+    # Each result is scored at most once, plus shortlist rescoring when the volume maximum grows
+    assert provisional_scored <= 2000 * len(keywords) + len(keywords) * len(keywords) * 20
+    assert provisional_scored < rerank_scored / 2
+    assert len(provisional[-1]["recommendations"]) == len(final["recommendations"]) > 0
+    assert provisional[-1]["total_candidates"] == final["total_candidates"]
+
+
+def test_batch_recommendations():
+    """A batch searches each distinct keyword once and scores every entry like a single request."""
+    other = [{"id": "w3", "title": "Bitcoin ETF inflows this quarter?", "volume": 100000}]
+    batch = [
+        {"watchlist": WATCHLIST, "disliked_items": DISLIKED},
+        {"watchlist": WATCHLIST, "disliked_items": []},
+        {"watchlist": other},
+        {"watchlist": []},
+    ]
+    calls = []
+
+    def counting_search(query):
+        calls.append(query)
+        return fake_search(query)
+
+    recommender = SearchRecommender(search_func=counting_search, debug=False)
+    results = recommender.get_recommendations_batch(batch, top_n=5)
+    unique = {k for r in results for k in r.keywords}
+    print(f"  {len(calls)} upstream calls for {sum(len(r.keywords) for r in results)} keyword requests")
+    assert sorted(calls) == sorted(unique)
+
+    single = SearchRecommender(search_func=fake_search, debug=False)
+    for entry, result in zip(batch, results):
+        expected = single.get_recommendations(entry["watchlist"], entry.get("disliked_items"), top_n=5, return_result=True)
+        assert [(r["id"], r["score"]) for r in result.recommendations] == [(r["id"], r["score"]) for r in expected.recommendations]
+        assert result.keywords == expected.keywords and result.negative_keywords == expected.negative_keywords
+        assert result.total_candidates == expected.total_candidates
+    assert results[0].recommendations != results[1].recommendations, "dislikes are per entry"
+    assert results[3].recommendations == [] and results[3].keywords == []
+
+    async_results = asyncio.run(
+        AsyncSearchRecommender(search_func=fake_search_async, debug=False).get_recommendations_batch(batch, top_n=5)
+    )
+    assert [[r["id"] for r in a.recommendations] for a in async_results] == [[r["id"] for r in b.recommendations] for b in results]
+
+    import main
+
+    original = main.recommender
+    main.recommender = AsyncSearchRecommender(search_func=fake_search_async, debug=False)
+
+    async def request():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/recommendations/batch", json={"requests": batch, "top_n": 5})
+
+    try:
+        response = asyncio.run(request())
+    finally:
+        main.recommender = original
+
+    body = response.json()
+    assert response.status_code == 200 and len(body["results"]) == 4
+    assert body["unique_keywords"] == len(unique) < body["keyword_requests"]
+    assert [r["id"] for r in body["results"][0]["recommendations"]] == [r["id"] for r in results[0].recommendations]
+
+
+def test_recommendation_result():
+    """return_result=True carries the keywords, cache hits and stage timings."""
+    cache = TTLCache(ttl=60)
+    recommender = SearchRecommender(search_func=fake_search, debug=False, cache=cache)
+    plain = recommender.get_recommendations(WATCHLIST, DISLIKED, top_n=5)
+    result = recommender.get_recommendations(WATCHLIST, DISLIKED, top_n=5, return_result=True)
+
+    assert isinstance(result, RecommendationResult)
+    assert [r["id"] for r in result.recommendations] == [r["id"] for r in plain]
+    assert result.keywords == recommender._get_positive_keywords([m["title"] for m in WATCHLIST])
+    assert result.negative_keywords == ["bowl", "super"], "generic words like winner are dropped"
+    assert result.total_candidates == 4
+    # Keywords that found something were cached by the first request (empty results aren't cached)
+    assert result.cached_keywords == [k for k in result.keywords if fake_search(k)]
+    assert result.cached_keywords
+    assert list(result.timings) == ["extract", "search", "score", "select", "total"]
+    print(f"  Server-Timing: {result.server_timing()}")
+
+    async_result = asyncio.run(
+        AsyncSearchRecommender(search_func=fake_search_async, debug=False).get_recommendations(
+            WATCHLIST, DISLIKED, top_n=5, return_result=True
+        )
+    )
+    assert async_result.keywords == result.keywords and async_result.cached_keywords == []
+    assert [r["id"] for r in async_result.recommendations] == [r["id"] for r in plain]
+
+    empty = recommender.get_recommendations([], return_result=True)
+    assert empty.recommendations == [] and empty.total_candidates == 0
+
+
+if __name__ == "__main__":
+    test_async_matches_sync()
+    test_async_similar_matches_sync()
+    test_failed_search_is_skipped()
+    test_deadline_returns_partial_pool()
+    test_stream_recommendations()
+    test_stream_scores_each_batch_once()
+    test_batch_recommendations()
+    test_recommendation_result()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test script for the TTLCache search result cache.
+Uses a fake clock and a counting search function, so it runs offline.
+"""
+
+import asyncio
+import threading
+import time
+
+import cache as cache_module
+from cache import TTLCache, cached_search, cached_search_async
+from search_recommender import SearchRecommender
+from testing_utils import FakeClock
+
+
+def make_search(calls):
+    def search(query, dedupe_events=True):
+        calls.append((query, dedupe_events))
+        return [{"id": f"{query}-{len(calls)}", "title": f"{query} market", "volume": 100, "query_matched": query}]
+    return search
+
+
+def test_ttl_and_counters():
+    """Fresh hits skip the network, expired entries go back to it."""
+    print("\n" + "="*70)
+    print("TEST: TTL expiry and hit/miss counters")
+    print("="*70)
+
+    clock = FakeClock(1_000_000.0)
+    cache = TTLCache(ttl=60, stale_ttl=0, clock=clock)
+    calls = []
+    search = cached_search(make_search(calls), cache)
+
+    search("bitcoin")
+    search("bitcoin")
+    search("bitcoin", dedupe_events=False)
+    assert calls == [("bitcoin", True), ("bitcoin", False)]
+
+    clock.now += 61
+    search("bitcoin")
+    assert len(calls) == 3
+
+    stats = cache.stats()
+    print(f"  {stats}")
+    assert stats["hits"] == 1 and stats["misses"] == 3
+
+
+def test_lru_and_byte_eviction():
+    """Least recently used keys go first, by entry count and by bytes."""
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", [1])
+    cache.set("b", [2])
+    cache.get("a")
+    cache.set("c", [3])
+    assert cache.get("b") is None and cache.get("a") == [1]
+    assert cache.stats()["evictions"] == 1
+
+    small = TTLCache(max_bytes=20, ttl=60)
+    small.set("x", "a" * 10)
+    small.set("y", "b" * 10)
+    assert len(small) == 1 and small.get("y") == "b" * 10
+    assert small.stats()["bytes"] <= 20
+
+
+def test_stale_while_revalidate():
+    """A stale entry is returned at once and refreshed in the background."""
+    clock = FakeClock(1_000_000.0)
+    cache = TTLCache(ttl=60, stale_ttl=300, clock=clock)
+    calls = []
+    search = cached_search(make_search(calls), cache)
+
+    first = search("trump")
+    clock.now += 120
+    stale = search("trump")
+    assert stale == first, "stale value should be served immediately"
+
+    deadline = time.time() + 2
+    while len(calls) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    for _ in range(100):
+        if cache.is_fresh(("trump", True)):
+            break
+        time.sleep(0.01)
+
+    assert len(calls) == 2
+    assert search("trump")[0]["id"] == "trump-2"
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_async_stale_while_revalidate():
+    """Same behaviour for coroutine search functions."""
+    clock = FakeClock(1_000_000.0)
+    cache = TTLCache(ttl=60, stale_ttl=300, clock=clock)
+    calls = []
+    sync_search = make_search(calls)
+
+    async def search(query, dedupe_events=True):
+        return sync_search(query, dedupe_events)
+
+    cached = cached_search_async(search, cache)
+
+    async def run():
+        await cached("nba")
+        clock.now += 120
+        stale = await cached("nba")
+        await asyncio.sleep(0.01)
+        return stale
+
+    stale = asyncio.run(run())
+    assert stale[0]["id"] == "nba-1"
+    assert len(calls) == 2
+    assert cache.get(("nba", True))[0]["id"] == "nba-2"
+
+
+def test_recommender_shares_cache():
+    """SearchRecommender wraps its search_func with the cache it's given."""
+    cache = TTLCache(ttl=60)
+    calls = []
+    recommender = SearchRecommender(search_func=make_search(calls), debug=False, cache=cache)
+
+    recommender._scattershot_search(["bitcoin", "ethereum"])
+    recommender._scattershot_search(["bitcoin", "ethereum"])
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 2
+
+
+def test_refresh_queue_depth():
+    """refresh_queue_depth() counts refreshes still waiting for one of the four workers."""
+    release = threading.Event()
+    started = []
+    for i in range(6):
+        cache_module._submit_refresh(lambda i: (started.append(i), release.wait(5)), i)
+    deadline = time.monotonic() + 2
+    while len(started) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache_module.refresh_queue_depth() == 2
+
+    release.set()
+    while len(started) < 6 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache_module.refresh_queue_depth() == 0
+
+
+if __name__ == "__main__":
+    test_ttl_and_counters()
+    test_lru_and_byte_eviction()
+    test_stale_while_revalidate()
+    test_async_stale_while_revalidate()
+    test_recommender_shares_cache()
+    test_refresh_queue_depth()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
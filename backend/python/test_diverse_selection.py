@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test script for heap-based diverse selection.
+Checks _select_diverse_results against the sort-based selection it replaced
+on random pools with tied scores and crowded topics.
+"""
+
+import random
+import time
+from collections import Counter
+
+from search_recommender import SearchRecommender
+from tokenizer import topic_signature
+
+TOPICS = ["Bitcoin above", "Lakers win NBA Finals", "Fed rate cut", "Trump approval rating", "Ethereum flips"]
+
+
+def old_select(scored_markets, keywords, top_n):
+    """The pre-heap _select_diverse_results body (debug output and tracing removed)."""
+    if not scored_markets or not keywords:
+        return scored_markets[:top_n]
+
+    keyword_buckets = {kw: [] for kw in keywords}
+    for market in scored_markets:
+        source_kw = market.get("query_matched", "")
+        if source_kw in keyword_buckets:
+            keyword_buckets[source_kw].append(market)
+    for kw in keyword_buckets:
+        keyword_buckets[kw].sort(key=lambda x: x["score"], reverse=True)
+
+    num_keywords = len(keywords)
+    quota_per_keyword = max(1, top_n // num_keywords)
+    extra_slots = top_n - (quota_per_keyword * num_keywords)
+    topic_counts = {}
+    max_per_topic = max(2, top_n // 4)
+    selected = []
+    selected_ids = set()
+
+    for i, kw in enumerate(keywords):
+        quota = quota_per_keyword + (1 if i < extra_slots else 0)
+        added = 0
+        for market in keyword_buckets[kw]:
+            if added >= quota:
+                break
+            if market["id"] not in selected_ids:
+                topic_sig = topic_signature(market["title"])
+                topic_count = topic_counts.get(topic_sig, 0)
+                if topic_count < max_per_topic:
+                    selected.append(market)
+                    selected_ids.add(market["id"])
+                    topic_counts[topic_sig] = topic_count + 1
+                    added += 1
+
+    if len(selected) < top_n:
+        remaining = [m for m in scored_markets if m["id"] not in selected_ids]
+        remaining.sort(key=lambda x: x["score"], reverse=True)
+        for market in remaining:
+            if len(selected) >= top_n:
+                break
+            topic_sig = topic_signature(market["title"])
+            topic_count = topic_counts.get(topic_sig, 0)
+            if topic_count < max_per_topic:
+                selected.append(market)
+                selected_ids.add(market["id"])
+                topic_counts[topic_sig] = topic_count + 1
+
+    selected.sort(key=lambda x: x["score"], reverse=True)
+    return selected[:top_n]
+
+
+def random_pool(rng, size, keywords, topics=TOPICS):
+    """Scored markets with coarse (often tied) scores and a handful of topics."""
+    return [
+        {
+            "id": f"m{i}",
+            "title": f"{rng.choice(topics)} {rng.choice(['', 'by June 2026?', 'in 2025?', 'before $100k'])}",
+            "score": rng.randint(0, 20) / 20,
+            "query_matched": rng.choice(keywords + ["unrelated"]),
+        }
+        for i in range(size)
+    ]
+
+
+def test_matches_sort_based_selection():
+    """
+    Same markets in the same order across pool sizes, keyword counts and
+    top_n, including pools with so few topics that the caps force reading
+    past the partially selected head.
+    """
+    print("\n" + "="*70)
+    print("TEST: heap-based diverse selection")
+    print("="*70)
+
+    recommender = SearchRecommender(debug=False)
+    rng = random.Random(7)
+    for trial in range(300):
+        keywords = [f"kw{k}" for k in range(rng.randint(1, 7))]
+        topics = TOPICS[:rng.randint(1, len(TOPICS))]
+        pool = random_pool(rng, rng.randint(0, 400), keywords, topics)
+        top_n = rng.choice([1, 3, 5, 10, 20])
+        expected = [m["id"] for m in old_select(pool, keywords, top_n)]
+        actual = [m["id"] for m in recommender._select_diverse_results(pool, keywords, top_n)]
+        assert actual == expected, (trial, actual, expected)
+
+    assert recommender._select_diverse_results([], ["kw"], 5) == []
+    pool = random_pool(rng, 5, ["kw"])
+    assert recommender._select_diverse_results(pool, [], 3) == pool[:3]
+
+
+def test_signatures_computed_once_and_large_pool():
+    """Each examined market's signature is computed once; a 5,000-market pool stays fast."""
+    recommender = SearchRecommender(debug=False)
+    calls = Counter()
+
+    def counting_signature(title):
+        calls[title] += 1
+        return topic_signature(title)
+
+    recommender._get_topic_signature = counting_signature
+    rng = random.Random(11)
+    keywords = [f"kw{k}" for k in range(6)]
+    pool = random_pool(rng, 5000, keywords)
+    for i, market in enumerate(pool):
+        market["title"] = f"{market['title']} #{i}"  # distinct titles, so calls count markets
+
+    start = time.perf_counter()
+    selected = recommender._select_diverse_results(pool, keywords, 10)
+    elapsed = time.perf_counter() - start
+    old_start = time.perf_counter()
+    expected = old_select(pool, keywords, 10)
+    old_elapsed = time.perf_counter() - old_start
+
+    print(f"  5000 candidates: heap {elapsed * 1000:.2f}ms vs sort {old_elapsed * 1000:.2f}ms, "
+          f"{len(calls)} signatures computed")
+    assert [m["id"] for m in selected] == [m["id"] for m in expected]
+    assert max(calls.values()) == 1
+    assert len(calls) < 100
+
+
+if __name__ == "__main__":
+    test_matches_sort_based_selection()
+    test_signatures_computed_once_and_large_pool()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script for the fake Gamma server.
+Runs it in-process (ASGI) and on a real local port, so it runs offline.
+"""
+
+import asyncio
+import socket
+import threading
+import time
+
+import httpx
+import uvicorn
+
+import search_recommender
+from fake_gamma import DEFAULT_FIXTURE, FaultConfig, create_app, load_events
+from rate_limiter import UpstreamThrottled
+from search_recommender import search_gamma_api, search_gamma_api_async
+
+EVENTS = load_events(DEFAULT_FIXTURE)
+
+
+def test_async_search_through_fake():
+    """search_gamma_api_async parses fake public-search responses, and raises on 429s."""
+    print("\n" + "="*70)
+    print("TEST: search_gamma_api_async against the fake (ASGI)")
+    print("="*70)
+
+    app = create_app(EVENTS)
+    original = search_recommender.GAMMA_API_URL
+    search_recommender.GAMMA_API_URL = "http://fake/public-search"
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://fake") as client:
+            markets = await search_gamma_api_async("bitcoin", client=client)
+            await client.put("/_faults", json={"throttle_rate": 1.0, "retry_after": 3})
+            throttled = await client.get("/public-search", params={"q": "bitcoin"})
+            try:
+                await search_gamma_api_async("bitcoin", client=client)
+                failed = None
+            except UpstreamThrottled as e:
+                failed = e
+            bad = await client.put("/_faults", json={"nope": 1})
+            stats = (await client.get("/_stats")).json()
+        return markets, throttled, failed, bad, stats
+
+    try:
+        markets, throttled, failed, bad, stats = asyncio.run(run())
+    finally:
+        search_recommender.GAMMA_API_URL = original
+
+    print(f"  {len(markets)} markets, stats {stats}")
+    assert {m["event_id"] for m in markets} == {"16001", "16002"}
+    assert throttled.status_code == 429 and throttled.headers["retry-after"] == "3"
+    assert isinstance(failed, UpstreamThrottled) and failed.retry_after == 3
+    assert bad.status_code == 400
+    assert stats["ok"] == 1 and stats["throttled"] == 2
+
+
+def test_latency_distributions():
+    """Sampled delays follow the configured distribution."""
+    import random
+    rng = random.Random(1)
+    assert FaultConfig(latency_ms=50).sample_latency(rng) == 0.05
+    uniform = [FaultConfig(latency_ms=50, latency_dist="uniform", latency_spread=10).sample_latency(rng) for _ in range(200)]
+    assert 0.04 <= min(uniform) and max(uniform) <= 0.06
+    lognormal = sorted(FaultConfig(latency_ms=50, latency_dist="lognormal", latency_spread=0.5).sample_latency(rng) for _ in range(2001))
+    assert 0.04 < lognormal[1000] < 0.06, "median should be near latency_ms"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_sync_search_over_real_http():
+    """The sync search_gamma_api path, HTTP client included, against a live fake server."""
+    port = free_port()
+    config = FaultConfig(latency_ms=20, slow_body_rate=1.0, slow_body_ms=50, seed=3)
+    server = uvicorn.Server(uvicorn.Config(create_app(EVENTS, config), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 5
+    while not server.started and time.time() < deadline:
+        time.sleep(0.01)
+
+    original = search_recommender.GAMMA_API_URL
+    search_recommender.GAMMA_API_URL = f"http://127.0.0.1:{port}/public-search"
+    try:
+        start = time.perf_counter()
+        markets = search_gamma_api("nba", dedupe_events=False)
+        elapsed = time.perf_counter() - start
+    finally:
+        search_recommender.GAMMA_API_URL = original
+        server.should_exit = True
+        thread.join(5)
+
+    print(f"  {len(markets)} NBA markets in {elapsed * 1000:.0f}ms (slow body)")
+    assert len(markets) > 2 and all(m["query_matched"] == "nba" for m in markets)
+    assert elapsed >= 0.06
+
+
+if __name__ == "__main__":
+    test_async_search_through_fake()
+    test_latency_distributions()
+    test_sync_search_over_real_http()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared, bounded fan-out executor and async limiter.
+Uses slow fake search functions, so it runs offline.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from async_recommender import AsyncSearchRecommender
+from fanout import AsyncFanoutLimiter, FanoutExecutor
+from search_recommender import SearchRecommender, _deadline_at
+
+
+class ConcurrencyProbe:
+    """Search function that records the peak number of concurrent calls."""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, query):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return [{"id": query, "title": f"{query} market", "volume": 1, "query_matched": query}]
+
+
+def test_shared_executor_caps_concurrency():
+    """Many concurrent requests share a fixed set of threads and a global cap."""
+    print("\n" + "="*70)
+    print("TEST: process-wide fan-out cap")
+    print("="*70)
+
+    executor = FanoutExecutor(max_workers=4)
+    probe = ConcurrencyProbe()
+    recommender = SearchRecommender(search_func=probe, debug=False, executor=executor)
+    keywords = [f"kw{i}" for i in range(6)]
+
+    threads_before = threading.active_count()
+    with ThreadPoolExecutor(max_workers=10) as requests:
+        pools = list(requests.map(lambda _: recommender._scattershot_search(keywords), range(10)))
+
+    assert all(set(pool) == set(keywords) for pool in pools)
+    assert probe.peak <= 4, probe.peak
+    stats = executor.stats()
+    print(f"  peak concurrency {probe.peak}, stats {stats}")
+    assert stats["submitted"] == 60 and stats["queued"] == 0 and stats["in_flight"] == 0
+    # Only the executor's own workers were added, not one pool per request
+    assert threading.active_count() - threads_before <= 4
+    executor.shutdown()
+
+
+def test_fifo_order_and_empty_keywords():
+    """Queued work starts in submission order; no keywords means no work."""
+    executor = FanoutExecutor(max_workers=1)
+    started = []
+    futures = [executor.submit(lambda i=i: started.append(i) or time.sleep(0.005)) for i in range(5)]
+    for f in futures:
+        f.result()
+    assert started == [0, 1, 2, 3, 4]
+
+    recommender = SearchRecommender(search_func=ConcurrencyProbe(), debug=False, executor=executor)
+    assert recommender._scattershot_search([]) == {}
+    assert recommender.get_similar_markets({"id": "x", "title": ""})["similar"] == []
+    executor.shutdown()
+
+
+def test_deadline_cancels_queued_work():
+    """Keywords still queued at the deadline are cancelled and leave the queue count."""
+    executor = FanoutExecutor(max_workers=1)
+    recommender = SearchRecommender(search_func=ConcurrencyProbe(delay=0.3), debug=False, executor=executor)
+    keywords = [f"kw{i}" for i in range(4)]
+
+    missing = []
+    assert recommender._scattershot_search(keywords, _deadline_at(100), missing) == {}
+    print(f"  missing {missing}, stats right after the deadline {executor.stats()}")
+    assert missing == keywords
+    assert executor.stats()["queued"] == 0, "cancelled futures must not stay queued"
+
+    time.sleep(0.4)  # the one running search finishes
+    assert executor.stats() == {"max_workers": 1, "queued": 0, "in_flight": 0, "submitted": 4}
+    direct = [executor.submit(time.sleep, 0.2) for _ in keywords]
+    assert all(f.cancel() for f in direct[1:])
+    direct[0].result()
+    assert executor.stats()["queued"] == 0 and executor.stats()["in_flight"] == 0
+    executor.shutdown()
+
+
+def test_async_limiter_caps_upstream_calls():
+    """The async limiter bounds in-flight calls across concurrent requests."""
+    limiter = AsyncFanoutLimiter(max_in_flight=3)
+    active = 0
+    peak = 0
+
+    async def search(query):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return [{"id": query, "title": query, "volume": 1, "query_matched": query}]
+
+    recommender = AsyncSearchRecommender(search_func=search, debug=False, limiter=limiter)
+
+    async def run():
+        return await asyncio.gather(*(
+            recommender._scattershot_search([f"kw{i}" for i in range(6)]) for _ in range(5)
+        ))
+
+    pools = asyncio.run(run())
+    assert all(len(pool) == 6 for pool in pools)
+    assert peak == 3
+    assert limiter.stats() == {"max_in_flight": 3, "queued": 0, "in_flight": 0, "calls": 30}
+
+    # A second event loop gets its own semaphore
+    asyncio.run(recommender._scattershot_search(["again"]))
+
+
+if __name__ == "__main__":
+    test_shared_executor_caps_concurrency()
+    test_fifo_order_and_empty_keywords()
+    test_deadline_cancels_queued_work()
+    test_async_limiter_caps_upstream_calls()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
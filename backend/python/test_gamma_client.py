@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for the pooled GammaClient.
+Uses an httpx.MockTransport so it runs offline.
+"""
+
+import httpx
+
+from gamma_client import GammaClient
+from search_recommender import SearchRecommender
+
+SAMPLE_RESPONSE = {
+    "events": [
+        {
+            "id": "e1",
+            "title": "Bitcoin price",
+            "slug": "bitcoin-price",
+            "markets": [
+                {"id": "m1", "question": "Bitcoin above $150k?", "volume": "5000000"},
+                {"id": "m2", "question": "Bitcoin above $200k?", "volume": "900000"},
+            ],
+        },
+        {"id": "e2", "title": "Ethereum ETF approved?", "volume": "1200000"},
+    ]
+}
+
+
+def make_transport(seen_queries):
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen_queries.append(request.url.params["q"])
+        return httpx.Response(200, json=SAMPLE_RESPONSE)
+    return httpx.MockTransport(handler)
+
+
+def test_search_uses_shared_pool():
+    """The same httpx.Client should serve every search."""
+    print("\n" + "="*70)
+    print("TEST: GammaClient reuses one pool")
+    print("="*70)
+
+    seen = []
+    gamma = GammaClient(transport=make_transport(seen))
+    first_client = gamma.client
+
+    results = gamma.search("bitcoin")
+    gamma.search("ethereum")
+
+    assert gamma.client is first_client
+    assert seen == ["bitcoin", "ethereum"]
+    assert [r["id"] for r in results] == ["m1", "e2"]
+    assert results[0]["volume"] == 5000000
+    print(f"  {len(seen)} searches over one client, results: {[r['title'] for r in results]}")
+
+    gamma.close()
+
+
+def test_lifecycle():
+    """close() drops the pool and the next search reopens it."""
+    seen = []
+    with GammaClient(transport=make_transport(seen)) as gamma:
+        client = gamma.client
+    assert client.is_closed
+
+    gamma.search("trump")
+    assert gamma.client is not client
+    gamma.close()
+
+
+def test_injected_into_recommender():
+    """GammaClient.search plugs straight into SearchRecommender."""
+    seen = []
+    gamma = GammaClient(transport=make_transport(seen))
+    recommender = SearchRecommender(search_func=gamma.search, debug=False)
+
+    watchlist = [{"id": "w1", "title": "Will Bitcoin dominance rise?", "volume": 1000}]
+    results = recommender.get_recommendations(watchlist, [], top_n=5)
+
+    assert seen, "recommender should have searched through the shared client"
+    assert {r["id"] for r in results} == {"m1", "e2"}
+    gamma.close()
+
+
+if __name__ == "__main__":
+    test_search_uses_shared_pool()
+    test_lifecycle()
+    test_injected_into_recommender()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for cached, time-boxed Gemini keyword extraction.
+Uses StubKeywordModel in place of the Gemini client, so it runs offline
+without an API key.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+from async_recommender import AsyncSearchRecommender
+from keyword_extractor import KeywordExtractor, StubKeywordModel, titles_fingerprint
+from search_recommender import SearchRecommender
+from snapshot import load_snapshot, save_snapshot
+from test_async_recommender import WATCHLIST, fake_search, fake_search_async
+
+TITLES = [m["title"] for m in WATCHLIST]
+
+
+def test_cache_by_normalized_title_set():
+    """Reordered or reformatted titles hit the cache; unusable replies aren't cached."""
+    print("\n" + "="*70)
+    print("TEST: Gemini keyword extraction")
+    print("="*70)
+
+    model = StubKeywordModel('```json\n["bitcoin", "ethereum etf", "crypto"]\n```')
+    extractor = KeywordExtractor(model=model)
+    assert extractor.extract(TITLES, num_keywords=2) == ["bitcoin", "ethereum etf"]
+    reordered = [f"  {TITLES[1].upper()} ", TITLES[0]]
+    assert titles_fingerprint(reordered, 2) == titles_fingerprint(TITLES, 2)
+    assert extractor.extract(reordered, num_keywords=2) == ["bitcoin", "ethereum etf"]
+    assert model.calls == 1
+
+    broken = KeywordExtractor(model=StubKeywordModel("Sure! Here are some keywords: bitcoin"))
+    assert broken.extract(TITLES) is None and broken.extract(TITLES) is None
+    assert broken.model.calls == 2 and len(broken.cache) == 0
+
+    failing = KeywordExtractor(model=StubKeywordModel(error=RuntimeError("quota exceeded")))
+    assert failing.extract(TITLES) is None and failing.stats()["errors"] == 1
+
+
+def test_timeout_and_race_mode():
+    """A slow model misses the budget; in race mode its late answer is cached for next time."""
+    racing = KeywordExtractor(model=StubKeywordModel(delay=0.2), timeout=0.02)
+    start = time.perf_counter()
+    assert racing.extract(TITLES) is None
+    assert time.perf_counter() - start < 0.15
+    time.sleep(0.3)
+    assert racing.extract(TITLES) == ["bitcoin", "ethereum"]
+    assert racing.model.calls == 1 and racing.stats()["late_answers"] == 1
+
+    async def run():
+        strict = KeywordExtractor(model=StubKeywordModel(delay=0.2), timeout=0.02, race=False)
+        assert await strict.extract_async(TITLES) is None
+        await asyncio.sleep(0.3)
+        racing = KeywordExtractor(model=StubKeywordModel(delay=0.2), timeout=0.02)
+        assert await racing.extract_async(TITLES) is None
+        await asyncio.sleep(0.3)
+        return strict, racing, await racing.extract_async(TITLES)
+
+    strict, racing, late = asyncio.run(run())
+    print(f"  strict {strict.stats()}, racing {racing.stats()}")
+    assert strict.model.calls == 0, "the strict call is cancelled before it answers"
+    assert len(strict.cache) == 0 and strict.stats()["timeouts"] == 1
+    assert late == ["bitcoin", "ethereum"] and racing.model.calls == 1
+
+
+def test_recommenders_fall_back_to_heuristic():
+    """Gemini keywords are used when they arrive in time, heuristic keywords otherwise."""
+    fast = KeywordExtractor(model=StubKeywordModel('["bitcoin"]'))
+    result = SearchRecommender(
+        search_func=fake_search, debug=False, use_gemini=True, keyword_extractor=fast
+    ).get_recommendations(WATCHLIST, return_result=True)
+    assert result.keywords == ["bitcoin"] and result.recommendations
+
+    slow = KeywordExtractor(model=StubKeywordModel('["bitcoin"]', delay=1.0), timeout=0.05)
+    recommender = AsyncSearchRecommender(
+        search_func=fake_search_async, debug=False, use_gemini=True, keyword_extractor=slow
+    )
+    start = time.perf_counter()
+    result = asyncio.run(recommender.get_recommendations(WATCHLIST, return_result=True))
+    elapsed = time.perf_counter() - start
+    print(f"  slow Gemini: fell back to {result.keywords} in {elapsed * 1000:.0f}ms")
+    assert result.keywords == recommender._extract_keywords(TITLES, top_n=6)
+    assert elapsed < 0.5
+
+
+def test_keyword_cache_snapshot_round_trip():
+    """The keyword cache is saved with the snapshot and restored on load."""
+    extractor = KeywordExtractor(model=StubKeywordModel())
+    extractor.extract(TITLES)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snapshot.db")
+        written = save_snapshot(path, keyword_cache=extractor.cache)
+        restored = KeywordExtractor(model=StubKeywordModel())
+        loaded = load_snapshot(path, keyword_cache=restored.cache)
+
+    assert written["keyword_entries"] == 1 and loaded["keyword_entries"] == 1
+    assert restored.extract(TITLES) == ["bitcoin", "ethereum"] and restored.model.calls == 0
+
+
+if __name__ == "__main__":
+    test_cache_by_normalized_title_set()
+    test_timeout_and_race_mode()
+    test_recommenders_fall_back_to_heuristic()
+    test_keyword_cache_snapshot_round_trip()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
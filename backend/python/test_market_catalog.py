@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script for the MarketCatalog inverted index.
+Ingests the recorded dump in fixtures/gamma_events_sample.json, no network.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+
+import httpx
+
+from market_catalog import MarketCatalog
+from search_recommender import SearchRecommender, _parse_search_response
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "gamma_events_sample.json")
+
+
+def load_catalog():
+    catalog = MarketCatalog()
+    catalog.ingest_file(FIXTURE)
+    return catalog
+
+
+def test_ingest_and_search():
+    """Searches match title tokens and rank events by volume."""
+    print("\n" + "="*70)
+    print("TEST: catalog ingestion and search")
+    print("="*70)
+
+    catalog = load_catalog()
+    print(f"  {catalog.stats()}")
+    assert catalog.ready
+
+    results = catalog.search("bitcoin")
+    assert [r["id"] for r in results] == ["501001", "501010"]
+    assert all(r["query_matched"] == "bitcoin" for r in results)
+
+    # Multi-word queries need every token
+    assert [r["id"] for r in catalog.search("ethereum etf")] == ["501030"]
+    assert catalog.search("bitcoin nba") == []
+    assert catalog.search("dogecoin") == []
+
+    all_markets = catalog.search("bitcoin", dedupe_events=False)
+    assert {r["id"] for r in all_markets} == {"501001", "501002", "501003", "501010"}
+
+
+def test_same_shape_as_search_gamma_api():
+    """Catalog results are identical to what public-search parsing produces."""
+    catalog = load_catalog()
+    with open(FIXTURE) as f:
+        events = json.load(f)
+
+    nba_events = [e for e in events if e["id"] in ("16201", "16202")]
+    expected = _parse_search_response({"events": nba_events}, "nba")
+    assert sorted(catalog.search("nba"), key=lambda m: m["id"]) == sorted(expected, key=lambda m: m["id"])
+
+
+def test_search_is_fast():
+    """A catalog lookup should take microseconds, not a network round trip."""
+    catalog = load_catalog()
+    start = time.perf_counter()
+    for _ in range(1000):
+        catalog.search("bitcoin")
+    per_query_us = (time.perf_counter() - start) * 1000
+    print(f"  catalog.search: {per_query_us:.1f}us per query")
+    assert per_query_us < 1000
+
+
+def test_usable_as_search_func():
+    """MarketCatalog.search plugs into SearchRecommender."""
+    catalog = load_catalog()
+    recommender = SearchRecommender(search_func=catalog.search, debug=False)
+    watchlist = [{"id": "w1", "title": "Lakers win NBA Championship?", "volume": 1000}]
+    results = recommender.get_recommendations(watchlist, [], top_n=5)
+    assert results and all(r["id"].startswith("503") for r in results)
+
+
+def test_refresh_async_ingests_off_the_event_loop():
+    """refresh_async builds the index in a worker thread, not on the event loop."""
+    with open(FIXTURE) as f:
+        events = json.load(f)
+    events = events.get("events", []) if isinstance(events, dict) else events
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json=events))
+
+    catalog = MarketCatalog()
+    ingest = catalog.ingest
+    threads = []
+
+    def recording_ingest(*args, **kwargs):
+        threads.append(threading.get_ident())
+        return ingest(*args, **kwargs)
+
+    catalog.ingest = recording_ingest
+
+    async def refresh():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await catalog.refresh_async(client, page_size=len(events) + 1)
+
+    count = asyncio.run(refresh())
+    assert count == load_catalog().stats()["markets"] and catalog.ready
+    assert threads and threads[0] != threading.get_ident()
+
+
+if __name__ == "__main__":
+    test_ingest_and_search()
+    test_same_shape_as_search_gamma_api()
+    test_search_is_fast()
+    test_usable_as_search_func()
+    test_refresh_async_ingests_off_the_event_loop()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for the Prometheus metrics registry and /metrics endpoint.
+Uses canned search functions, so it runs offline.
+"""
+
+import asyncio
+import threading
+
+import httpx
+from starlette.middleware.base import BaseHTTPMiddleware
+
+import main
+import metrics
+from async_recommender import AsyncSearchRecommender
+from metrics import Counter, Histogram, Registry, timed_search
+from test_async_recommender import DISLIKED, WATCHLIST, fake_search_async
+
+
+def test_sharded_counter_across_threads():
+    """Per-thread shards add up exactly, including shards of exited threads."""
+    print("\n" + "="*70)
+    print("TEST: sharded counters and histograms")
+    print("="*70)
+
+    counter = Counter("test_total", "Test counter.", ("kind",))
+    histogram = Histogram("test_seconds", "Test histogram.", buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            counter.inc("a")
+            histogram.observe(0.5)
+
+    # More threads than MAX_LIVE_SHARDS, so dead shards get folded
+    for _ in range(3):
+        threads = [threading.Thread(target=work) for _ in range(30)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert counter.values() == {("a",): 90000.0}
+    counts, total = histogram.snapshot()[()]
+    assert counts == [0, 90000, 0] and abs(total - 45000) < 1e-6
+    assert len(counter._shards) <= metrics.MAX_LIVE_SHARDS
+
+
+def test_render_format_and_label_cap():
+    """Histogram buckets are cumulative, labels escaped, extra label sets folded."""
+    registry = Registry()
+    histogram = registry.histogram("lat_seconds", "Latency.", ("keyword",), buckets=(0.1, 1.0), max_label_sets=2)
+    histogram.observe(0.05, 'say "hi"')
+    histogram.observe(0.1, "b")
+    histogram.observe(5, "c")
+    histogram.observe(0.5, "d")
+
+    text = registry.render()
+    print(text)
+    assert "# TYPE lat_seconds histogram" in text
+    assert 'lat_seconds_bucket{keyword="say \\"hi\\"",le="0.1"} 1' in text
+    assert 'lat_seconds_bucket{keyword="b",le="0.1"} 1' in text
+    assert 'lat_seconds_bucket{keyword="__other__",le="1"} 1' in text
+    assert 'lat_seconds_bucket{keyword="__other__",le="+Inf"} 2' in text
+    assert 'lat_seconds_count{keyword="__other__"} 2' in text
+
+
+def test_timed_search_counts_errors():
+    """Upstream latency and raised errors are recorded per keyword."""
+    def failing(query):
+        raise RuntimeError("boom")
+
+    search = timed_search(failing)
+    try:
+        search("metrics-test-keyword")
+    except RuntimeError:
+        pass
+    assert metrics.UPSTREAM_ERRORS.values()[("metrics-test-keyword", "RuntimeError")] == 1
+    counts, _ = metrics.UPSTREAM_LATENCY.snapshot()[("metrics-test-keyword",)]
+    assert sum(counts) == 1
+    assert metrics.SEARCHES_IN_FLIGHT.values().get((), 0) == 0
+
+
+def test_metrics_endpoint():
+    """/metrics exposes endpoint, stage, pool and cache series."""
+    original = main.recommender
+    main.recommender = AsyncSearchRecommender(search_func=fake_search_async, debug=False)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/api/recommendations", json={"watchlist": WATCHLIST, "disliked_items": DISLIKED})
+            await client.post("/api/recommendations", json={"watchlist": []})
+            await client.get("/no-such-route")
+            return await client.get("/metrics")
+
+    try:
+        response = asyncio.run(run())
+    finally:
+        main.recommender = original
+
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    for needle in (
+        'polyflix_http_request_duration_seconds_count{route="/api/recommendations",method="POST",status="200"}',
+        'polyflix_recommendation_stage_duration_seconds_count{stage="search"}',
+        "polyflix_candidate_pool_size_count",
+        'polyflix_upstream_search_duration_seconds_count{keyword="bitcoin"}',
+        "polyflix_search_cache_hit_ratio",
+        "polyflix_singleflight_coalesced_ratio",
+        "polyflix_cache_refresh_queue_depth 0",
+        'polyflix_http_request_duration_seconds_count{route="/api/recommendations",method="POST",status="400"}',
+        'polyflix_http_request_duration_seconds_count{route="unmatched",method="GET",status="404"}',
+    ):
+        assert needle in text, needle
+
+    # Timing and tracing share one pure ASGI layer, no BaseHTTPMiddleware
+    assert not any(m.cls is BaseHTTPMiddleware for m in main.app.user_middleware)
+
+
+if __name__ == "__main__":
+    test_sharded_counter_across_threads()
+    test_render_format_and_label_cap()
+    test_timed_search_counts_errors()
+    test_metrics_endpoint()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
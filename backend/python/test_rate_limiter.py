@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test script for the Gamma rate governor (token bucket, AIMD concurrency,
+priorities and 429 retries). Uses a fake clock and the in-process fake
+Gamma server, so it runs offline.
+"""
+
+import asyncio
+
+import httpx
+
+from fake_gamma import DEFAULT_FIXTURE, FaultConfig, create_app, load_events
+from rate_limiter import SEARCH_PRIORITY, AdaptiveConcurrency, RateGovernor, TokenBucket, UpstreamThrottled
+import search_recommender
+from search_recommender import search_gamma_api_async
+from testing_utils import FakeClock
+
+
+def test_token_bucket():
+    """Burst is served immediately, then tokens arrive at `rate`."""
+    print("\n" + "="*70)
+    print("TEST: token bucket and AIMD limit")
+    print("="*70)
+
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, burst=2, clock=clock)
+    assert bucket.reserve() == 0.0 and bucket.reserve() == 0.0
+    assert abs(bucket.reserve() - 0.1) < 1e-9
+    clock.now += 0.05
+    assert abs(bucket.reserve() - 0.05) < 1e-9
+    clock.now += 0.06
+    assert bucket.reserve() == 0.0
+
+
+def test_adaptive_concurrency():
+    """Additive increase on fast calls; one multiplicative decrease per cooldown."""
+    clock = FakeClock()
+    limit = AdaptiveConcurrency(initial=4, max_limit=8, cooldown=1.0, clock=clock)
+    for _ in range(5):
+        limit.on_success(0.05)
+    assert limit.limit == 5
+
+    limit.on_throttle()
+    limit.on_throttle()  # same overload event: ignored
+    assert limit.limit == 2
+    clock.now += 1.5
+    limit.on_success(0.5)  # 10x the 50ms baseline
+    print(f"  limit after throttle and slow call: {limit.limit}, target {limit.target():.3f}s")
+    assert limit.limit == 2 and limit._limit < 2.5
+
+    for _ in range(200):
+        limit.on_success(0.05)
+    assert limit.limit == 8
+
+
+def test_priority_order():
+    """Queued calls are admitted lowest priority number first, not by arrival."""
+    governor = RateGovernor(concurrency=AdaptiveConcurrency(initial=1, max_limit=1))
+    order = []
+
+    async def call(priority):
+        await governor.acquire_async(priority)
+        order.append(priority)
+        governor.release(0.01)
+
+    async def run():
+        await governor.acquire_async(0)
+        tasks = [asyncio.create_task(call(p)) for p in (7, 2, 5, 1)]
+        await asyncio.sleep(0.01)
+        assert governor.stats()["queued"] == 4
+        governor.release(0.01)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    print(f"  admission order: {order}")
+    assert order == [1, 2, 5, 7]
+
+
+def test_fanout_sets_priority():
+    """The recommender fan-out tags each search with its keyword position."""
+    from search_recommender import SearchRecommender
+
+    seen = {}
+
+    def search(query):
+        seen[query] = SEARCH_PRIORITY.get()
+        return []
+
+    recommender = SearchRecommender(search_func=search, debug=False)
+    recommender._scattershot_search(["first", "second", "third"])
+    assert seen == {"first": 0, "second": 1, "third": 2}
+    assert SEARCH_PRIORITY.get() == 0
+
+
+def test_throttled_calls_retry_against_fake_gamma():
+    """429s from an overloaded upstream shrink the limit and are retried, not dropped."""
+    events = load_events(DEFAULT_FIXTURE)
+    app = create_app(events, FaultConfig(latency_ms=20, max_in_flight=3, retry_after=0.05))
+    governor = RateGovernor(
+        concurrency=AdaptiveConcurrency(initial=12, max_limit=12, cooldown=0.01),
+        max_retries=6,
+    )
+    original = search_recommender.GAMMA_API_URL
+    search_recommender.GAMMA_API_URL = "http://fake/public-search"
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://fake") as client:
+            async def raw(query, dedupe_events=True):
+                return await search_gamma_api_async(query, dedupe_events, client=client)
+
+            search = governor.wrap(raw)
+            results = await asyncio.gather(*(search("bitcoin") for _ in range(12)))
+
+            # Without retries left, the 429 reaches the caller instead of an empty list
+            await client.put("/_faults", json={"throttle_rate": 1.0})
+            strict = RateGovernor(max_retries=0, default_retry_after=0)
+            try:
+                await strict.wrap(raw)("bitcoin")
+                raised = False
+            except UpstreamThrottled:
+                raised = True
+            return results, raised, app.state.gamma.counts
+
+    try:
+        results, raised, counts = asyncio.run(run())
+    finally:
+        search_recommender.GAMMA_API_URL = original
+
+    stats = governor.stats()
+    print(f"  governor {stats}, fake {counts}")
+    assert all(len(r) == 2 for r in results)
+    assert counts["ok"] == 12
+    assert stats["throttled"] > 0 and stats["retries"] == stats["throttled"]
+    assert stats["limit"] < 12 and stats["in_flight"] == 0 and stats["queued"] == 0
+    assert raised
+
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_adaptive_concurrency()
+    test_priority_order()
+    test_fanout_sets_priority()
+    test_throttled_calls_retry_against_fake_gamma()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test script for incremental recommendation sessions.
+Checks that session updates only search new keywords and rank exactly like a
+fresh get_recommendations call, using a canned search function so it runs
+offline.
+"""
+
+import asyncio
+import json
+
+import httpx
+
+from keyword_extractor import KeywordExtractor, StubKeywordModel
+from search_recommender import RecommendationSession, SearchRecommender
+from async_recommender import AsyncSearchRecommender
+from test_async_recommender import DISLIKED, WATCHLIST, fake_search, fake_search_async
+
+SOLANA = {"id": "w3", "title": "Solana ETF approved in 2025?", "volume": 1000000}
+
+
+def ranking(recommendations):
+    return [(r["id"], r["penalized"], round(r["score"], 9)) for r in recommendations]
+
+
+def test_session_updates_match_fresh_recommendations():
+    """Add, remove and dislike each match a from-scratch run, searching only new keywords."""
+    print("\n" + "="*70)
+    print("TEST: incremental recommendation sessions")
+    print("="*70)
+
+    calls = []
+
+    def counting_search(query):
+        calls.append(query)
+        return fake_search(query)
+
+    recommender = SearchRecommender(search_func=counting_search, debug=False)
+    fresh = SearchRecommender(search_func=fake_search, debug=False)
+    session = RecommendationSession()
+
+    result = recommender.update_session(session, add=WATCHLIST[:1])
+    assert sorted(calls) == sorted(result.keywords)
+    assert ranking(result.recommendations) == ranking(fresh.get_recommendations(WATCHLIST[:1]))
+
+    # Adding a market searches only the keywords it introduces
+    calls.clear()
+    previous = set(result.keywords)
+    result = recommender.update_session(session, add=[WATCHLIST[1], SOLANA])
+    print(f"  add searched {calls} for keywords {result.keywords}")
+    assert calls and set(calls) == set(result.keywords) - previous
+    expected = fresh.get_recommendations(WATCHLIST + [SOLANA], return_result=True)
+    assert result.keywords == expected.keywords and result.total_candidates == expected.total_candidates
+    assert ranking(result.recommendations) == ranking(expected.recommendations)
+
+    # Removing a market drops its keywords and their candidates without searching
+    calls.clear()
+    result = recommender.update_session(session, remove=["w2"])
+    expected = fresh.get_recommendations([WATCHLIST[0], SOLANA], return_result=True)
+    assert calls == []
+    assert set(session.results_by_keyword) == set(result.keywords) == set(expected.keywords)
+    assert "e1" not in session.candidates
+    assert ranking(result.recommendations) == ranking(expected.recommendations)
+
+    # A dislike re-penalizes the existing pool with no network I/O
+    result = recommender.update_session(session, dislike=DISLIKED)
+    expected = fresh.get_recommendations([WATCHLIST[0], SOLANA], DISLIKED)
+    assert calls == []
+    assert any(r["penalized"] for r in result.recommendations)
+    assert ranking(result.recommendations) == ranking(expected)
+
+
+def test_failed_keywords_are_retried():
+    """A keyword whose search failed is missing now and searched again on the next update."""
+    attempts = []
+
+    def flaky(query):
+        attempts.append(query)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream down")
+        return fake_search(query)
+
+    recommender = SearchRecommender(search_func=flaky, debug=False)
+    session = RecommendationSession()
+    first = recommender.update_session(session, add=WATCHLIST[:1])
+    assert first.missing_keywords == first.keywords[:1]
+
+    second = recommender.update_session(session, dislike=DISLIKED)
+    assert second.missing_keywords == [] and attempts.count(first.keywords[0]) == 2
+
+
+def title_keywords(prompt):
+    """Stub Gemini reply: the first word of each watchlist title in the prompt."""
+    titles = prompt.split("watchlist:\n", 1)[1].split("\n\n", 1)[0].splitlines()
+    return json.dumps([line[2:].split()[0].lower() for line in titles])
+
+
+def test_concurrent_updates_of_one_session():
+    """Overlapping updates with a slow keyword extraction both end up in the session's keywords."""
+    extractor = KeywordExtractor(model=StubKeywordModel(title_keywords, delay=0.05), timeout=1.0)
+    recommender = AsyncSearchRecommender(
+        search_func=fake_search_async, debug=False, use_gemini=True, keyword_extractor=extractor
+    )
+    session = RecommendationSession()
+
+    async def run():
+        await recommender.update_session(session, add=WATCHLIST[:1])
+        return await asyncio.gather(
+            recommender.update_session(session, add=[WATCHLIST[1]]),
+            recommender.update_session(session, add=[SOLANA], dislike=DISLIKED),
+        )
+
+    results = asyncio.run(run())
+    print(f"  session keywords after concurrent updates: {session.keywords}")
+    assert list(session.watchlist) == ["w1", "w2", "w3"] and list(session.disliked_items) == ["d1"]
+    assert session.keywords == ["will", "ethereum", "solana"]
+    assert results[1].keywords == session.keywords
+    assert not recommender._session_locks, "locks are dropped once no update holds them"
+
+
+def test_session_keywords_use_async_extraction():
+    """Session updates await Gemini within its timeout instead of blocking a worker thread."""
+    slow = KeywordExtractor(model=StubKeywordModel('["bitcoin"]', delay=1.0), timeout=0.05)
+    recommender = AsyncSearchRecommender(
+        search_func=fake_search_async, debug=False, use_gemini=True, keyword_extractor=slow
+    )
+    recommender._get_positive_keywords = None  # the sync path must not be used
+
+    async def run():
+        session = RecommendationSession()
+        start = asyncio.get_running_loop().time()
+        result = await recommender.update_session(session, add=WATCHLIST)
+        return result, asyncio.get_running_loop().time() - start
+
+    result, elapsed = asyncio.run(run())
+    print(f"  slow Gemini in a session update: fell back to {result.keywords} in {elapsed * 1000:.0f}ms")
+    assert elapsed < 0.5 and slow.stats()["timeouts"] == 1
+    assert result.keywords == recommender._extract_keywords([m["title"] for m in WATCHLIST], top_n=6)
+
+
+def test_session_endpoints():
+    """Create, update, expire-to-404 and delete over the API, on the async recommender."""
+    import main
+
+    calls = []
+
+    async def counting_search(query):
+        calls.append(query)
+        return await fake_search_async(query)
+
+    original = main.recommender
+    main.recommender = AsyncSearchRecommender(search_func=counting_search, debug=False)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            created = (await client.post("/api/sessions", json={"watchlist": WATCHLIST[:1]})).json()
+            searched = len(calls)
+            updated = await client.post(f"/api/sessions/{created['session_id']}", json={"dislike": DISLIKED})
+            assert len(calls) == searched
+            added = await client.post(f"/api/sessions/{created['session_id']}", json={"add": [WATCHLIST[1]]})
+            deleted = await client.delete(f"/api/sessions/{created['session_id']}")
+            gone = await client.post(f"/api/sessions/{created['session_id']}", json={"remove": ["w1"]})
+            return created, updated.json(), added.json(), deleted, gone
+
+    try:
+        created, updated, added, deleted, gone = asyncio.run(run())
+    finally:
+        main.recommender = original
+
+    assert created["watchlist_size"] == 1 and created["recommendations"]
+    assert updated["negative_keywords"] and updated["session_id"] == created["session_id"]
+    assert added["watchlist_size"] == 2 and len(added["keywords_used"]) > len(created["keywords_used"])
+    assert deleted.status_code == 200 and gone.status_code == 404
+
+
+if __name__ == "__main__":
+    test_session_updates_match_fresh_recommendations()
+    test_failed_keywords_are_retried()
+    test_concurrent_updates_of_one_session()
+    test_session_keywords_use_async_extraction()
+    test_session_endpoints()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script for TF-IDF relevance scoring.
+Checks the sparse and pure-Python paths agree, that catalog IDF is used once
+the catalog is loaded, and that relevance reaches the final ranking.
+"""
+
+import math
+import random
+import time
+
+import relevance
+from market_catalog import MarketCatalog
+from relevance import RelevanceScorer, relevance_terms
+from search_recommender import SearchRecommender
+
+WATCHLIST_TITLES = ["Will Bitcoin reach $150,000 in 2025?", "Ethereum ETF approval by SEC?"]
+WORDS = ["bitcoin", "ethereum", "solana", "election", "senate", "lakers", "finals", "rate", "cut", "approval", "etf"]
+
+
+def test_on_topic_candidates_score_higher():
+    """Shared rare terms give high similarity; incidental matches score near zero."""
+    print("\n" + "="*70)
+    print("TEST: TF-IDF relevance")
+    print("="*70)
+
+    candidates = [
+        {"id": "b1", "title": "Bitcoin above $150k in 2025?"},
+        {"id": "e1", "title": "Ethereum ETF inflows by June?"},
+        {"id": "s1", "title": "Super Bowl champion crypto sponsor?"},
+        {"id": "x1", "title": "2025?"},
+    ]
+    scores = RelevanceScorer().score(WATCHLIST_TITLES, candidates)
+    print(f"  {dict(zip([c['id'] for c in candidates], [round(s, 3) for s in scores]))}")
+    assert scores[0] > scores[2] and scores[1] > scores[2]
+    assert scores[2] == 0.0 and scores[3] == 0.0
+    assert all(0.0 <= s <= 1.0 for s in scores)
+
+    assert relevance_terms("Will the Lakers win 2025 NBA Finals?") == ("lakers", "nba", "finals")
+    assert RelevanceScorer().score(["2025?"], candidates) == [1.0] * len(candidates)
+    assert RelevanceScorer().score(WATCHLIST_TITLES, []) == []
+
+
+def test_sparse_matches_pure_python():
+    """The SciPy CSR path and the dict-vector fallback give the same similarities."""
+    rng = random.Random(3)
+    titles = [" ".join(rng.choices(WORDS, k=rng.randint(0, 6))) for _ in range(300)]
+    candidates = [{"id": str(i), "title": t} for i, t in enumerate(titles)]
+    reference = [" ".join(rng.choices(WORDS, k=4)) for _ in range(5)]
+
+    if not relevance.SCIPY_AVAILABLE:
+        print("  scipy not installed, only the pure-Python path is in use")
+        return
+    start = time.perf_counter()
+    sparse_scores = RelevanceScorer().score(reference, candidates)
+    sparse_ms = (time.perf_counter() - start) * 1000
+
+    relevance.SCIPY_AVAILABLE = False
+    try:
+        start = time.perf_counter()
+        dict_scores = RelevanceScorer().score(reference, candidates)
+        dict_ms = (time.perf_counter() - start) * 1000
+    finally:
+        relevance.SCIPY_AVAILABLE = True
+
+    print(f"  300 candidates: sparse {sparse_ms:.2f}ms, dicts {dict_ms:.2f}ms")
+    assert all(math.isclose(a, b, abs_tol=1e-12) for a, b in zip(sparse_scores, dict_scores))
+
+
+def test_catalog_idf():
+    """With a loaded catalog, a rare shared term outweighs a common one."""
+    catalog = MarketCatalog()
+    catalog.ingest(
+        [{"id": f"b{i}", "title": f"Bitcoin market {i}"} for i in range(50)]
+        + [{"id": "s1", "title": "Solana staking yield"}]
+    )
+    assert catalog.document_count == 51
+    assert catalog.document_frequency("bitcoin") == 50 and catalog.document_frequency("dogecoin") == 0
+
+    reference = ["Bitcoin and Solana weekly outlook"]
+    candidates = [{"id": "a", "title": "Bitcoin weekly close"}, {"id": "b", "title": "Solana weekly close"}]
+    pool_scores = RelevanceScorer().score(reference, candidates)
+    catalog_scores = RelevanceScorer(catalog).score(reference, candidates)
+    print(f"  pool IDF {pool_scores}, catalog IDF {catalog_scores}")
+    assert math.isclose(pool_scores[0], pool_scores[1])
+    assert catalog_scores[1] > catalog_scores[0]
+
+    assert RelevanceScorer(MarketCatalog()).score(reference, candidates) == pool_scores
+
+
+def test_relevance_reaches_ranking():
+    """score_batch uses the relevance scores; the relevant market outranks an equal-volume off-topic one."""
+    recommender = SearchRecommender(debug=False)
+    markets = [
+        {"id": "off", "title": "Super Bowl halftime crypto ad?", "volume": 1000, "query_matched": "bitcoin"},
+        {"id": "on", "title": "Bitcoin above $150k by December?", "volume": 1000, "query_matched": "bitcoin"},
+    ]
+    batch = recommender.score_batch(markets, set(), relevance=[0.2, 0.9])
+    scalar = [
+        recommender._calculate_score(m, set(), math.log(1001), relevance_score=r)
+        for m, r in zip(markets, [0.2, 0.9])
+    ]
+    for b, s in zip(batch, scalar):
+        assert math.isclose(b["final_score"], s["final_score"], rel_tol=1e-9)
+        assert b["relevance_score"] == s["relevance_score"]
+
+    ranked = recommender._rank_candidates(
+        {m["id"]: m for m in markets}, [{"id": "w1", "title": WATCHLIST_TITLES[0]}], ["bitcoin"], set(), 2
+    )
+    assert [r["id"] for r in ranked] == ["on", "off"]
+    assert ranked[0]["relevance_score"] > ranked[1]["relevance_score"]
+
+
+if __name__ == "__main__":
+    test_on_topic_candidates_score_higher()
+    test_sparse_matches_pure_python()
+    test_catalog_idf()
+    test_relevance_reaches_ranking()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
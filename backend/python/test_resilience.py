@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test script for hedged requests, jittered retries and the circuit breaker.
+Uses canned search functions and the in-process fake Gamma server, so it
+runs offline.
+"""
+
+import asyncio
+import time
+
+import httpx
+
+import search_recommender
+from fake_gamma import DEFAULT_FIXTURE, FaultConfig, create_app, load_events
+from resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, Resilience
+from search_recommender import search_gamma_api_async
+from testing_utils import FakeClock
+
+
+def warmed(**kwargs) -> Resilience:
+    """A Resilience whose latency window already holds 20 fast calls."""
+    resilience = Resilience(backoff_base=0.001, **kwargs)
+    for _ in range(20):
+        resilience.latencies.add(0.01)
+    return resilience
+
+
+def test_breaker_transitions():
+    """closed -> open after the threshold, one half-open probe, then closed or reopened."""
+    print("\n" + "="*70)
+    print("TEST: circuit breaker, hedging and retries")
+    print("="*70)
+
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    clock.now += 10
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow(), "only one probe at a time"
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.opens == 2
+
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_async_hedge_beats_slow_primary():
+    """A call slower than the p95 gets a duplicate; the faster one wins and the loser is cancelled."""
+    resilience = warmed()
+    calls = []
+    cancelled = []
+
+    async def search(query):
+        calls.append(query)
+        delay = 1.0 if len(calls) == 1 else 0.01
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(len(calls))
+            raise
+        return [{"id": str(len(calls))}]
+
+    start = time.perf_counter()
+    result = asyncio.run(resilience.wrap(search)("bitcoin"))
+    elapsed = time.perf_counter() - start
+    stats = resilience.stats()
+    print(f"  hedged result {result} in {elapsed * 1000:.0f}ms, {stats}")
+    assert result == [{"id": "2"}] and elapsed < 0.5
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1 and stats["hedge_win_ratio"] == 1.0
+    assert cancelled == [2]
+
+
+def test_sync_hedge_and_no_hedge_while_cold():
+    """Sync hedging uses the hedge pool; no hedges before enough latencies are seen."""
+    calls = []
+
+    def search(query):
+        calls.append(query)
+        time.sleep(0.5 if len(calls) == 1 else 0.01)
+        return [{"id": str(len(calls))}]
+
+    cold = Resilience()
+    assert cold.hedge_delay() is None
+
+    resilience = warmed()
+    start = time.perf_counter()
+    assert resilience.wrap(search)("nba") == [{"id": "2"}]
+    assert time.perf_counter() - start < 0.4
+    assert resilience.hedges == 1 and resilience.hedge_wins == 1
+
+
+def test_retries_transient_errors_only():
+    """Transport errors and 5xx are retried with backoff; other errors are not."""
+    attempts = []
+
+    async def flaky(query):
+        attempts.append(query)
+        if len(attempts) < 3:
+            raise httpx.ConnectError("connection refused")
+        return [{"id": "1"}]
+
+    resilience = Resilience(retries=2, backoff_base=0.001, hedge=False)
+    assert asyncio.run(resilience.wrap(flaky)("fed")) == [{"id": "1"}]
+    assert resilience.retried == 2 and resilience.breaker.state == CLOSED
+
+    def broken(query):
+        attempts.append(query)
+        raise ValueError("bad payload")
+
+    attempts.clear()
+    try:
+        Resilience(retries=2, hedge=False).wrap(broken)("fed")
+    except ValueError:
+        pass
+    assert attempts == ["fed"]
+
+
+def test_breaker_fails_fast_against_fake_gamma():
+    """Repeated 503s from the upstream open the breaker, which then rejects without calling it."""
+    app = create_app(load_events(DEFAULT_FIXTURE), FaultConfig(error_rate=1.0, error_status=503))
+    resilience = Resilience(
+        breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60), retries=1, backoff_base=0.001, hedge=False
+    )
+    original = search_recommender.GAMMA_API_URL
+    search_recommender.GAMMA_API_URL = "http://fake/public-search"
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://fake") as client:
+            async def raw(query, dedupe_events=True):
+                return await search_gamma_api_async(query, dedupe_events, client=client, raise_errors=True)
+
+            search = resilience.wrap(raw)
+            errors = []
+            for _ in range(4):
+                try:
+                    await search("bitcoin")
+                except Exception as e:
+                    errors.append(type(e).__name__)
+            return errors
+
+    try:
+        errors = asyncio.run(run())
+    finally:
+        search_recommender.GAMMA_API_URL = original
+
+    stats = resilience.stats()
+    print(f"  errors {errors}, upstream requests {app.state.gamma.counts['requests']}, {stats}")
+    assert errors == ["HTTPStatusError", "HTTPStatusError", "CircuitOpen", "CircuitOpen"]
+    assert app.state.gamma.counts["requests"] == 3
+    assert stats["breaker_state"] == OPEN and stats["breaker_state_code"] == 2 and stats["breaker_opens"] == 1
+
+
+if __name__ == "__main__":
+    test_breaker_transitions()
+    test_async_hedge_beats_slow_primary()
+    test_sync_hedge_and_no_hedge_while_cold()
+    test_retries_transient_errors_only()
+    test_breaker_fails_fast_against_fake_gamma()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-user recommendation response cache (fingerprints,
+ETags and 304s). Runs the API in-process against canned search results.
+"""
+
+import asyncio
+
+import httpx
+
+import main
+from async_recommender import AsyncSearchRecommender
+from cache import TTLCache
+from result_cache import ResultCache, etag_matches, request_fingerprint, response_etag
+from test_async_recommender import DISLIKED, WATCHLIST, fake_search_async
+
+
+def test_fingerprint_and_etag_matching():
+    """Reordering or reformatting titles keeps the fingerprint; new dislikes change it."""
+    print("\n" + "="*70)
+    print("TEST: recommendation result cache")
+    print("="*70)
+
+    base = request_fingerprint(WATCHLIST, DISLIKED)
+    reordered = [dict(WATCHLIST[1], title="  ethereum ETF   approval by SEC? "), WATCHLIST[0]]
+    assert request_fingerprint(reordered, DISLIKED) == base
+    assert request_fingerprint(WATCHLIST, DISLIKED + [{"id": "d2"}]) != base
+    assert request_fingerprint(WATCHLIST, DISLIKED, top_n=5) != base
+
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"def"', '"abc"') and not etag_matches(None, '"abc"')
+
+    recommendations = [{"id": "m1", "title": "Bitcoin above $150k?", "score": 0.9}]
+    etag = response_etag(recommendations, ["bitcoin"], [])
+    assert etag == response_etag([dict(reversed(recommendations[0].items()))], ["bitcoin"], [])
+    assert etag != response_etag(recommendations, ["bitcoin", "crypto"], [])
+    assert etag != response_etag(recommendations[::-1] + [{"id": "m2"}], ["bitcoin"], [])
+
+
+def test_endpoint_hit_miss_and_304():
+    """A repeat request is served from the cache; If-None-Match gets a bodyless 304."""
+    calls = []
+
+    async def counting_search(query):
+        calls.append(query)
+        return await fake_search_async(query)
+
+    original = (main.recommender, main.result_cache)
+    main.recommender = AsyncSearchRecommender(search_func=counting_search, debug=False)
+    main.result_cache = ResultCache()
+    body = {"watchlist": WATCHLIST, "disliked_items": DISLIKED}
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.post("/api/recommendations", json=body)
+            searched = len(calls)
+            second = await client.post("/api/recommendations", json=body)
+            assert len(calls) == searched, "cache hit must not search again"
+            revalidated = await client.post(
+                "/api/recommendations", json=body, headers={"If-None-Match": first.headers["etag"]}
+            )
+            changed = await client.post(
+                "/api/recommendations", json={"watchlist": WATCHLIST, "disliked_items": []}
+            )
+            traced = await client.post("/api/recommendations", json=body, headers={"X-Polyflix-Trace": "debug"})
+            return first, second, revalidated, changed, traced
+
+    try:
+        first, second, revalidated, changed, traced = asyncio.run(run())
+        stats = main.result_cache.stats()
+    finally:
+        main.recommender, main.result_cache = original
+
+    print(f"  cache stats: {stats}")
+    assert first.status_code == 200 and first.headers["x-polyflix-cache"] == "miss"
+    assert second.headers["x-polyflix-cache"] == "hit" and second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    assert second.json()["recommendations"] == first.json()["recommendations"]
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert changed.headers["x-polyflix-cache"] == "miss"
+    assert traced.headers["x-polyflix-cache"] == "bypass" and traced.json()["trace"]
+    assert stats["hits"] == 2 and stats["not_modified"] == 1 and stats["entries"] == 2
+
+
+def test_etag_survives_recompute():
+    """
+    After the entry expires, recomputing the same recommendations keeps the
+    ETag (timings differ), and If-None-Match still gets a 304 on the miss path.
+    """
+    original = (main.recommender, main.result_cache)
+    main.recommender = AsyncSearchRecommender(search_func=fake_search_async, debug=False)
+    main.result_cache = ResultCache()
+    body = {"watchlist": WATCHLIST, "disliked_items": DISLIKED}
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.post("/api/recommendations", json=body)
+            main.result_cache.cache.invalidate(request_fingerprint(WATCHLIST, DISLIKED))
+            recomputed = await client.post("/api/recommendations", json=body)
+            main.result_cache.cache.invalidate(request_fingerprint(WATCHLIST, DISLIKED))
+            revalidated = await client.post(
+                "/api/recommendations", json=body, headers={"If-None-Match": first.headers["etag"]}
+            )
+            return first, recomputed, revalidated
+
+    try:
+        first, recomputed, revalidated = asyncio.run(run())
+    finally:
+        main.recommender, main.result_cache = original
+
+    assert recomputed.headers["x-polyflix-cache"] == "miss"
+    assert recomputed.headers["etag"] == first.headers["etag"]
+    assert revalidated.status_code == 304 and revalidated.headers["x-polyflix-cache"] == "miss"
+    assert revalidated.headers["etag"] == first.headers["etag"]
+
+
+def test_partial_results_and_disabled_cache_are_not_stored():
+    """Responses missing keywords aren't cached, and TTL 0 turns caching off."""
+    cache = ResultCache(TTLCache(ttl=0, stale_ttl=0))
+    entry = cache.put("key", b"{}", response_etag([], [], []))
+    assert entry.etag.startswith('"') and cache.get("key") is None and not cache.enabled
+
+    async def slow_search(query):
+        await asyncio.sleep(0.5 if "ethereum" in query.lower() else 0)
+        return await fake_search_async(query)
+
+    original = (main.recommender, main.result_cache)
+    main.recommender = AsyncSearchRecommender(search_func=slow_search, debug=False)
+    main.result_cache = ResultCache()
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/api/recommendations", json={"watchlist": WATCHLIST, "deadline_ms": 100}
+            )
+
+    try:
+        response = asyncio.run(run())
+        entries = len(main.result_cache.cache)
+    finally:
+        main.recommender, main.result_cache = original
+
+    assert response.json()["missing_keywords"]
+    assert response.headers["x-polyflix-cache"] == "bypass" and "etag" not in response.headers
+    assert entries == 0
+
+
+if __name__ == "__main__":
+    test_fingerprint_and_etag_matching()
+    test_endpoint_hit_miss_and_304()
+    test_etag_survives_recompute()
+    test_partial_results_and_disabled_cache_are_not_stored()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
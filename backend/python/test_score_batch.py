@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test script for the vectorized score_batch path.
+Checks it against the per-market _calculate_score on tricky and random inputs.
+"""
+
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import search_recommender
+from search_recommender import SearchRecommender, _normalize_event, _to_epoch, public_market
+
+NOW = datetime.now(timezone.utc)
+
+
+def iso(delta_days):
+    return (NOW + timedelta(days=delta_days)).isoformat().replace("+00:00", "Z")
+
+
+EDGE_CASES = [
+    {"id": "1", "title": "Bitcoin above $150k?", "volume": 5000000, "created_at": iso(-3), "end_date": iso(10)},
+    {"id": "2", "title": "Lakers win NBA Finals?", "volume": 0, "created_at": None, "end_date": None},
+    {"id": "3", "title": "Ended market", "volume": 12, "created_at": iso(-400), "end_date": iso(-2)},
+    {"id": "4", "title": "Naive dates are ignored", "volume": 99, "created_at": "2025-01-01T00:00:00", "end_date": "garbage"},
+    {"id": "5", "title": "Far future, NBA related", "volume": 1, "created_at": iso(2), "end_date": iso(400)},
+    {"id": "6", "title": "Offset timestamp", "volume": 77777, "created_at": "2025-06-01T10:00:00+02:00", "end_date": iso(30)},
+]
+
+SCORE_KEYS = ("final_score", "volume_score", "novelty_score", "relevance_score")
+
+
+def assert_same(batch, scalar):
+    for b, s in zip(batch, scalar):
+        for key in SCORE_KEYS:
+            assert math.isclose(b[key], s[key], rel_tol=1e-12, abs_tol=1e-15), (key, b, s)
+        assert b["penalized"] == s["penalized"]
+        assert sorted(b["matching_negative"]) == sorted(s["matching_negative"])
+
+
+def scalar_scores(recommender, markets, negatives):
+    max_log_volume = max(math.log(m["volume"] + 1) for m in markets)
+    return [recommender._calculate_score(m, negatives, max_log_volume) for m in markets]
+
+
+def test_edge_cases_match_scalar():
+    """Missing, naive, past and future dates score the same as the scalar path."""
+    print("\n" + "="*70)
+    print("TEST: score_batch matches _calculate_score")
+    print("="*70)
+
+    recommender = SearchRecommender(debug=False)
+    negatives = {"nba", "lakers"}
+    batch = recommender.score_batch(EDGE_CASES, negatives)
+    assert_same(batch, scalar_scores(recommender, EDGE_CASES, negatives))
+    assert [r["penalized"] for r in batch] == [False, True, False, False, True, False]
+    for market, result in zip(EDGE_CASES, batch):
+        print(f"  {result['final_score']:.4f}  {market['title']}")
+
+
+def test_random_pool_and_speed():
+    """A few thousand random candidates agree with the scalar path."""
+    rng = random.Random(7)
+    words = ["bitcoin", "trump", "nba", "senate", "fed", "oscar", "ai", "china"]
+    markets = [
+        {
+            "id": str(i),
+            "title": " ".join(rng.sample(words, 3)) + "?",
+            "volume": rng.randint(0, 50_000_000),
+            "created_at": iso(-rng.uniform(0, 200)) if rng.random() > 0.1 else None,
+            "end_date": iso(rng.uniform(-10, 120)) if rng.random() > 0.1 else None,
+        }
+        for i in range(5000)
+    ]
+    # Pre-parse dates the way ingestion does
+    for m in markets:
+        m["_created_ts"] = _to_epoch(m["created_at"])
+        m["_end_ts"] = _to_epoch(m["end_date"])
+    recommender = SearchRecommender(debug=False)
+
+    start = time.perf_counter()
+    scalar = scalar_scores(recommender, markets, {"nba"})
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = recommender.score_batch(markets, {"nba"})
+    batch_time = time.perf_counter() - start
+
+    print(f"  5000 candidates: scalar {scalar_time * 1000:.1f}ms, batch {batch_time * 1000:.1f}ms")
+    assert_same(batch, scalar)
+
+
+def test_timestamps_parsed_once():
+    """Normalized records carry epoch fields that public_market strips again."""
+    event = {"id": "e1", "title": "Fed decision", "createdAt": "2026-01-01T00:00:00Z",
+             "markets": [{"id": "m1", "question": "Fed cuts?", "volume": "10", "endDate": "2026-12-10T00:00:00Z"}]}
+    market = _normalize_event(event, "fed")[0]
+    assert market["_created_ts"] == 1767225600
+    assert market["_end_ts"] == 1796860800
+
+    public = public_market(market)
+    assert "_created_ts" not in public and public["created_at"] == "2026-01-01T00:00:00Z"
+
+    # Scoring from the parsed fields matches scoring from the ISO strings
+    recommender = SearchRecommender(debug=False)
+    now = int(time.time())
+    assert recommender._calculate_novelty_score(market, now) == recommender._calculate_novelty_score(public, now)
+
+
+def test_fallback_without_numpy():
+    """Without NumPy, score_batch falls back to the scalar loop."""
+    recommender = SearchRecommender(debug=False)
+    original = search_recommender.NUMPY_AVAILABLE
+    search_recommender.NUMPY_AVAILABLE = False
+    try:
+        batch = recommender.score_batch(EDGE_CASES, {"nba"})
+    finally:
+        search_recommender.NUMPY_AVAILABLE = original
+    assert_same(batch, scalar_scores(recommender, EDGE_CASES, {"nba"}))
+
+
+if __name__ == "__main__":
+    test_edge_cases_match_scalar()
+    test_random_pool_and_speed()
+    test_timestamps_parsed_once()
+    test_fallback_without_numpy()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script for SingleFlight request coalescing.
+Uses slow fake search functions, so it runs offline.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from singleflight import SingleFlight, singleflight_search
+from search_recommender import SearchRecommender
+from cache import TTLCache
+
+
+def test_threads_share_one_call():
+    """Concurrent threads asking for the same key trigger one upstream call."""
+    print("\n" + "="*70)
+    print("TEST: thread callers are coalesced")
+    print("="*70)
+
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow_search(query):
+        calls.append(query)
+        release.wait(2)
+        return [{"id": query, "title": query, "volume": 1}]
+
+    search = singleflight_search(slow_search, flight)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(search, "bitcoin") for _ in range(8)]
+        time.sleep(0.1)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert calls == ["bitcoin"]
+    assert all(r == results[0] for r in results)
+    stats = flight.stats()
+    print(f"  {stats}")
+    assert stats["coalesced"] == 7 and stats["in_flight"] == 0
+
+
+def test_errors_propagate_to_followers():
+    """Followers see the leader's exception, and the key is released after."""
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def failing(query):
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("upstream down")
+
+    def call():
+        try:
+            flight.do("k", failing, "k")
+        except RuntimeError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(call)
+        started.wait(1)
+        follower = executor.submit(call)
+        assert leader.result() == follower.result() == "upstream down"
+
+    assert flight.do("k", lambda q: "ok", "k") == "ok"
+
+
+def test_async_callers_share_one_call():
+    """Same behaviour for coroutine callers on one event loop."""
+    flight = SingleFlight()
+    calls = []
+
+    async def slow_search(query, dedupe_events=True):
+        calls.append((query, dedupe_events))
+        await asyncio.sleep(0.05)
+        return [{"id": query, "title": query, "volume": 1}]
+
+    search = singleflight_search(slow_search, flight)
+
+    async def run():
+        return await asyncio.gather(
+            *(search("nba") for _ in range(5)),
+            search("nba", dedupe_events=False),
+        )
+
+    results = asyncio.run(run())
+    assert calls == [("nba", True), ("nba", False)]
+    assert results[0] is results[4]
+    assert flight.stats()["coalesced"] == 4
+
+
+def test_recommender_coalesces_behind_cache():
+    """Recommender requests racing on the same keywords issue one query each."""
+    flight = SingleFlight()
+    calls = []
+    lock = threading.Lock()
+
+    def slow_search(query):
+        with lock:
+            calls.append(query)
+        time.sleep(0.1)
+        return [{"id": query, "title": f"{query} market", "volume": 10, "query_matched": query}]
+
+    recommender = SearchRecommender(
+        search_func=slow_search, debug=False, cache=TTLCache(ttl=60), singleflight=flight
+    )
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: recommender._scattershot_search(["trump", "senate"]), range(4)))
+
+    assert sorted(calls) == ["senate", "trump"]
+
+
+if __name__ == "__main__":
+    test_threads_share_one_call()
+    test_errors_propagate_to_followers()
+    test_async_callers_share_one_call()
+    test_recommender_coalesces_behind_cache()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for catalog/cache snapshots.
+Round-trips the recorded fixture dump through a temporary SQLite file.
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from cache import TTLCache
+from market_catalog import MarketCatalog
+from snapshot import load_snapshot, save_snapshot
+from testing_utils import FakeClock
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "gamma_events_sample.json")
+
+
+def test_round_trip():
+    """Catalog search results and cache entries survive a save/load cycle."""
+    print("\n" + "="*70)
+    print("TEST: snapshot round trip")
+    print("="*70)
+
+    catalog = MarketCatalog()
+    catalog.ingest_file(FIXTURE)
+    cache = TTLCache(ttl=60, stale_ttl=600, clock=FakeClock(10_000.0))
+    cache.set(("bitcoin", True), catalog.search("bitcoin"), stored_at=9_990.0)
+    cache.set(("nba", False), catalog.search("nba", dedupe_events=False), stored_at=9_500.0)
+    cache.set(("ancient", True), [{"id": "x"}], stored_at=1_000.0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snapshot.db")
+        written = save_snapshot(path, catalog, cache)
+        print(f"  written: {written}")
+        assert written == {"events": 15, "cache_entries": 3}
+
+        restored_catalog = MarketCatalog()
+        restored_cache = TTLCache(ttl=60, stale_ttl=600, clock=FakeClock(10_000.0))
+        info = load_snapshot(path, restored_catalog, restored_cache)
+        print(f"  loaded: {info}")
+
+    assert info["loaded"] and info["events"] == 15
+    assert restored_catalog.last_refresh == catalog.last_refresh
+    for query in ("bitcoin", "ethereum etf", "senate"):
+        assert restored_catalog.search(query) == catalog.search(query)
+
+    # Fresh entry is a hit, the older one is served stale, the ancient one is dropped
+    assert restored_cache.lookup(("bitcoin", True))[1] == "fresh"
+    assert restored_cache.lookup(("nba", False))[1] == "stale"
+    assert restored_cache.lookup(("ancient", True))[1] == "miss"
+    assert info["cache_entries"] == 2
+
+
+def test_missing_and_incompatible():
+    """Missing files and other schema versions are ignored, not fatal."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snapshot.db")
+        assert load_snapshot(path, MarketCatalog()) == {"loaded": False, "reason": "missing"}
+
+        save_snapshot(path, cache=TTLCache())
+        conn = sqlite3.connect(path)
+        conn.execute("UPDATE meta SET value = '999' WHERE key = 'schema_version'")
+        conn.commit()
+        conn.close()
+
+        catalog = MarketCatalog()
+        assert load_snapshot(path, catalog)["loaded"] is False
+        assert not catalog.ready
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_missing_and_incompatible()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
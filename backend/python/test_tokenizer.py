@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared title tokenizer.
+Checks it against the inline tokenization it replaced.
+"""
+
+import re
+import string
+
+import tokenizer
+from tokenizer import STOP_WORDS, token_set, tokenize, topic_signature
+from search_recommender import SearchRecommender
+
+TITLES = [
+    "Will Bitcoin reach $150,000 by December 31, 2025?",
+    "Lakers vs. Celtics: who wins the NBA Finals?",
+    "Fed decision in March 2026 - 25 bps cut?",
+    "Trump's approval rating above 45% on January 12-18?",
+    "",
+]
+
+
+def old_signature(title):
+    """The pre-tokenizer _get_topic_signature body."""
+    title = re.sub(r'\$[\d,]+[km]?\b', '', title, flags=re.IGNORECASE)
+    title = re.sub(r'\b(january|february|march|april|may|june|july|august|september|october|november|december)\s+\d+[-\d]*', '', title, flags=re.IGNORECASE)
+    title = re.sub(r'\b\d{4}\b', '', title)
+    title = re.sub(r'\b\d+[-\d]+\b', '', title)
+    words = title.lower().translate(str.maketrans('', '', string.punctuation)).split()
+    key_words = [w for w in words if w not in STOP_WORDS and len(w) > 3 and not w.isdigit()]
+    return ' '.join(sorted(set(key_words))[:3])
+
+
+def test_matches_inline_tokenization():
+    """tokenize/topic_signature give the same output as the old inline code."""
+    print("\n" + "="*70)
+    print("TEST: tokenizer matches the old inline tokenization")
+    print("="*70)
+
+    for title in TITLES:
+        expected = title.lower().translate(str.maketrans('', '', string.punctuation)).split()
+        assert list(tokenize(title)) == expected
+        assert token_set(title) == frozenset(expected)
+        assert topic_signature(title) == old_signature(title)
+        print(f"  {title[:45]!r:48} -> {topic_signature(title)!r}")
+
+
+def test_repeated_titles_hit_the_cache():
+    """A title seen again is not re-tokenized, and tokens are interned."""
+    title = "Will the Knicks make the Eastern Conference Finals?"
+    before = tokenizer.cache_stats()["tokenize"]["hits"]
+    first = tokenize(title)
+    second = tokenize(title.replace("Knicks", "Knicks"))
+    assert first is second
+    assert tokenizer.cache_stats()["tokenize"]["hits"] > before
+
+    other = tokenize("Eastern Conference champion?")
+    assert other[0] is first[5]
+
+
+def test_recommender_paths_use_tokenizer():
+    """Keyword extraction and penalties see the same tokens as before."""
+    recommender = SearchRecommender(debug=False)
+    assert recommender._extract_keywords_from_title("Lakers vs. Celtics: who wins the NBA Finals?") == [
+        "lakers celtics", "celtics wins", "wins nba"
+    ]
+    negatives = recommender._extract_negative_keywords(["Lakers vs. Celtics: who wins the NBA Finals?"])
+    assert negatives == {"lakers", "celtics", "nba", "finals"}
+    assert recommender._get_topic_signature(TITLES[0]) == old_signature(TITLES[0])
+
+
+if __name__ == "__main__":
+    test_matches_inline_tokenization()
+    test_repeated_titles_hit_the_cache()
+    test_recommender_paths_use_tokenizer()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
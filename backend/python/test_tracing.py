@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script for per-request structured tracing.
+Uses the canned search functions from test_async_recommender, so it runs offline.
+"""
+
+import asyncio
+import logging
+
+import httpx
+
+import main
+from async_recommender import AsyncSearchRecommender
+from cache import TTLCache
+from search_recommender import SearchRecommender
+from tracing import TRACE_HEADER, Trace, current_trace, start_trace, trace_from_header
+from test_async_recommender import DISLIKED, WATCHLIST, fake_search, fake_search_async
+
+
+def event_names(trace):
+    return [e["name"] for e in trace.events]
+
+
+def test_untraced_requests_record_nothing():
+    """Without a trace in context, the pipeline runs exactly as before."""
+    print("\n" + "="*70)
+    print("TEST: tracing is off unless requested")
+    print("="*70)
+
+    assert current_trace() is None
+    recommender = SearchRecommender(search_func=fake_search, debug=False)
+    assert recommender.get_recommendations(WATCHLIST, DISLIKED, top_n=5)
+
+    assert trace_from_header(None) is None
+    assert trace_from_header("nope") is None
+    assert trace_from_header("1").level == logging.INFO
+    assert trace_from_header("DEBUG").level == logging.DEBUG
+    assert trace_from_header(None, sample_rate=1.0).sampled
+
+
+def test_debug_trace_carries_score_breakdown():
+    """DEBUG traces get one structured score event per candidate, from worker threads too."""
+    recommender = SearchRecommender(search_func=fake_search, debug=False, cache=TTLCache(ttl=60))
+
+    with start_trace(Trace(level=logging.DEBUG)) as trace:
+        result = recommender.get_recommendations(WATCHLIST, DISLIKED, top_n=5, return_result=True)
+
+    names = event_names(trace)
+    print(f"  {len(names)} events: {sorted(set(names))}")
+    assert names[0] == "recommend.start" and names[-1] == "recommend.done"
+
+    scores = [e for e in trace.events if e["name"] == "score.market"]
+    assert len(scores) == result.total_candidates
+    by_id = {e["market_id"]: e for e in scores}
+    for rec in result.recommendations:
+        assert by_id[rec["id"]]["final"] == rec["score"]
+    assert by_id["s1"]["matching_negative"] == ["bowl", "super"]
+
+    # cache.lookup is recorded inside the search worker threads
+    lookups = [e for e in trace.events if e["name"] == "cache.lookup"]
+    assert sorted(e["query"] for e in lookups) == sorted(result.keywords)
+
+
+def test_info_trace_skips_per_candidate_events():
+    """INFO traces keep stage events but drop the per-candidate detail."""
+    recommender = AsyncSearchRecommender(search_func=fake_search_async, debug=False)
+
+    async def run():
+        with start_trace(Trace(level=logging.INFO)) as trace:
+            await recommender.get_recommendations(WATCHLIST, DISLIKED, top_n=5)
+        return trace
+
+    names = event_names(asyncio.run(run()))
+    assert "score.market" not in names and "cache.lookup" not in names
+    assert {"keywords.positive", "search.keyword", "select.keyword", "recommend.top"} <= set(names)
+
+
+def test_endpoint_header_enables_trace():
+    """The trace header turns tracing on for one request and returns the events."""
+    original = main.recommender
+    main.recommender = AsyncSearchRecommender(search_func=fake_search_async, debug=False)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            body = {"watchlist": WATCHLIST, "disliked_items": DISLIKED}
+            plain = await client.post("/api/recommendations", json=body)
+            traced = await client.post("/api/recommendations", json=body, headers={TRACE_HEADER: "debug"})
+        return plain, traced
+
+    try:
+        plain, traced = asyncio.run(run())
+    finally:
+        main.recommender = original
+
+    assert plain.json()["trace"] is None and "x-polyflix-trace-id" not in plain.headers
+    assert traced.headers["x-polyflix-trace-id"]
+    names = [e["name"] for e in traced.json()["trace"]]
+    assert names[0] == "request.start" and "score.market" in names
+
+
+def test_middleware_on_a_bare_asgi_app():
+    """RequestMiddleware traces on request, records the response status and adds the trace ID."""
+    traces = []
+
+    async def app(scope, receive, send):
+        traces.append(current_trace())
+        await send({"type": "http.response.start", "status": 204, "headers": [(b"x-app", b"1")]})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def call(headers):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/ping", "headers": headers}
+        await main.RequestMiddleware(app)(scope, None, send)
+        return sent[0]["headers"]
+
+    plain = asyncio.run(call([]))
+    traced = asyncio.run(call([(b"x-polyflix-trace", b"1")]))
+    assert plain == [(b"x-app", b"1")] and traces[0] is None
+    trace = traces[1]
+    assert (b"x-polyflix-trace-id", trace.trace_id.encode()) in traced
+    assert event_names(trace) == ["request.start", "request.done"] and trace.events[-1]["status"] == 204
+
+
+if __name__ == "__main__":
+    test_untraced_requests_record_nothing()
+    test_debug_trace_carries_score_breakdown()
+    test_info_trace_skips_per_candidate_events()
+    test_endpoint_header_enables_trace()
+    test_middleware_on_a_bare_asgi_app()
+
+    print("\n" + "="*70)
+    print("ALL TESTS COMPLETE")
+    print("="*70)
@@ -0,0 +1,13 @@
+"""
+Shared helpers for the test scripts.
+"""
+
+
+class FakeClock:
+    """A monotonic clock stand-in that only moves when a test sets or advances .now."""
+
+    def __init__(self, now: float = 100.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
@@ -0,0 +1,125 @@
+"""
+Shared title tokenizer for keyword extraction, scoring and catalog indexing.
+
+Every code path that splits a market title into words goes through here, so
+the punctuation table and topic-signature regexes are built once per process
+and each distinct title is tokenized once. Tokens are interned, which keeps
+the many repeated words across cached titles from being stored twice.
+"""
+
+import re
+import string
+import sys
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Tuple
+
+# Stop words to filter out non-meaningful words
+STOP_WORDS = {
+    'the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
+    'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
+    'should', 'may', 'might', 'must', 'shall', 'can', 'need', 'dare',
+    'ought', 'used', 'to', 'of', 'in', 'for', 'on', 'with', 'at', 'by',
+    'from', 'as', 'into', 'through', 'during', 'before', 'after', 'above',
+    'below', 'between', 'under', 'again', 'further', 'then', 'once', 'here',
+    'there', 'when', 'where', 'why', 'how', 'all', 'each', 'few', 'more',
+    'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own',
+    'same', 'so', 'than', 'too', 'very', 'just', 'and', 'but', 'if', 'or',
+    'because', 'until', 'while', 'this', 'that', 'these', 'those', 'what',
+    'which', 'who', 'whom', 'win', 'price', 'market', 'prediction', 'will',
+    'yes', 'no', 'over', 'under', 'reach', 'hit', 'end', 'year', 'week',
+    # Months - explicitly exclude to prevent date-based clustering
+    'january', 'february', 'march', 'april', 'may', 'june',
+    'july', 'august', 'september', 'october', 'november', 'december',
+    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+    # Time-related words that don't add semantic meaning
+    'today', 'tomorrow', 'yesterday', 'week', 'month', 'day', 'days', 'weeks', 'months',
+    'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday',
+    'mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'
+}
+
+# Sized for the catalog: every event and market title fits with room to spare
+TOKEN_CACHE_SIZE = 65536
+
+_PUNCT_TABLE = str.maketrans('', '', string.punctuation)
+
+# Topic signature patterns, applied in order
+_DOLLAR_RE = re.compile(r'\$[\d,]+[km]?\b', re.IGNORECASE)
+_MONTH_DAY_RE = re.compile(
+    r'\b(january|february|march|april|may|june|july|august|september|october|november|december)\s+\d+[-\d]*',
+    re.IGNORECASE
+)
+_YEAR_RE = re.compile(r'\b\d{4}\b')
+_NUMBER_RANGE_RE = re.compile(r'\b\d+[-\d]+\b')
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def tokenize(text: str) -> Tuple[str, ...]:
+    """
+    Lowercase, strip punctuation and split text into interned tokens.
+
+    Args:
+        text: A market title or search query.
+
+    Returns:
+        Tuple of tokens in title order (duplicates kept).
+    """
+    return tuple(sys.intern(word) for word in text.lower().translate(_PUNCT_TABLE).split())
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def token_set(text: str) -> FrozenSet[str]:
+    """
+    Distinct tokens of a title, for negative keyword matching.
+
+    Args:
+        text: A market title.
+
+    Returns:
+        Frozen set of tokens.
+    """
+    return frozenset(tokenize(text))
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def topic_signature(title: str) -> str:
+    """
+    Extract a topic signature from a market title to group similar markets.
+    Removes dates, prices, and time-specific information.
+
+    Args:
+        title: Market title
+
+    Returns:
+        A simplified topic signature string
+    """
+    # Remove dollar amounts like $85,000, $100k, etc.
+    title = _DOLLAR_RE.sub('', title)
+    # Remove date ranges like "January 12-18", "by 2025", etc.
+    title = _MONTH_DAY_RE.sub('', title)
+    title = _YEAR_RE.sub('', title)  # Remove years
+    title = _NUMBER_RANGE_RE.sub('', title)  # Remove number ranges
+
+    # Extract key entities
+    key_words = [w for w in tokenize(title) if w not in STOP_WORDS and len(w) > 3 and not w.isdigit()]
+
+    # Return first 2-3 key words as signature
+    return ' '.join(sorted(set(key_words))[:3])
+
+
+def cache_stats() -> Dict[str, Any]:
+    """
+    Get hit/miss counts for the tokenizer caches.
+
+    Returns:
+        Dict of {cache name: {hits, misses, size, max_size}}.
+    """
+    stats = {}
+    for name, func in (("tokenize", tokenize), ("token_set", token_set), ("topic_signature", topic_signature)):
+        info = func.cache_info()
+        stats[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "max_size": info.maxsize,
+        }
+    return stats
@@ -0,0 +1,161 @@
+"""
+Per-request structured tracing for the recommendation pipeline.
+
+A Trace is attached to the current context (contextvars), so it follows a
+request through the recommender, the search cache and worker threads without
+being passed around. Code paths check current_trace() once and skip all
+tracing work when it returns None, which is the case for every request that
+isn't explicitly traced or sampled.
+
+Events are plain dicts (name, offset, fields) kept on the trace and emitted
+on the "polyflix.trace" logger, so score breakdowns come out as structured
+fields instead of formatted strings.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("polyflix.trace")
+
+# Request header that turns tracing on: "1"/"true"/"info" for stage events,
+# "debug" to add per-candidate score breakdowns
+TRACE_HEADER = "X-Polyflix-Trace"
+
+_LEVELS = {
+    "1": logging.INFO,
+    "true": logging.INFO,
+    "info": logging.INFO,
+    "debug": logging.DEBUG,
+}
+
+_current: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("polyflix_trace", default=None)
+
+
+class Trace:
+    """
+    Structured events recorded for one request.
+
+    Events below the trace's level are dropped before their fields are
+    built, via enabled_for(), so DEBUG detail only costs anything on
+    requests that asked for it.
+    """
+
+    def __init__(self, trace_id: Optional[str] = None, level: int = logging.INFO, sampled: bool = False):
+        """
+        Initialize a Trace.
+
+        Args:
+            trace_id: Identifier included in every event (random if omitted).
+            level: Minimum level recorded (logging.INFO or logging.DEBUG).
+            sampled: True if the trace came from sampling rather than a header.
+        """
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.level = level
+        self.sampled = sampled
+        self.events: List[Dict[str, Any]] = []
+        self._start = time.perf_counter()
+
+    def enabled_for(self, level: int) -> bool:
+        """True if events at this level are recorded."""
+        return level >= self.level
+
+    def event(self, name: str, level: int = logging.INFO, **fields: Any) -> None:
+        """
+        Record an event and emit it on the trace logger.
+
+        Args:
+            name: Dotted event name, e.g. "search.keyword".
+            level: logging level of the event.
+            **fields: Structured event fields (must be JSON-serializable).
+        """
+        if level < self.level:
+            return
+        record = {
+            "name": name,
+            "t_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            **fields,
+        }
+        # list.append is atomic, so events from search worker threads are safe
+        self.events.append(record)
+        if logger.isEnabledFor(level):
+            logger.log(level, name, extra={"trace_id": self.trace_id, "fields": record})
+
+    def debug(self, name: str, **fields: Any) -> None:
+        """Record a DEBUG-level event."""
+        self.event(name, logging.DEBUG, **fields)
+
+
+def current_trace() -> Optional[Trace]:
+    """The Trace for the current request, or None if it isn't traced."""
+    return _current.get()
+
+
+@contextmanager
+def start_trace(trace: Optional[Trace]) -> Iterator[Optional[Trace]]:
+    """
+    Make `trace` the current trace for the duration of the block.
+    Passing None is allowed and leaves the request untraced.
+    """
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def trace_from_header(value: Optional[str], sample_rate: float = 0.0) -> Optional[Trace]:
+    """
+    Decide whether to trace a request.
+
+    Args:
+        value: The TRACE_HEADER value, if any.
+        sample_rate: Fraction of untraced requests to trace at INFO anyway.
+
+    Returns:
+        A new Trace, or None if the request shouldn't be traced.
+    """
+    if value:
+        level = _LEVELS.get(value.strip().lower())
+        if level is not None:
+            return Trace(level=level)
+    if sample_rate > 0 and random.random() < sample_rate:
+        return Trace(level=logging.INFO, sampled=True)
+    return None
+
+
+def sample_rate_from_env() -> float:
+    """Trace sampling rate from TRACE_SAMPLE_RATE (0 disables sampling)."""
+    return float(os.environ.get("TRACE_SAMPLE_RATE", 0))
+
+
+class JsonTraceFormatter(logging.Formatter):
+    """Formats trace log records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "level": record.levelname,
+            "trace_id": getattr(record, "trace_id", None),
+            **getattr(record, "fields", {"name": record.getMessage()}),
+        }
+        return json.dumps(payload, default=str)
+
+
+def configure_trace_logging(level: int = logging.DEBUG) -> None:
+    """
+    Send trace events to stderr as JSON lines, unless the trace logger
+    already has handlers configured.
+    """
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonTraceFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False